@@ -0,0 +1,160 @@
+"""Compare response compression settings on the list endpoints.
+
+Seeds a throwaway SQLite database, fetches every endpoint uncompressed, then
+compresses each body with every candidate setting through Litestar's own
+`CompressionFacade`, reporting CPU time per response and bytes on the wire.
+The last table times whole requests against the app's configured compression.
+
+    python benchmark/compression_bench.py --rows 2000 --repeat 50
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# the throwaway database gets its tables when the app starts
+os.environ.setdefault('DB_MIGRATE_ON_STARTUP', '1')
+
+from litestar.config.compression import CompressionConfig  # noqa: E402
+from litestar.enums import CompressionEncoding  # noqa: E402
+from litestar.middleware.compression import CompressionFacade  # noqa: E402
+from litestar.testing import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from compression import _HAS_BROTLI  # noqa: E402
+from model.book import Book  # noqa: E402
+from model.meta_data_attribute import MetaDataAttribute  # noqa: E402
+from model.meta_data_attribute_value import MetaDataAttributeValue  # noqa: E402
+from model.meta_data_line import MetaDataLine  # noqa: E402
+from model.meta_data_tag import MetaDataTag  # noqa: E402
+from model.meta_data_tag_value import MetaDataTagValue  # noqa: E402
+
+ENDPOINTS = [
+    '/meta-data-tag?pageSize={page_size}',
+    '/meta-data-tag/cursor?pageSize={page_size}',
+    '/attribute?pageSize={page_size}',
+    '/books/{book_id}/meta-data-line?pageSize={page_size}',
+    '/books/{book_id}/meta-data-line/graph?pageSize={page_size}',
+    '/books/{book_id}/opf/metadata',
+]
+
+SETTINGS: list[tuple[str, CompressionEncoding | None, dict]] = [
+    ('none', None, {}),
+    ('gzip-9 (old)', CompressionEncoding.GZIP, {'gzip_compress_level': 9}),
+    ('gzip-6', CompressionEncoding.GZIP, {'gzip_compress_level': 6}),
+    ('gzip-4', CompressionEncoding.GZIP, {'gzip_compress_level': 4}),
+    ('gzip-1', CompressionEncoding.GZIP, {'gzip_compress_level': 1}),
+]
+if _HAS_BROTLI:
+    SETTINGS += [
+        ('brotli-4', CompressionEncoding.BROTLI, {'brotli_quality': 4}),
+        ('brotli-6', CompressionEncoding.BROTLI, {'brotli_quality': 6}),
+    ]
+
+
+async def seed(rows: int) -> int:
+    """One book with `rows` lines spread over 20 tags, each line with two attributes, returns the book id."""
+    async with main.sqlalchemy_config.get_session() as session:
+        book = Book(title='Compression benchmark')
+        tags = [MetaDataTag(name=f'tag {i}', tag=f'dc:element{i}', sort_order=i) for i in range(20)]
+        attributes = [MetaDataAttribute(name=f'attribute-{i}', sort_order=i) for i in range(10)]
+        session.add_all([book, *tags, *attributes])
+        await session.flush()
+        for i in range(rows):
+            line = MetaDataLine(book_id=book.id, name=f'line {i:06d}')
+            line.tag = MetaDataTagValue(tag_id=tags[i % len(tags)].id, value=f'value of line {i} ' * 3)
+            line.attributes = [
+                MetaDataAttributeValue(attribute_id=attributes[(i + j) % len(attributes)].id,
+                                       attribute_value=f'#ref-{i}-{j}')
+                for j in range(2)
+            ]
+            session.add(line)
+        await session.commit()
+        return book.id
+
+
+def compress(body: bytes, encoding: CompressionEncoding, options: dict) -> bytes:
+    buffer = BytesIO()
+    facade = CompressionFacade(buffer=buffer, compression_encoding=encoding,
+                               config=CompressionConfig(backend='gzip', **options))
+    facade.write(body)
+    facade.close()
+    return buffer.getvalue()
+
+
+def run(rows: int, page_size: int, repeat: int) -> dict:
+    results: dict = {'rows': rows, 'page_size': page_size, 'repeat': repeat, 'settings': {}, 'requests': {}}
+    with TestClient(app=main.app) as client:
+        with client.portal() as portal:
+            book_id = portal.call(seed, rows)
+
+        bodies = {}
+        for endpoint in ENDPOINTS:
+            url = endpoint.format(book_id=book_id, page_size=page_size)
+            bodies[url] = client.get(url, headers={'Accept-Encoding': 'identity'}).content
+
+        for url, body in bodies.items():
+            for name, encoding, options in SETTINGS:
+                start = time.process_time()
+                for _ in range(repeat):
+                    size = len(compress(body, encoding, options)) if encoding else len(body)
+                cpu_ms = (time.process_time() - start) * 1000 / repeat
+                results['settings'].setdefault(url, {})[name] = {'bytes': size, 'cpu_ms': round(cpu_ms, 4)}
+
+        accept = 'br, gzip' if _HAS_BROTLI else 'gzip'
+        for url in bodies:
+            for label, headers in (('identity', {'Accept-Encoding': 'identity'}), ('compressed', {'Accept-Encoding': accept})):
+                start = time.process_time()
+                for _ in range(repeat):
+                    response = client.get(url, headers=headers)
+                cpu_ms = (time.process_time() - start) * 1000 / repeat
+                results['requests'].setdefault(url, {})[label] = {
+                    'cpu_ms': round(cpu_ms, 3),
+                    'encoding': response.headers.get('content-encoding', 'identity'),
+                    'bytes': response.num_bytes_downloaded,
+                }
+    return results
+
+
+def report(results: dict) -> None:
+    names = [name for name, _, _ in SETTINGS]
+    print(f"compression per response ({results['rows']} rows, page size {results['page_size']}): bytes / CPU ms")
+    print(f"{'endpoint':45}" + ''.join(f'{name:>22}' for name in names))
+    for url, by_setting in results['settings'].items():
+        cells = ''.join(f"{by_setting[name]['bytes']:>12} /{by_setting[name]['cpu_ms']:>8.3f}" for name in names)
+        print(f'{url:45}{cells}')
+    print('\nwhole requests with the configured compression: CPU ms (encoding, bytes)')
+    for url, by_label in results['requests'].items():
+        cells = ''.join(f"{label:>12} {value['cpu_ms']:>8.3f} ({value['encoding']}, {value['bytes']})"
+                        for label, value in by_label.items())
+        print(f'{url:45}{cells}')
+
+
+def main_() -> None:
+    logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--rows', type=int, default=2000, help='meta data lines to seed')
+    parser.add_argument('--page-size', type=int, default=100, help='pageSize of the list requests')
+    parser.add_argument('--repeat', type=int, default=50, help='runs per measurement')
+    parser.add_argument('--output', type=Path, help='also write the results as JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        main.sqlalchemy_config.connection_string = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.sqlite')}"
+        results = run(args.rows, args.page_size, args.repeat)
+    report(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main_()
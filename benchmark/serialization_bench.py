@@ -0,0 +1,90 @@
+"""Per-item cost of turning database rows into response JSON.
+
+Compares, for tags and lines:
+  * per-request `TypeAdapter(list[DTO])` validating ORM instances, then Litestar encoding the models (old path)
+  * the same with the module-level adapter
+  * column rows built positionally into msgspec Structs, encoded by Litestar (new path)
+
+No database is needed, ORM instances and rows are built in memory.
+
+    python benchmark/serialization_bench.py --items 1000 --repeat 200
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from litestar.contrib.pydantic.pydantic_init_plugin import PydanticInitPlugin  # noqa: E402
+from litestar.pagination import OffsetPagination  # noqa: E402
+from litestar.serialization import encode_json, get_serializer  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import model.meta_data_attribute_value  # noqa: E402,F401  registers the mappers
+from model.meta_data_line import (MetaDataLine, MetaDataLineDTO, MetaDataLineStruct,  # noqa: E402
+                                  MetaDataTagValueStruct, meta_data_line_dto_list)
+from model.meta_data_tag import MetaDataTag, MetaDataTagDTO, MetaDataTagStruct, meta_data_tag_dto_list  # noqa: E402
+from model.meta_data_tag_value import MetaDataTagValue  # noqa: E402
+
+serializer = get_serializer(PydanticInitPlugin.encoders())
+
+
+def page(items: list) -> bytes:
+    return encode_json(OffsetPagination(items=items, total=len(items), limit=len(items), offset=0), serializer)
+
+
+def tag_cases(count: int) -> dict[str, Callable[[], bytes]]:
+    values = [(i, i % 7, f'tag {i}', f'dc:element{i}', 'place holder', None, f'description of tag {i}')
+              for i in range(count)]
+    columns = MetaDataTagStruct.__struct_fields__
+    objs = [MetaDataTag(**dict(zip(columns, value))) for value in values]
+    return {
+        'per-request TypeAdapter': lambda: page(TypeAdapter(list[MetaDataTagDTO]).validate_python(objs)),
+        'hoisted TypeAdapter': lambda: page(meta_data_tag_dto_list.validate_python(objs)),
+        'row -> Struct': lambda: page([MetaDataTagStruct(*row) for row in values]),
+    }
+
+
+def line_cases(count: int) -> dict[str, Callable[[], bytes]]:
+    values = [(i, f'line {i:06d}', i, i % 20, f'value of line {i}') for i in range(count)]
+    objs = []
+    for line_id, name, tag_value_id, tag_id, value in values:
+        line = MetaDataLine(id=line_id, name=name)
+        line.tag = MetaDataTagValue(id=tag_value_id, tag_id=tag_id, value=value)
+        objs.append(line)
+
+    def structs() -> bytes:
+        return page([MetaDataLineStruct(line_id, name, MetaDataTagValueStruct(tag_value_id, tag_id, value))
+                     for line_id, name, tag_value_id, tag_id, value in values])
+
+    return {
+        'per-request TypeAdapter': lambda: page(TypeAdapter(list[MetaDataLineDTO]).validate_python(objs)),
+        'hoisted TypeAdapter': lambda: page(meta_data_line_dto_list.validate_python(objs)),
+        'row -> Struct': structs,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--items', type=int, default=1000, help='items per page')
+    parser.add_argument('--repeat', type=int, default=200, help='pages per measurement')
+    args = parser.parse_args()
+
+    for label, cases in (('MetaDataTagDTO', tag_cases(args.items)), ('MetaDataLineDTO', line_cases(args.items))):
+        outputs = {name: case() for name, case in cases.items()}
+        assert len(set(outputs.values())) == 1, f'{label}: the paths produce different JSON'
+        print(f'{label}, {args.items} items per page')
+        baseline = None
+        for name, case in cases.items():
+            seconds = min(timeit.repeat(case, number=args.repeat, repeat=3)) / args.repeat
+            per_item_us = seconds / args.items * 1e6
+            baseline = baseline or per_item_us
+            print(f'  {name:26} {per_item_us:8.3f} us/item  {baseline / per_item_us:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import hashlib
+import itertools
+import mmap
+import os
+import re
+import tempfile
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncGenerator, AsyncIterable, Iterable
+
+import anyio.to_thread
+from litestar import Response
+from litestar.enums import ASGIExtension
+from litestar.response.base import ASGIResponse
+from litestar.status_codes import HTTP_206_PARTIAL_CONTENT, HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+from sqlalchemy import delete, select
+
+from model.blob import Blob
+from model.manifest_item import ManifestItem
+
+if TYPE_CHECKING:
+    from litestar import Litestar, Request
+    from litestar.background_tasks import BackgroundTask, BackgroundTasks
+    from litestar.datastructures import Cookie
+    from litestar.enums import MediaType
+    from litestar.types import Receive, Scope, Send, TypeEncodersMap
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# content files of every book, at <EPUB_BLOB_DIR>/<first 2 hex digits>/<remaining 62> of their SHA-256
+BLOB_DIR = Path(os.environ.get('EPUB_BLOB_DIR', 'blobs'))
+# bytes sent or copied at a time when the server can't take the file itself
+BLOB_CHUNK_SIZE = 1024 * 1024
+# blobs and files unused for less than this are kept by `collect_garbage()`, an upload of the
+# same content may be about to refer to them
+BLOB_GC_GRACE_SECONDS = int(os.environ.get('EPUB_BLOB_GC_GRACE_SECONDS', '3600'))
+
+_SHA256 = re.compile(r'[0-9a-f]{64}')
+
+
+class _Spool:
+    """A blob being written to a temporary file, hashed as it is written."""
+
+    def __init__(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(dir=directory, delete=False)
+        self.sha256 = hashlib.sha256()
+        self.crc32 = 0
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.file.write(chunk)
+        self.sha256.update(chunk)
+        self.crc32 = zlib.crc32(chunk, self.crc32)
+        self.size += len(chunk)
+
+    def finish(self) -> Path:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        return Path(self.file.name)
+
+    def discard(self) -> None:
+        self.file.close()
+        Path(self.file.name).unlink(missing_ok=True)
+
+
+class BlobStore:
+    """Files named by the SHA-256 of their content, each content stored once whichever books use it.
+
+    Stored files are read-only and never change, a new content is a new blob.
+    """
+
+    def __init__(self, root: Path = BLOB_DIR) -> None:
+        self.root = root
+
+    def path(self, sha256: str) -> Path:
+        if not _SHA256.fullmatch(sha256):
+            raise ValueError(f'not a SHA-256 hex digest: {sha256!r}')
+        return self.root / sha256[:2] / sha256[2:]
+
+    async def put(self, chunks: AsyncIterable[bytes]) -> Blob:
+        """Store the bytes of `chunks`, returns the unsaved `Blob` row to record with `save_blob()`.
+
+        The file is written under a temporary name and linked into place once its
+        hash is known; content that is stored already only gets its modification
+        time bumped, so `collect_garbage()` leaves it alone.
+        """
+        spool = await anyio.to_thread.run_sync(_Spool, self.root / 'tmp')
+        try:
+            async for chunk in chunks:
+                await anyio.to_thread.run_sync(spool.write, chunk)
+            blob = Blob(sha256=spool.sha256.hexdigest(), size=spool.size, crc32=spool.crc32)
+            await anyio.to_thread.run_sync(self._link, spool, blob.sha256)
+        finally:
+            await anyio.to_thread.run_sync(spool.discard)
+        return blob
+
+    def _link(self, spool: _Spool, sha256: str) -> None:
+        temporary = spool.finish()
+        path = self.path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.chmod(temporary, 0o444)
+        try:
+            os.link(temporary, path)
+        except FileExistsError:
+            os.utime(path)
+
+    def remove_unknown(self, known: set[str], before: float) -> int:
+        """Delete stored and temporary files not in `known` and last modified before `before`, returns how many."""
+        removed = 0
+        for path in itertools.chain(self.root.glob('??/*'), self.root.glob('tmp/*')):
+            if path.parent.name + path.name in known or path.stat().st_mtime >= before:
+                continue
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+
+blob_store = BlobStore()
+
+
+async def save_blob(session: AsyncSession, blob: Blob) -> None:
+    """Record a stored blob, or mark the existing row as just used so `collect_garbage()` keeps it."""
+    now = datetime.now(timezone.utc)
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        existing = await session.get(Blob, blob.sha256)
+        if existing is None:
+            session.add(blob)
+        else:
+            existing.updated_at = now
+        await session.flush()
+        return
+    await session.execute(insert(Blob)
+                          .values(sha256=blob.sha256, size=blob.size, crc32=blob.crc32, created_at=now, updated_at=now)
+                          .on_conflict_do_update(index_elements=['sha256'], set_={'updated_at': now}))
+
+
+async def collect_garbage(session: AsyncSession, store: BlobStore = blob_store,
+                          grace: float = BLOB_GC_GRACE_SECONDS) -> int:
+    """Delete the blobs no manifest item refers to any more, returns how many files were removed.
+
+    Rows go first, then every file without a row. Anything used in the last
+    `grace` seconds stays, so an upload running at the same time can't lose its file.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace)
+    referenced = select(ManifestItem.id).where(ManifestItem.blob_sha256 == Blob.sha256).exists()
+    await session.execute(delete(Blob).where(Blob.updated_at < cutoff, ~referenced))
+    await session.commit()
+    known = set((await session.scalars(select(Blob.sha256))).all())
+    return await anyio.to_thread.run_sync(store.remove_unknown, known, cutoff.timestamp())
+
+
+def send_file(path: Path, out_fd: int, size: int) -> None:
+    """Copy `size` bytes of `path` to `out_fd` in the kernel with `os.sendfile()`.
+
+    Falls back to a read/write loop where sendfile can't write to `out_fd`.
+    """
+    with open(path, 'rb') as file:
+        offset = 0
+        try:
+            while offset < size:
+                sent = os.sendfile(out_fd, file.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except (AttributeError, OSError):
+            file.seek(offset)
+            while offset < size and (chunk := file.read(min(BLOB_CHUNK_SIZE, size - offset))):
+                view = memoryview(chunk)
+                while view:
+                    written = os.write(out_fd, view)
+                    view = view[written:]
+                    offset += written
+    if offset != size:
+        raise OSError(f'{path} is {offset} bytes, expected {size}')
+
+
+async def map_file(path: Path, start: int = 0, end: int | None = None,
+                   chunk_size: int = BLOB_CHUNK_SIZE) -> AsyncGenerator[bytes, None]:
+    """Yield bytes `start` to `end` of `path`, sliced from a memory map of the file.
+
+    The kernel reads ahead of the sequential slices, and slicing copies straight
+    from the page cache without a read buffer in between. Slices are taken in a
+    worker thread, a page fault on a cold file doesn't stall the event loop.
+    """
+    with open(path, 'rb') as file:
+        end = os.fstat(file.fileno()).st_size if end is None else end
+        if end <= start:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, 'madvise'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            for offset in range(start, end, chunk_size):
+                yield await anyio.to_thread.run_sync(mapped.__getitem__, slice(offset, min(offset + chunk_size, end)))
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested range starts past the end of the file."""
+
+
+def byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """`(start, end)` of a single `Range: bytes=...` request, end exclusive, None for the whole file.
+
+    Several ranges and headers that don't parse are answered with the whole file,
+    which a server is always allowed to do.
+
+    Raises:
+        RangeNotSatisfiable: the range starts at or past the end of the file.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition('=')
+    first, dash, last = spec.strip().partition('-')
+    if unit.strip().lower() != 'bytes' or ',' in spec or not dash:
+        return None
+    try:
+        if not first:
+            # suffix range, the last `last` bytes
+            length = int(last)
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiable(header)
+            return max(size - length, 0), size
+        start = int(first)
+        end = int(last) + 1 if last else None
+    except ValueError:
+        return None
+    if start < 0 or (end is not None and end <= start):
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, size if end is None else min(end, size)
+
+
+def blob_etag(sha256: str) -> str:
+    return f'"{sha256}"'
+
+
+class ASGIBlobResponse(ASGIResponse):
+    """Sends bytes `offset` to `offset + content_length` of a file.
+
+    Servers offering the zero copy send extension get the open file and send it
+    themselves (`sendfile`), servers offering path send get the path of a whole
+    file, anything else gets slices of a memory map.
+    """
+
+    def __init__(self, *, path: Path, offset: int, partial: bool, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.path = path
+        self.offset = offset
+        self.partial = partial
+        self._extensions: dict[str, Any] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._extensions = scope.get('extensions') or {}
+        await super().__call__(scope, receive, send)
+
+    async def send_body(self, send: Send, receive: Receive) -> None:
+        if ASGIExtension.ZERO_COPY_SEND_EXTENSION.value in self._extensions and self.content_length:
+            with open(self.path, 'rb') as file:
+                await send({'type': 'http.response.zerocopysend', 'file': file, 'offset': self.offset,
+                            'count': self.content_length, 'more_body': False})  # type: ignore[typeddict-item]
+            return
+        if ASGIExtension.PATH_SEND.value in self._extensions and not self.partial:
+            # the extension wants an absolute path
+            path = str(self.path.resolve())
+            await send({'type': 'http.response.pathsend', 'path': path})  # type: ignore[typeddict-item]
+            return
+        async for chunk in map_file(self.path, self.offset, self.offset + self.content_length):
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+
+class RangeFileResponse(Response):
+    """A file that never changes under its ETag as response body, answering a single `Range` with 206.
+
+    `If-Range` with any other validator gets the whole file. Handlers returning it
+    should skip the compression middleware, a compressed range is not the range
+    that was asked for.
+    """
+
+    def __init__(self, path: Path, *, size: int, etag: str, media_type: str,
+                 headers: dict[str, str] | None = None) -> None:
+        super().__init__(content=None, media_type=media_type, headers=headers)
+        self.path = path
+        self.size = size
+        self.etag = etag
+
+    def to_asgi_response(
+            self,
+            app: Litestar | None,
+            request: Request,
+            *,
+            background: BackgroundTask | BackgroundTasks | None = None,
+            cookies: Iterable[Cookie] | None = None,
+            encoded_headers: Iterable[tuple[bytes, bytes]] | None = None,
+            headers: dict[str, str] | None = None,
+            is_head_response: bool = False,
+            media_type: MediaType | str | None = None,
+            status_code: int | None = None,
+            type_encoders: TypeEncodersMap | None = None,
+    ) -> ASGIResponse:
+        etag, size = self.etag, self.size
+        headers = {**(headers or {}), **self.headers, 'accept-ranges': 'bytes', 'etag': etag}
+        cookies = self.cookies if cookies is None else itertools.chain(self.cookies, cookies)
+        if_range = request.headers.get('if-range')
+        try:
+            requested = byte_range(request.headers.get('range'), size) if if_range in (None, etag) else None
+        except RangeNotSatisfiable:
+            headers['content-range'] = f'bytes */{size}'
+            return ASGIResponse(body=b'', cookies=cookies, headers=headers, media_type=self.media_type,
+                                status_code=HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        start, end = requested or (0, size)
+        if requested is not None:
+            headers['content-range'] = f'bytes {start}-{end - 1}/{size}'
+        # litestar leaves HEAD to the response, and `ASGIResponse` would drop the type and length a HEAD asks for
+        is_head_response = is_head_response or request.method == 'HEAD'
+        if is_head_response:
+            headers.update({'content-type': str(self.media_type), 'content-length': str(end - start)})
+        return ASGIBlobResponse(
+            path=self.path,
+            offset=start,
+            partial=requested is not None,
+            background=self.background or background,
+            content_length=end - start,
+            cookies=cookies,
+            headers=headers,
+            is_head_response=is_head_response,
+            media_type=self.media_type,
+            status_code=HTTP_206_PARTIAL_CONTENT if requested is not None else self.status_code,
+        )
+
+
+class BlobResponse(RangeFileResponse):
+    """A stored blob as response body, its SHA-256 is the ETag."""
+
+    def __init__(self, blob: Blob, *, media_type: str, store: BlobStore = blob_store,
+                 headers: dict[str, str] | None = None) -> None:
+        super().__init__(store.path(blob.sha256), size=blob.size, etag=blob_etag(blob.sha256),
+                         media_type=media_type, headers=headers)
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, TypeVar
+
+from litestar.contrib.pydantic.pydantic_init_plugin import PydanticInitPlugin
+from litestar.serialization import decode_json, encode_json, get_serializer
+
+if TYPE_CHECKING:
+    from litestar.stores.base import Store
+
+T = TypeVar('T')
+
+DEFAULT_TTL = int(os.environ.get('CATALOG_CACHE_TTL', '300'))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', '1024'))
+
+_serializer = get_serializer(PydanticInitPlugin.encoders())
+_type_decoders = PydanticInitPlugin.decoders()
+
+
+class CatalogCache:
+    """Read-through cache for small, rarely changing tables.
+
+    Entries are kept in process in LRU order, each for at most `ttl` seconds. When a
+    `Store` is set (see `configure_catalog_caches()`) entries are also shared through
+    it, and a generation counter kept in the store makes an `invalidate()` in one
+    worker visible to every other worker on their next read.
+
+    For `settle` seconds after an invalidation loaded values are returned but not
+    kept, so a read from a lagging replica does not get cached for a whole `ttl`.
+
+    Without a store another worker's write is only seen through the `version` a
+    value is read with, e.g. the ETag of the response it goes into: an entry of
+    another version is loaded again, so a body never goes out under a newer ETag.
+    """
+
+    def __init__(self, name: str, ttl: int = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 store: Store | None = None, settle: float = 0) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.store = store
+        self.settle = settle
+        self._generation = 0
+        self._seen_generation = 0
+        self._invalidated_at = float('-inf')
+        # key -> (expires at, generation, version, value)
+        self._entries: OrderedDict[str, tuple[float, int, str | None, Any]] = OrderedDict()
+
+    async def _current_generation(self) -> int:
+        if self.store is None:
+            return self._generation
+        raw = await self.store.get(f'{self.name}:generation')
+        return int(raw) if raw else 0
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[T]], value_type: Any,
+                          version: str | None = None) -> T:
+        """Return the cached value of `key`, calling `loader` on a miss.
+
+        Args:
+            key (str): cache key, e.g. `id:1` or `page:10:0`.
+            loader: loads the value from the database, exceptions are not cached.
+            value_type: type of the value, used to decode it from the shared store.
+            version (str): what the rows the value is built from look like now, e.g. the ETag of
+                `conditional.compute_validator()`; a cached value of another version is a miss.
+
+        Returns:
+            the cached or freshly loaded value.
+        """
+        generation = await self._current_generation()
+        now = time.monotonic()
+        if generation != self._seen_generation:
+            # invalidated, possibly by another worker
+            self._seen_generation = generation
+            self._invalidated_at = now
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, entry_generation, entry_version, value = entry
+            if expires_at > now and entry_generation == generation and entry_version == version:
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+
+        store_key = f'{self.name}:{generation}:{key}'
+        if version is not None:
+            store_key += f':{version}'
+        raw = await self.store.get(store_key) if self.store is not None else None
+        if raw is not None:
+            value = decode_json(raw, target_type=value_type, type_decoders=_type_decoders)
+        else:
+            value = await loader()
+            if now - self._invalidated_at < self.settle:
+                return value
+            if self.store is not None:
+                await self.store.set(store_key, encode_json(value, _serializer), expires_in=self.ttl)
+
+        self._entries[key] = (now + self.ttl, generation, version, value)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    async def invalidate(self) -> None:
+        """Drop every entry, called after each write to the cached table."""
+        self._entries.clear()
+        if self.store is None:
+            self._generation += 1
+            return
+        generation = await self._current_generation()
+        await self.store.set(f'{self.name}:generation', str(generation + 1).encode())
+
+
+meta_data_tag_cache = CatalogCache('meta_data_tag')
+meta_data_attribute_cache = CatalogCache('meta_data_attribute')
+
+
+def configure_catalog_caches(store: Store | None, settle: float = 0) -> None:
+    """Share the catalog caches between workers through `store`.
+
+    `settle` is the replication lag to allow for when reads go to a replica.
+    """
+    for cache in (meta_data_tag_cache, meta_data_attribute_cache):
+        cache.store = store
+        cache.settle = settle
+
+
+def catalog_cache_store_from_env() -> Store | None:
+    """`CATALOG_CACHE_STORE` is a `redis://` url or a directory for a `FileStore`, unset keeps caches in process."""
+    location = os.environ.get('CATALOG_CACHE_STORE')
+    if not location:
+        return None
+    if location.startswith(('redis://', 'rediss://', 'unix://')):
+        from litestar.stores.redis import RedisStore
+
+        return RedisStore.with_client(url=location, namespace='catalog_cache')
+    from litestar.stores.file import FileStore
+
+    return FileStore(path=location)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import importlib.util
+import os
+from typing import TYPE_CHECKING, Literal
+
+from litestar.config.compression import CompressionConfig
+from litestar.datastructures import MutableScopeHeaders
+from litestar.middleware.base import DefineMiddleware
+from litestar.middleware.compression import CompressionMiddleware
+
+from epub import PRECOMPRESSED_MEDIA_TYPES
+
+if TYPE_CHECKING:
+    from litestar.enums import CompressionEncoding
+    from litestar.types import Message, Scope, Send
+
+# handlers with `opt={SKIP_COMPRESSION: True}` are never compressed
+SKIP_COMPRESSION = 'skip_compression'
+
+# responses of these types are sent as they are, compressing them again only costs CPU
+UNCOMPRESSED_MEDIA_TYPES = PRECOMPRESSED_MEDIA_TYPES | {
+    'application/epub+zip', 'application/zip', 'application/gzip', 'application/x-gzip',
+}
+UNCOMPRESSED_MEDIA_TYPE_PREFIXES = ('image/', 'audio/', 'video/')
+
+_HAS_BROTLI = importlib.util.find_spec('brotli') is not None
+
+
+def _media_type(message: Message) -> str:
+    content_type = MutableScopeHeaders.from_message(message=message).get('content-type') or ''
+    return content_type.split(';', 1)[0].strip().lower()
+
+
+def is_compressible(message: Message) -> bool:
+    """Whether the response started by `message` is worth compressing.
+
+    Responses that already carry a `Content-Encoding` are left alone as well.
+    """
+    if MutableScopeHeaders.from_message(message=message).get('content-encoding'):
+        return False
+    media_type = _media_type(message)
+    if media_type == 'image/svg+xml':
+        return True
+    return (media_type not in UNCOMPRESSED_MEDIA_TYPES
+            and not media_type.startswith(UNCOMPRESSED_MEDIA_TYPE_PREFIXES))
+
+
+class MediaTypeCompressionMiddleware(CompressionMiddleware):
+    """`CompressionMiddleware` that passes already compressed media types through untouched.
+
+    The decision is made on the `http.response.start` message, before any of the
+    body has been buffered. Registered with `compression_middleware_from_env()`.
+    """
+
+    def create_compression_send_wrapper(
+        self,
+        send: Send,
+        compression_encoding: Literal[CompressionEncoding.BROTLI, CompressionEncoding.GZIP],
+        scope: Scope,
+    ) -> Send:
+        compressed_send = super().create_compression_send_wrapper(send, compression_encoding, scope)
+        target = compressed_send
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal target
+            if message['type'] == 'http.response.start':
+                target = compressed_send if is_compressible(message) else send
+            await target(message)
+
+        return send_wrapper
+
+
+def compression_config_from_env() -> CompressionConfig:
+    """Response compression settings.
+
+    `COMPRESSION_BACKEND` is `brotli` (default when the `brotli` package is installed,
+    falling back to gzip for clients without brotli support) or `gzip`.
+    `COMPRESSION_GZIP_LEVEL` (default 4) and `COMPRESSION_BROTLI_QUALITY` (default 4)
+    favour CPU time over the last few percent of size, `COMPRESSION_MINIMUM_SIZE`
+    (default 1024) skips bodies too small to gain anything.
+    """
+    backend = os.environ.get('COMPRESSION_BACKEND', 'brotli' if _HAS_BROTLI else 'gzip')
+    return CompressionConfig(
+        backend=backend,  # type: ignore[arg-type]
+        minimum_size=int(os.environ.get('COMPRESSION_MINIMUM_SIZE', '1024')),
+        gzip_compress_level=int(os.environ.get('COMPRESSION_GZIP_LEVEL', '4')),
+        brotli_quality=int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4')),
+        brotli_gzip_fallback=True,
+        exclude_opt_key=SKIP_COMPRESSION,
+    )
+
+
+def compression_middleware_from_env() -> DefineMiddleware:
+    """`MediaTypeCompressionMiddleware` with the settings of `compression_config_from_env()`.
+
+    It goes in `Litestar(middleware=[...])` rather than `compression_config`: Litestar 2.4
+    wraps every route in the stock `CompressionMiddleware` and ignores `middleware_class`.
+    """
+    return DefineMiddleware(MediaTypeCompressionMiddleware, config=compression_config_from_env())
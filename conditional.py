@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, Sequence
+
+from litestar import Request, Response
+from litestar.datastructures import MutableScopeHeaders
+from litestar.exceptions import HTTPException
+from litestar.status_codes import HTTP_304_NOT_MODIFIED
+from sqlalchemy import func, select
+
+if TYPE_CHECKING:
+    from litestar.types import Message, Scope
+    from sqlalchemy import ColumnElement
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from model.base import Base
+
+_STATE_KEY = 'conditional_validator'
+
+
+@dataclass
+class Validator:
+    """Cache validators of a GET response."""
+    etag: str
+    last_modified: datetime | None
+
+
+class NotModifiedException(HTTPException):
+    """Raised by `check_not_modified()`, answered with an empty 304 by `not_modified_handler()`."""
+    status_code = HTTP_304_NOT_MODIFIED
+
+    def __init__(self, validator: Validator) -> None:
+        super().__init__(status_code=HTTP_304_NOT_MODIFIED)
+        self.validator = validator
+
+
+def _headers(validator: Validator) -> dict[str, str]:
+    headers = {'ETag': validator.etag}
+    if validator.last_modified is not None:
+        headers['Last-Modified'] = format_datetime(validator.last_modified, usegmt=True)
+    return headers
+
+
+async def compute_validator(session: AsyncSession,
+                            sources: Sequence[tuple[type[Base], ColumnElement[bool] | None]],
+                            *parts: Any) -> Validator | None:
+    """Build the validators of a response from `max(updated_at)` and `count(*)` of its rows.
+
+    All sources are read in a single round trip. The count catches deletes, which
+    leave no newer `updated_at` behind. `If-Modified-Since` only carries a date, so
+    a response built from more than one row gets no `Last-Modified`: after a delete
+    the date would still match, only the ETag notices.
+
+    Args:
+        session (AsyncSession): session to read with.
+        sources: (model, where clause) pairs of every table the response is built from.
+        *parts: anything else the response depends on, e.g. the path and query string.
+
+    Returns:
+        Validator: or None when the first source has no rows, so the handler can answer 404.
+    """
+    columns = []
+    for model, where in sources:
+        latest = select(func.max(model.updated_at))
+        count = select(func.count()).select_from(model)
+        if where is not None:
+            latest = latest.where(where)
+            count = count.where(where)
+        columns += [latest.scalar_subquery(), count.scalar_subquery()]
+    row = (await session.execute(select(*columns))).one()
+    if row[1] == 0 and sources[0][1] is not None:
+        return None
+
+    last_modified = row[0] if len(sources) == 1 and row[1] == 1 else None
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        last_modified = last_modified.replace(microsecond=0)
+    digest = hashlib.sha1(repr((parts, tuple(row))).encode('utf-8')).hexdigest()
+    return Validator(etag=f'"{digest}"', last_modified=last_modified)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == '*':
+        return True
+    # weak comparison, as required for If-None-Match
+    candidates = {candidate.strip().removeprefix('W/') for candidate in header.split(',')}
+    return etag in candidates
+
+
+def check_not_modified(request: Request, validator: Validator | None) -> None:
+    """Answer 304 when the client already has this version, otherwise remember the validators for the response.
+
+    Call before loading or validating the response body.
+
+    Raises:
+        NotModifiedException: `If-None-Match` or, without it, `If-Modified-Since` matches.
+    """
+    if validator is None:
+        return
+    request.state[_STATE_KEY] = validator
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, validator.etag):
+            raise NotModifiedException(validator)
+        return
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and validator.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if validator.last_modified <= since:
+            raise NotModifiedException(validator)
+
+
+def request_parts(request: Request) -> tuple[str, str]:
+    """Path and query string, so every page or filter gets its own ETag."""
+    return request.url.path, request.url.query
+
+
+def not_modified_handler(_: Request, exc: NotModifiedException) -> Response:
+    return Response(content=b'', status_code=HTTP_304_NOT_MODIFIED, headers=_headers(exc.validator))
+
+
+async def add_validator_headers(message: Message, scope: Scope) -> None:
+    """`before_send` hook adding `ETag`/`Last-Modified` to successful responses of checked handlers."""
+    if message['type'] != 'http.response.start' or message['status'] != 200:
+        return
+    validator = scope.get('state', {}).get(_STATE_KEY)
+    if validator is None:
+        return
+    headers = MutableScopeHeaders.from_message(message=message)
+    for name, value in _headers(validator).items():
+        headers[name] = value
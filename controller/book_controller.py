@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING, List
+
+import anyio
+
+from litestar.exceptions import HTTPException
+from litestar import status_codes
+from advanced_alchemy import SQLAlchemyAsyncRepository
+from litestar import Controller
+from litestar import HttpMethod
+from litestar import Request
+from litestar import Router
+from litestar import get, post, delete
+from litestar import route
+from litestar.datastructures import UploadFile
+from litestar.di import Provide
+from litestar.enums import RequestEncodingType
+from litestar.pagination import OffsetPagination
+from litestar.params import Body, Parameter
+from litestar.repository.filters import LimitOffset, OrderBy
+
+from conditional import check_not_modified, compute_validator, request_parts
+from controller.epub_controller import EpubController
+from controller.image_controller import ImageController
+from controller.manifest_controller import ManifestController
+from controller.meta_data_line_controller import MetaDataController
+from controller.opf_controller import OpfController
+from controller.spine_controller import SpineController
+from jobs import job_queue
+from model.book import Book, BookDTO, BookCreate, book_dto_list
+from model.job import JobDTO
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# bytes copied at a time from an upload to the job's input directory
+UPLOAD_READ_SIZE = 64 * 1024
+
+
+class BookRepository(SQLAlchemyAsyncRepository[Book]):
+    """Book repository."""
+    model_type = Book
+
+    async def delete_book(self, book_id: int) -> Book:
+        """Delete a book with everything scoped to it.
+
+        The `book_id` foreign keys delete the scoped rows with `ON DELETE CASCADE`,
+        every connection enforces them (SQLite ones with `PRAGMA foreign_keys`, see
+        `database.create_engine()`).
+        """
+        obj = await self.get(book_id)
+        await self.session.delete(obj)
+        await self.session.flush()
+        return obj
+
+
+async def provide_book_repo(db_routed_session: AsyncSession) -> BookRepository:
+    return BookRepository(session=db_routed_session)
+
+
+class BookController(Controller):
+    path = '/books'
+    dependencies = {
+        'book_repo': Provide(provide_book_repo),
+    }
+    book_controller_tag = ['Book - CRUD']
+
+    @get(tags=book_controller_tag)
+    async def list_books(
+            self,
+            request: Request,
+            book_repo: BookRepository,
+            limit_offset: LimitOffset,
+    ) -> OffsetPagination[BookDTO]:
+        """List books."""
+        check_not_modified(request, await compute_validator(
+            book_repo.session, [(Book, None)], *request_parts(request)))
+        try:
+            order_by = OrderBy(field_name=Book.id)
+            results, total = await book_repo.list_and_count(limit_offset, order_by)
+            return OffsetPagination[BookDTO](
+                items=book_dto_list.validate_python(results),
+                total=total,
+                limit=limit_offset.limit,
+                offset=limit_offset.offset,
+            )
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @get('/details/{book_id: int}', tags=book_controller_tag)
+    async def get_book_details(self,
+                               request: Request,
+                               book_repo: BookRepository,
+                               book_id: int = Parameter(title='Book ID', description='The book to get.', ),
+                               ) -> BookDTO:
+        check_not_modified(request, await compute_validator(
+            book_repo.session, [(Book, Book.id == book_id)], *request_parts(request)))
+        try:
+            obj = await book_repo.get(book_id)
+            return BookDTO.model_validate(obj)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @post(tags=book_controller_tag)
+    async def create_book(self, book_repo: BookRepository, data: BookCreate, ) -> BookDTO:
+        """Create a book, its metadata, manifest and spine live under `/books/{book_id}`."""
+        try:
+            _data = data.model_dump(exclude_unset=True, by_alias=False, exclude_none=True)
+            obj = await book_repo.add(Book(**_data))
+            await book_repo.session.commit()
+            return BookDTO.model_validate(obj)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @post('/import', tags=book_controller_tag, status_code=status_codes.HTTP_202_ACCEPTED)
+    async def import_book_files(
+            self,
+            book_repo: BookRepository,
+            data: List[UploadFile] = Body(media_type=RequestEncodingType.MULTI_PART,
+                                          title='EPUB or OPF files', ),
+    ) -> JobDTO:
+        """Queue an `opf_import` job creating a book from each uploaded .epub or .opf file.
+
+        Poll `/jobs/{job_id}` for its progress, the finished job's `result` lists the
+        imported books in `items` and the files that could not be read in `errors`.
+        """
+        input_dir = job_queue.input_dir()
+        try:
+            files = []
+            for index, upload in enumerate(data):
+                path = input_dir / f'{index}{Path(upload.filename or "").suffix.lower()}'
+                async with await anyio.open_file(path, 'wb') as file:
+                    while chunk := await upload.read(UPLOAD_READ_SIZE):
+                        await file.write(chunk)
+                files.append([upload.filename or path.name, str(path.relative_to(job_queue.result_dir))])
+            obj = await job_queue.submit(book_repo.session, 'opf_import',
+                                         {'files': files, 'input_dir': str(input_dir.relative_to(job_queue.result_dir))},
+                                         total=len(files))
+            return JobDTO.model_validate(obj)
+        except Exception as ex:
+            shutil.rmtree(input_dir, ignore_errors=True)
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @route('/{book_id:int}',
+           http_method=[HttpMethod.PUT, HttpMethod.PATCH],
+           tags=book_controller_tag)
+    async def update_book(
+            self,
+            book_repo: BookRepository,
+            data: BookCreate,
+            book_id: int = Parameter(title='Book ID', description='The book to update.', ),
+    ) -> BookDTO:
+        try:
+            _data = data.model_dump(exclude_unset=True, exclude_none=True)
+            _data.update({'id': book_id})
+            obj = await book_repo.update(Book(**_data))
+            await book_repo.session.commit()
+            return BookDTO.model_validate(obj)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @delete('/{book_id:int}', tags=book_controller_tag)
+    async def delete_book(
+            self,
+            book_repo: BookRepository,
+            book_id: int = Parameter(title='Book ID', description='The book to delete.', ),
+    ) -> None:
+        """Delete a book together with its metadata, manifest and spine."""
+        try:
+            _ = await book_repo.delete_book(book_id)
+            await book_repo.session.commit()
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+
+# everything that belongs to one book, `book_id` reaches the handlers and repository providers
+book_router = Router(
+    path='/books/{book_id:int}',
+    route_handlers=[MetaDataController, ManifestController, SpineController, OpfController, EpubController,
+                   ImageController],
+)
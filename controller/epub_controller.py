@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from litestar import Controller
+from litestar import get, post
+from litestar import status_codes
+from litestar.exceptions import HTTPException
+from litestar.response import Stream
+
+from compression import SKIP_COMPRESSION
+from epub import MissingContentError, manifest_files, stream_epub
+from jobs import job_queue
+from model.book import Book
+from model.job import JobDTO
+from opf import MissingIdentifierError, unique_identifier
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+
+class EpubController(Controller):
+    path = '/epub'
+    epub_controller_tag = ['EPUB - Export']
+
+    @get(tags=epub_controller_tag, opt={SKIP_COMPRESSION: True})
+    async def export_epub(self,
+                          db_routed_engine: AsyncEngine,
+                          book_id: int,
+                          ) -> Stream:
+        """Stream the .epub of a book.
+
+        Content files and the `<dc:identifier>` the package names are checked
+        before the first byte is sent, so a missing one is a 404 instead of a
+        truncated download or an invalid EPUB.
+        """
+        try:
+            files = await manifest_files(db_routed_engine, book_id)
+            identifier = await unique_identifier(db_routed_engine, book_id)
+        except (MissingContentError, MissingIdentifierError) as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+        return Stream(stream_epub(db_routed_engine, book_id, files, identifier),
+                      media_type='application/epub+zip',
+                      headers={'Content-Disposition': f'attachment; filename="book-{book_id}.epub"'})
+
+    @post('/job', tags=epub_controller_tag, status_code=status_codes.HTTP_202_ACCEPTED)
+    async def queue_epub_export(self, db_session: AsyncSession, book_id: int, ) -> JobDTO:
+        """Queue an `epub_export` job, download the .epub from `/jobs/{job_id}/result` once it succeeded."""
+        try:
+            await db_session.get_one(Book, book_id)
+            obj = await job_queue.submit(db_session, 'epub_export', {'book_id': book_id})
+            return JobDTO.model_validate(obj)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from litestar import Controller
+from litestar import Response
+from litestar import get
+from litestar import status_codes
+from sqlalchemy import text
+
+from database import PoolStats, pool_stats
+from logger import logger
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@dataclass
+class DatabaseHealth:
+    status: str
+    dialect: str
+    latency_ms: Optional[float]
+    pool: PoolStats
+    detail: Optional[str] = None
+
+
+class HealthController(Controller):
+    path = '/health'
+    health_controller_tag = ['Health']
+
+    @get('/db', tags=health_controller_tag, cache=False)
+    async def get_db_health(self, db_engine: AsyncEngine) -> Response[DatabaseHealth]:
+        """Ping the database and report the connection pool.
+
+        `checked_out` against `size + max_overflow`, and the checkout wait times,
+        show whether the pool is sized right for the worker's concurrency; the sum of
+        `size + max_overflow` over all workers must stay below Postgres `max_connections`.
+        Answers 503 when the database cannot be reached.
+        """
+        start = time.perf_counter()
+        try:
+            async with db_engine.connect() as conn:
+                await conn.execute(text('SELECT 1'))
+        except Exception as ex:
+            logger.error('db health check failed ' + str(ex))
+            health = DatabaseHealth(status='unavailable', dialect=db_engine.dialect.name, latency_ms=None,
+                                    pool=pool_stats(db_engine.pool), detail=str(ex))
+            return Response(health, status_code=status_codes.HTTP_503_SERVICE_UNAVAILABLE)
+        latency_ms = round((time.perf_counter() - start) * 1000, 3)
+        return Response(DatabaseHealth(status='ok', dialect=db_engine.dialect.name, latency_ms=latency_ms,
+                                       pool=pool_stats(db_engine.pool)))
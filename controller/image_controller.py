@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from typing import Literal, Optional
+
+import anyio
+from litestar.exceptions import HTTPException, ValidationException
+from litestar import status_codes
+from litestar import Controller
+from litestar import Request
+from litestar import get
+from litestar.di import Provide
+from litestar.params import Parameter
+
+from blob_store import RangeFileResponse, blob_store
+from compression import SKIP_COMPRESSION
+from conditional import Validator, check_not_modified
+from controller.manifest_controller import ManifestItemRepository, provide_manifest_item_repo
+from images import (
+    IMAGE_MAX_DIMENSION,
+    IMAGE_MEDIA_TYPES,
+    IMAGE_PRESETS,
+    ImageFormat,
+    ImageSpec,
+    UndecodableImage,
+    image_derivatives,
+)
+from model.blob import Blob
+from model.manifest_item import ManifestItem
+
+
+async def provide_image_spec(
+        preset: Optional[str] = Parameter(query='preset', required=False,
+                                          description=f'one of {", ".join(IMAGE_PRESETS)}, overrides the rest'),
+        width: Optional[int] = Parameter(query='width', required=False, ge=1, le=IMAGE_MAX_DIMENSION),
+        height: Optional[int] = Parameter(query='height', required=False, ge=1, le=IMAGE_MAX_DIMENSION),
+        fit: Literal['contain', 'cover'] = Parameter(query='fit', default='contain'),
+        image_format: Optional[ImageFormat] = Parameter(query='format', required=False,
+                                                        description="the source's format when left out"),
+        quality: int = Parameter(query='quality', default=80, ge=1, le=100),
+) -> ImageSpec:
+    if preset is not None:
+        if preset not in IMAGE_PRESETS:
+            raise ValidationException(detail=f'unknown preset {preset}, one of {", ".join(IMAGE_PRESETS)}')
+        return IMAGE_PRESETS[preset]
+    if width is None and height is None:
+        raise ValidationException(detail='a preset, width or height is required')
+    return ImageSpec(width=width, height=height, fit=fit, format=image_format, quality=quality)
+
+
+async def derivative_response(request: Request, item: ManifestItem, blob: Blob, spec: ImageSpec) -> RangeFileResponse:
+    try:
+        spec = spec.for_media_type(item.media_type)
+    except ValueError as ex:
+        raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+    # known before the derivative is, a client that has it costs no resizing
+    etag = f'"{blob.sha256}-{spec.name}"'
+    check_not_modified(request, Validator(etag=etag, last_modified=None))
+    try:
+        path = await image_derivatives.get(blob_store.path(blob.sha256), blob.sha256, spec)
+    except UndecodableImage as ex:
+        raise HTTPException(detail=f'{item.href}: {ex}', status_code=status_codes.HTTP_422_UNPROCESSABLE_ENTITY)
+    size = (await anyio.Path(path).stat()).st_size
+    return RangeFileResponse(path, size=size, etag=etag, media_type=IMAGE_MEDIA_TYPES[spec.format])
+
+
+class ImageController(Controller):
+    path = '/images'
+    dependencies = {
+        'manifest_item_repo': Provide(provide_manifest_item_repo),
+        'image_spec': Provide(provide_image_spec),
+    }
+    image_controller_tag = ['Image - Derivatives']
+
+    @get('/cover', tags=image_controller_tag, opt={SKIP_COMPRESSION: True})
+    async def get_cover_image(self,
+                              request: Request,
+                              manifest_item_repo: ManifestItemRepository,
+                              image_spec: ImageSpec,
+                              ) -> RangeFileResponse:
+        """The book's cover image scaled to `width` x `height` or a preset, e.g. `?preset=thumbnail`."""
+        try:
+            obj, blob = await manifest_item_repo.get_cover()
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+        return await derivative_response(request, obj, blob, image_spec)
+
+    @get('/{manifest_item_id: int}', tags=image_controller_tag, opt={SKIP_COMPRESSION: True})
+    async def get_image(self,
+                        request: Request,
+                        manifest_item_repo: ManifestItemRepository,
+                        image_spec: ImageSpec,
+                        manifest_item_id: int = Parameter(title='Manifest Item ID',
+                                                          description='The image to get a derivative of.', ),
+                        ) -> RangeFileResponse:
+        """An image of the manifest scaled to `width` x `height` or a preset, in `format` if given.
+
+        A derivative is generated on its first request and kept for the next.
+        """
+        try:
+            obj, blob = await manifest_item_repo.get_content(manifest_item_id)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+        return await derivative_response(request, obj, blob, image_spec)
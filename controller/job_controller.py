@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+from advanced_alchemy import SQLAlchemyAsyncRepository
+from litestar import Controller
+from litestar import get, post, delete
+from litestar import status_codes
+from litestar.di import Provide
+from litestar.exceptions import HTTPException
+from litestar.pagination import OffsetPagination
+from litestar.params import Parameter
+from litestar.repository.filters import CollectionFilter, LimitOffset, OrderBy
+from litestar.response import File
+
+from compression import SKIP_COMPRESSION
+from jobs import job_queue
+from model.job import JOB_FINISHED, JOB_SUCCEEDED, Job, JobDTO, job_dto_list
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class JobRepository(SQLAlchemyAsyncRepository[Job]):
+    """Job repository."""
+    model_type = Job
+
+
+async def provide_job_repo(db_session: AsyncSession) -> JobRepository:
+    # job state changes every second while it runs, so it is always read from the primary
+    return JobRepository(session=db_session)
+
+
+class JobController(Controller):
+    path = '/jobs'
+    dependencies = {
+        'job_repo': Provide(provide_job_repo),
+    }
+    job_controller_tag = ['Job']
+
+    @get(tags=job_controller_tag, cache=False)
+    async def list_jobs(
+            self,
+            job_repo: JobRepository,
+            limit_offset: LimitOffset,
+            status: Optional[str] = Parameter(required=False, description='Only jobs with this status.', ),
+    ) -> OffsetPagination[JobDTO]:
+        """List jobs, newest first."""
+        try:
+            filters = [limit_offset, OrderBy(field_name=Job.id, sort_order='desc')]
+            if status:
+                filters.append(CollectionFilter(field_name='status', values=[status]))
+            results, total = await job_repo.list_and_count(*filters)
+            return OffsetPagination[JobDTO](
+                items=job_dto_list.validate_python(results),
+                total=total,
+                limit=limit_offset.limit,
+                offset=limit_offset.offset,
+            )
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @get('/{job_id:int}', tags=job_controller_tag, cache=False)
+    async def get_job(self,
+                      job_repo: JobRepository,
+                      job_id: int = Parameter(title='Job ID', description='The job to get.', ),
+                      ) -> JobDTO:
+        """Status and progress of a job, poll this until `status` is succeeded, failed or cancelled."""
+        try:
+            obj = await job_repo.get(job_id)
+            return JobDTO.model_validate(obj)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @post('/{job_id:int}/cancel', tags=job_controller_tag, status_code=status_codes.HTTP_202_ACCEPTED)
+    async def cancel_job(self,
+                         job_repo: JobRepository,
+                         job_id: int = Parameter(title='Job ID', description='The job to cancel.', ),
+                         ) -> JobDTO:
+        """Cancel a queued or running job.
+
+        A running job stops at its next progress update, until then its status
+        stays running with `cancel_requested` set.
+        """
+        try:
+            obj = await job_queue.cancel(job_repo.session, job_id)
+            return JobDTO.model_validate(obj)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @get('/{job_id:int}/result', tags=job_controller_tag, cache=False, opt={SKIP_COMPRESSION: True})
+    async def download_job_result(self,
+                                  job_repo: JobRepository,
+                                  job_id: int = Parameter(title='Job ID', description='The job to download.', ),
+                                  ) -> File:
+        """Download the file a succeeded job wrote, as it is; an .epub is a zip already."""
+        try:
+            obj = await job_repo.get(job_id)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+        path = job_queue.result_dir / obj.result_file if obj.result_file else None
+        if obj.status != JOB_SUCCEEDED or path is None or not path.is_file():
+            raise HTTPException(detail=f'job {job_id} has no result file',
+                                status_code=status_codes.HTTP_404_NOT_FOUND)
+        return File(path=path, filename=path.name)
+
+    @delete('/{job_id:int}', tags=job_controller_tag)
+    async def delete_job(self,
+                         job_repo: JobRepository,
+                         job_id: int = Parameter(title='Job ID', description='The job to delete.', ),
+                         ) -> None:
+        """Delete a finished job together with its result file."""
+        try:
+            obj = await job_repo.get(job_id)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+        if obj.status not in JOB_FINISHED:
+            raise HTTPException(detail=f'job {job_id} is {obj.status}, cancel it first',
+                                status_code=status_codes.HTTP_409_CONFLICT)
+        job_queue.remove_files(job_id, obj.params)
+        await job_repo.delete(job_id)
+        await job_repo.session.commit()
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, AsyncIterable
+
+import advanced_alchemy
+from advanced_alchemy.exceptions import NotFoundError
+from litestar.exceptions import HTTPException
+from litestar import status_codes
+from litestar import Controller
+from litestar import HttpMethod
+from litestar import Request
+from litestar import get, post, put, delete
+from litestar import route
+from litestar.di import Provide
+from litestar.pagination import OffsetPagination
+from litestar.params import Parameter
+from litestar.repository.filters import LimitOffset, OrderBy
+from sqlalchemy import and_, case, or_, select
+
+from blob_store import BlobResponse, BlobStore, blob_etag, blob_store, save_blob
+from compression import SKIP_COMPRESSION
+from conditional import Validator, check_not_modified, compute_validator, request_parts
+from model.blob import Blob
+from model.manifest_item import ManifestItem, ManifestItemDTO, ManifestItemCreate, manifest_item_dto_list
+from model.meta_data_attribute import MetaDataAttribute
+from model.meta_data_attribute_value import MetaDataAttributeValue
+from model.meta_data_line import MetaDataLine
+from shared import SQLAlchemyAsyncScopedRepository
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class ManifestItemRepository(SQLAlchemyAsyncScopedRepository[ManifestItem]):
+    """Manifest item repository."""
+    model_type = ManifestItem
+
+    async def get_content(self, item_id: int) -> tuple[ManifestItem, Blob]:
+        """The item and the blob of its uploaded file.
+
+        Raises:
+            NotFoundError: no such item in the book, or nothing uploaded for it yet.
+        """
+        statement = self.scoped(select(ManifestItem, Blob).join(Blob, Blob.sha256 == ManifestItem.blob_sha256)
+                                .where(ManifestItem.id == item_id))
+        row = (await self.session.execute(statement)).one_or_none()
+        if row is None:
+            raise NotFoundError(f'no content for manifest item {item_id}')
+        return row.ManifestItem, row.Blob
+
+    async def get_cover(self) -> tuple[ManifestItem, Blob]:
+        """The cover image and its blob.
+
+        That is the item with the EPUB 3 `cover-image` property, or else the item
+        an EPUB 2 `<meta name="cover" content="..."/>` line names.
+
+        Raises:
+            NotFoundError: the book has no cover image with an uploaded file.
+        """
+        is_cover_image = ManifestItem.properties.contains('cover-image')
+        named_cover = (select(MetaDataAttributeValue.attribute_value)
+                       .join(MetaDataLine, and_(MetaDataLine.book_id == MetaDataAttributeValue.book_id,
+                                                MetaDataLine.id == MetaDataAttributeValue.line_id))
+                       .join(MetaDataAttribute, MetaDataAttribute.id == MetaDataAttributeValue.attribute_id)
+                       .where(MetaDataAttributeValue.book_id == ManifestItem.book_id,
+                              MetaDataLine.name == 'cover', MetaDataAttribute.name == 'content'))
+        statement = self.scoped(select(ManifestItem, Blob).join(Blob, Blob.sha256 == ManifestItem.blob_sha256)
+                                .where(or_(is_cover_image, ManifestItem.item_id.in_(named_cover)))
+                                .order_by(case((is_cover_image, 0), else_=1), ManifestItem.id)
+                                .limit(1))
+        row = (await self.session.execute(statement)).one_or_none()
+        if row is None:
+            raise NotFoundError('no cover image')
+        return row.ManifestItem, row.Blob
+
+    async def set_content(self, item_id: int, chunks: AsyncIterable[bytes],
+                          store: BlobStore = blob_store) -> ManifestItem:
+        """Store `chunks` as the item's file, identical files of any book share one blob."""
+        obj = await self.get_one(id=item_id)
+        blob = await store.put(chunks)
+        await save_blob(self.session, blob)
+        obj.blob_sha256 = blob.sha256
+        await self.session.flush()
+        return obj
+
+
+async def provide_manifest_item_repo(db_routed_session: AsyncSession, book_id: int) -> ManifestItemRepository:
+    return ManifestItemRepository(session=db_routed_session, scope={'book_id': book_id})
+
+
+class ManifestController(Controller):
+    path = '/manifest'
+    dependencies = {
+        'manifest_item_repo': Provide(provide_manifest_item_repo),
+    }
+    manifest_controller_tag = ['Manifest Item - CRUD']
+
+    @get(tags=manifest_controller_tag)
+    async def list_manifest_items(
+            self,
+            request: Request,
+            manifest_item_repo: ManifestItemRepository,
+            limit_offset: LimitOffset,
+            book_id: int,
+    ) -> OffsetPagination[ManifestItemDTO]:
+        """List the manifest items of a book."""
+        check_not_modified(request, await compute_validator(
+            manifest_item_repo.session, [(ManifestItem, ManifestItem.book_id == book_id)], *request_parts(request)))
+        try:
+            order_by = OrderBy(field_name=ManifestItem.id)
+            results, total = await manifest_item_repo.list_and_count(limit_offset, order_by)
+            return OffsetPagination[ManifestItemDTO](
+                items=manifest_item_dto_list.validate_python(results),
+                total=total,
+                limit=limit_offset.limit,
+                offset=limit_offset.offset,
+            )
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @get('/details/{manifest_item_id: int}', tags=manifest_controller_tag)
+    async def get_manifest_item_details(self,
+                                        request: Request,
+                                        manifest_item_repo: ManifestItemRepository,
+                                        book_id: int,
+                                        manifest_item_id: int = Parameter(title='Manifest Item ID',
+                                                                          description='The item to get.', ),
+                                        ) -> ManifestItemDTO:
+        check_not_modified(request, await compute_validator(
+            manifest_item_repo.session,
+            [(ManifestItem, and_(ManifestItem.book_id == book_id, ManifestItem.id == manifest_item_id))],
+            *request_parts(request)))
+        try:
+            obj = await manifest_item_repo.get_one(id=manifest_item_id)
+            return ManifestItemDTO.model_validate(obj)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @route('/{manifest_item_id: int}/content',
+           http_method=[HttpMethod.GET, HttpMethod.HEAD],
+           tags=manifest_controller_tag, opt={SKIP_COMPRESSION: True})
+    async def get_manifest_item_content(self,
+                                        request: Request,
+                                        manifest_item_repo: ManifestItemRepository,
+                                        manifest_item_id: int = Parameter(title='Manifest Item ID',
+                                                                          description='The item to get the file of.', ),
+                                        ) -> BlobResponse:
+        """The uploaded file of a manifest item with its media type, a `Range` request gets part of it.
+
+        HEAD answers with the headers alone, e.g. the size and ETag before a ranged download.
+        """
+        try:
+            obj, blob = await manifest_item_repo.get_content(manifest_item_id)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+        check_not_modified(request, Validator(etag=blob_etag(blob.sha256), last_modified=None))
+        return BlobResponse(blob, media_type=obj.media_type)
+
+    @put('/{manifest_item_id: int}/content', tags=manifest_controller_tag)
+    async def upload_manifest_item_content(
+            self,
+            request: Request,
+            manifest_item_repo: ManifestItemRepository,
+            manifest_item_id: int = Parameter(title='Manifest Item ID', description='The item to store the file of.', ),
+    ) -> ManifestItemDTO:
+        """Store the request body as the file of a manifest item.
+
+        Files are kept once by their SHA-256, a font or stylesheet that every book
+        uses is stored a single time; `blob_sha256` of the item names its file.
+        """
+        try:
+            obj = await manifest_item_repo.set_content(manifest_item_id, request.stream())
+            await manifest_item_repo.session.commit()
+            return ManifestItemDTO.model_validate(obj)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @post(tags=manifest_controller_tag)
+    async def create_manifest_item(self,
+                                   manifest_item_repo: ManifestItemRepository,
+                                   data: ManifestItemCreate, ) -> ManifestItemDTO:
+        """Create a manifest item, the ID attribute must be unique within the book."""
+        try:
+            _data = data.model_dump(exclude_unset=True, by_alias=False, exclude_none=True)
+            obj = await manifest_item_repo.add(ManifestItem(**_data))
+            await manifest_item_repo.session.commit()
+            return ManifestItemDTO.model_validate(obj)
+        except advanced_alchemy.exceptions.ConflictError as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_409_CONFLICT)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @route('/{manifest_item_id: int}',
+           http_method=[HttpMethod.PUT, HttpMethod.PATCH],
+           tags=manifest_controller_tag)
+    async def update_manifest_item(
+            self,
+            manifest_item_repo: ManifestItemRepository,
+            data: ManifestItemCreate,
+            manifest_item_id: int = Parameter(title='Manifest Item ID', description='The item to update.', ),
+    ) -> ManifestItemDTO:
+        """Update a manifest item, renaming an ID that the spine refers to is rejected."""
+        try:
+            _data = data.model_dump(exclude_unset=True, exclude_none=True)
+            _data.update({'id': manifest_item_id})
+            obj = await manifest_item_repo.update(ManifestItem(**_data))
+            await manifest_item_repo.session.commit()
+            return ManifestItemDTO.model_validate(obj)
+        except advanced_alchemy.exceptions.ConflictError as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_409_CONFLICT)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @delete('/{manifest_item_id: int}', tags=manifest_controller_tag)
+    async def delete_manifest_item(
+            self,
+            manifest_item_repo: ManifestItemRepository,
+            manifest_item_id: int = Parameter(title='Manifest Item ID', description='The item to delete.', ),
+    ) -> None:
+        """Delete a manifest item, items still in the spine are rejected."""
+        try:
+            _ = await manifest_item_repo.delete(manifest_item_id)
+            await manifest_item_repo.session.commit()
+        except advanced_alchemy.exceptions.ConflictError as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_409_CONFLICT)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
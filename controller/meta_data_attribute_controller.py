@@ -1,22 +1,30 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List
 
 import advanced_alchemy
-from litestar.exceptions import HTTPException
+from litestar.exceptions import HTTPException, ValidationException
 from litestar import status_codes
 from advanced_alchemy import SQLAlchemyAsyncRepository
 from litestar import Controller
 from litestar import HttpMethod
+from litestar import Request
 from litestar import get, post, delete
 from litestar import route
 from litestar.di import Provide
 from litestar.pagination import OffsetPagination
 from litestar.params import Parameter
 from litestar.repository.filters import LimitOffset, OrderBy
-from pydantic import TypeAdapter
 
-from model.meta_data_attribute import MetaDataAttribute, MetaDataAttributeDTO, MetaDataAttributeCreate
+from cache import meta_data_attribute_cache
+from conditional import check_not_modified, compute_validator, request_parts
+from search import SQLAlchemyAsyncSearchRepository
+from shared import (BulkResult, KeysetPagination, KeysetParams, SQLAlchemyAsyncBulkRepository,
+                    SQLAlchemyAsyncKeysetRepository)
+
+from model.meta_data_attribute import (MetaDataAttribute, MetaDataAttributeDTO, MetaDataAttributeCreate,
+                                       MetaDataAttributeStruct, MetaDataAttributeUpdate, meta_data_attribute_dto_list,
+                                       meta_data_attribute_search)
 from model.meta_data_attribute_value import MetaDataAttributeValue
 
 if TYPE_CHECKING:
@@ -25,16 +33,22 @@ if TYPE_CHECKING:
 from logger import logger
 
 
-class MetaDataAttributeRepository(SQLAlchemyAsyncRepository[MetaDataAttribute]):
+class MetaDataAttributeRepository(SQLAlchemyAsyncKeysetRepository[MetaDataAttribute],
+                                  SQLAlchemyAsyncBulkRepository[MetaDataAttribute],
+                                  SQLAlchemyAsyncSearchRepository[MetaDataAttribute]):
     """Attribute repository."""
     model_type = MetaDataAttribute
+    struct_type = MetaDataAttributeStruct
+    search_index = meta_data_attribute_search
+    keyset_columns = ('sort_order', 'name', 'id')
+    referenced_by = (MetaDataAttributeValue.attribute_id,)
 
 
-async def provide_meta_data_attribute_repo(db_session: AsyncSession) -> MetaDataAttributeRepository:
+async def provide_meta_data_attribute_repo(db_routed_session: AsyncSession) -> MetaDataAttributeRepository:
     """This provides a simple example demonstrating how to override the join options
     for the repository."""
     return MetaDataAttributeRepository(
-        session=db_session
+        session=db_routed_session
     )
 
 
@@ -49,41 +63,106 @@ class MetaDataAttributeController(Controller):
     @get(tags=attribute_controller_tag)
     async def list_meta_data_attribute_items(
             self,
+            request: Request,
             attribute_repo: MetaDataAttributeRepository,
             limit_offset: LimitOffset,
-    ) -> OffsetPagination[MetaDataAttributeDTO]:
+    ) -> OffsetPagination[MetaDataAttributeStruct]:
         """List items."""
         # alternative way to query tables
         # stmt = lambda_stmt(lambda: select(Attribute))
         # stmt += lambda s: s.where(Attribute.tag_id == tag_id)
         # results, total = await attribute_repo.list_and_count(limit_offset, statement=stmt)
 
+        validator = await compute_validator(
+            attribute_repo.session, [(MetaDataAttribute, None)], *request_parts(request))
+        check_not_modified(request, validator)
         try:
-            order_by1 = OrderBy(field_name=MetaDataAttribute.sort_order)
-            order_by2 = OrderBy(field_name=MetaDataAttribute.name)
-            results, total = await attribute_repo.list_and_count(limit_offset,
-                                                                 order_by1,
-                                                                 order_by2)
-            type_adapter = TypeAdapter(list[MetaDataAttributeDTO])
-            return OffsetPagination[MetaDataAttributeDTO](
-                items=type_adapter.validate_python(results),
-                total=total,
-                limit=limit_offset.limit,
-                offset=limit_offset.offset,
-            )
+            async def load() -> OffsetPagination[MetaDataAttributeStruct]:
+                order_by1 = OrderBy(field_name=MetaDataAttribute.sort_order)
+                order_by2 = OrderBy(field_name=MetaDataAttribute.name)
+                results, total = await attribute_repo.list_structs_and_count(limit_offset,
+                                                                             order_by1,
+                                                                             order_by2)
+                return OffsetPagination[MetaDataAttributeStruct](
+                    items=results,
+                    total=total,
+                    limit=limit_offset.limit,
+                    offset=limit_offset.offset,
+                )
+
+            key = f'page:{limit_offset.limit}:{limit_offset.offset}'
+            return await meta_data_attribute_cache.get_or_load(key, load, OffsetPagination[MetaDataAttributeStruct],
+                                                               version=validator.etag if validator else None)
         except advanced_alchemy.exceptions.RepositoryError as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
 
+    @get('/cursor', tags=attribute_controller_tag)
+    async def list_meta_data_attribute_items_by_cursor(
+            self,
+            request: Request,
+            attribute_repo: MetaDataAttributeRepository,
+            keyset: KeysetParams,
+    ) -> KeysetPagination[MetaDataAttributeStruct]:
+        """List items using keyset (cursor) pagination.
+
+        Pass `next_cursor`/`prev_cursor` from the previous response as `cursor`
+        to move between pages, `count` selects how the total is worked out.
+        """
+        validator = await compute_validator(
+            attribute_repo.session, [(MetaDataAttribute, None)], *request_parts(request))
+        check_not_modified(request, validator)
+        try:
+            async def load() -> KeysetPagination[MetaDataAttributeStruct]:
+                return await attribute_repo.list_keyset(keyset, structs=True)
+
+            key = f'cursor:{keyset.page_size}:{keyset.count}:{keyset.cursor.encode() if keyset.cursor else ""}'
+            return await meta_data_attribute_cache.get_or_load(key, load, KeysetPagination[MetaDataAttributeStruct],
+                                                               version=validator.etag if validator else None)
+        except ValidationException:
+            raise
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @get('/search', tags=attribute_controller_tag)
+    async def search_meta_data_attribute_items(
+            self,
+            request: Request,
+            attribute_repo: MetaDataAttributeRepository,
+            keyset: KeysetParams,
+            q: str = Parameter(query='q', min_length=1, max_length=100,
+                               description='Text to look for in the name.', ),
+    ) -> KeysetPagination[MetaDataAttributeStruct]:
+        """Search attributes by name, best matches first.
+
+        Pass `next_cursor` from the previous response as `cursor` for the next page.
+        """
+        check_not_modified(request, await compute_validator(
+            attribute_repo.session, [(MetaDataAttribute, None)], *request_parts(request)))
+        try:
+            return await attribute_repo.search(q, keyset)
+        except ValidationException:
+            raise
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
     @get('/details/{attribute_id: int}',
          tags=attribute_controller_tag)
     async def get_meta_data_attribute_details(self,
+                                              request: Request,
                                               attribute_repo: MetaDataAttributeRepository,
                                               attribute_id: int = Parameter(title='Meta Data Tag ID',
                                                                             description='The meta_data to update.', ),
-                                              ) -> MetaDataAttributeDTO:
+                                              ) -> MetaDataAttributeStruct:
+        validator = await compute_validator(
+            attribute_repo.session, [(MetaDataAttribute, MetaDataAttribute.id == attribute_id)],
+            *request_parts(request))
+        check_not_modified(request, validator)
         try:
-            obj = await attribute_repo.get_one(id=attribute_id)
-            return MetaDataAttributeDTO.model_validate(obj)
+            async def load() -> MetaDataAttributeStruct:
+                return await attribute_repo.get_struct(attribute_id)
+
+            return await meta_data_attribute_cache.get_or_load(f'id:{attribute_id}', load, MetaDataAttributeStruct,
+                                                               version=validator.etag if validator else None)
         except Exception as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
 
@@ -96,6 +175,7 @@ class MetaDataAttributeController(Controller):
             _data = data.model_dump(exclude_unset=True, by_alias=False, exclude_defaults=True)
             obj = await attribute_repo.add(MetaDataAttribute(**_data))
             await attribute_repo.session.commit()
+            await meta_data_attribute_cache.invalidate()
             return MetaDataAttributeDTO.model_validate(obj)
         except Exception as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
@@ -115,6 +195,7 @@ class MetaDataAttributeController(Controller):
             # verify that the record is there before trying operation
             obj = await attribute_repo.update(MetaDataAttribute(**_data), with_for_update=True)
             await attribute_repo.session.commit()
+            await meta_data_attribute_cache.invalidate()
             return MetaDataAttributeCreate.model_validate(obj)
         except Exception as ex:
             logger.error(ex)
@@ -130,10 +211,71 @@ class MetaDataAttributeController(Controller):
             # verify that the record is there before trying operation
             _ = await attribute_repo.delete(attribute_id)
             await attribute_repo.session.commit()
+            await meta_data_attribute_cache.invalidate()
         except Exception as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
 
 
+    @post('/bulk', tags=attribute_controller_tag)
+    async def create_meta_data_attributes(self,
+                                          attribute_repo: MetaDataAttributeRepository,
+                                          data: List[MetaDataAttributeCreate],
+                                          ) -> BulkResult[MetaDataAttributeDTO]:
+        """Create many attributes in one transaction.
+
+        Entries the table would refuse, e.g. a name longer than its column, are reported
+        in `errors`, the rest are saved.
+        """
+        try:
+            result = await attribute_repo.bulk_add(
+                [item.model_dump(exclude_unset=True, by_alias=False, exclude_defaults=True) for item in data])
+            await attribute_repo.session.commit()
+            await meta_data_attribute_cache.invalidate()
+            return BulkResult[MetaDataAttributeDTO](
+                items=meta_data_attribute_dto_list.validate_python(result.items), errors=result.errors)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @route('/bulk',
+           http_method=[HttpMethod.PUT, HttpMethod.PATCH],
+           tags=attribute_controller_tag)
+    async def update_meta_data_attributes(self,
+                                          attribute_repo: MetaDataAttributeRepository,
+                                          data: List[MetaDataAttributeUpdate],
+                                          ) -> BulkResult[MetaDataAttributeDTO]:
+        """Update many attributes in one transaction, unknown ids are reported in `errors`."""
+        try:
+            result = await attribute_repo.bulk_update(
+                [item.model_dump(exclude_unset=True, exclude_defaults=True) | {'id': item.id} for item in data])
+            await attribute_repo.session.commit()
+            await meta_data_attribute_cache.invalidate()
+            return BulkResult[MetaDataAttributeDTO](items=meta_data_attribute_dto_list.validate_python(result.items),
+                                                    errors=result.errors)
+        except Exception as ex:
+            logger.error(ex)
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @delete('/bulk', status_code=status_codes.HTTP_200_OK, tags=attribute_controller_tag)
+    async def delete_meta_data_attributes(self,
+                                          attribute_repo: MetaDataAttributeRepository,
+                                          attribute_ids: List[int] = Parameter(query='id',
+                                                                               title='Meta Data Attribute IDs',
+                                                                               description='Attributes to delete.', ),
+                                          ) -> BulkResult[MetaDataAttributeDTO]:
+        """Delete many attributes in one transaction.
+
+        Unknown ids and attributes a line still has a value of are reported in `errors`, the rest are
+        deleted.
+        """
+        try:
+            result = await attribute_repo.bulk_delete(attribute_ids)
+            await attribute_repo.session.commit()
+            await meta_data_attribute_cache.invalidate()
+            return BulkResult[MetaDataAttributeDTO](items=meta_data_attribute_dto_list.validate_python(result.items),
+                                                    errors=result.errors)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
 class MetaDataAttributeValueRepository(SQLAlchemyAsyncRepository[MetaDataAttributeValue]):
     """MetaData Tag repository."""
 
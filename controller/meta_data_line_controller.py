@@ -1,56 +1,225 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, Any, List, Optional
 
-from litestar.exceptions import HTTPException
+from litestar.exceptions import HTTPException, ValidationException
 from litestar import status_codes
-from advanced_alchemy import SQLAlchemyAsyncRepository
 from litestar import Controller
 from litestar import HttpMethod
+from litestar import Request
 from litestar import get, post, delete
 from litestar import route
 from litestar.di import Provide
 from litestar.pagination import OffsetPagination
 from litestar.params import Parameter
-from litestar.repository.filters import LimitOffset, OrderBy
-from pydantic import TypeAdapter
+from litestar.repository.filters import CollectionFilter, FilterTypes, LimitOffset, OrderBy
+from sqlalchemy import Row, Select, and_, func, select, union_all
+from sqlalchemy.orm import joinedload, selectinload
 
-from model.meta_data_attribute_value import MetaDataAttributeValue
-from model.meta_data_line import MetaDataLine, MetaDataLineDTO, MetaDataLineCreate, MetaDataValueCreate
-from model.meta_data_tag_value import MetaDataTagValue
+from conditional import check_not_modified, compute_validator, request_parts
+from opf import metadata_sources
+from search import ranked_page
+from controller.meta_data_attribute_controller import MetaDataAttributeRepository, provide_meta_data_attribute_repo
+from controller.meta_data_tag_controller import MetaDataTagRepository, provide_meta_data_tag_repo
+from shared import (BulkItemError, BulkResult, KeysetPagination, KeysetParams, SQLAlchemyAsyncBulkRepository,
+                    SQLAlchemyAsyncKeysetRepository, SQLAlchemyAsyncScopedRepository)
+
+from model.meta_data_attribute import MetaDataAttribute
+from model.meta_data_attribute_value import MetaDataAttributeValue, meta_data_attribute_value_search
+from model.meta_data_line import (MetaDataAttributeTag, MetaDataLine, MetaDataLineDTO, MetaDataLineCreate,
+                                  MetaDataLineGraphDTO, MetaDataLineNestedDTO, MetaDataLineStruct, MetaDataLineUpdate,
+                                  MetaDataTagValueStruct, MetaDataValueCreate, meta_data_line_dto_list,
+                                  meta_data_line_graph_dto_list)
+from model.meta_data_tag import MetaDataTag
+from model.meta_data_tag_value import MetaDataTagValue, meta_data_tag_value_search
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
 
 
-class MetaDataAttributeValueRepository(SQLAlchemyAsyncRepository[MetaDataAttributeValue]):
+class MetaDataAttributeValueRepository(SQLAlchemyAsyncScopedRepository[MetaDataAttributeValue]):
     """MetaData Line repository."""
     model_type = MetaDataAttributeValue
 
 
-class MetaDataTagValueRepository(SQLAlchemyAsyncRepository[MetaDataTagValue]):
+class MetaDataTagValueRepository(SQLAlchemyAsyncScopedRepository[MetaDataTagValue]):
     model_type = MetaDataTagValue
 
 
-class MetaDataLineRepository(SQLAlchemyAsyncRepository[MetaDataLine]):
+class MetaDataLineRepository(SQLAlchemyAsyncKeysetRepository[MetaDataLine],
+                             SQLAlchemyAsyncBulkRepository[MetaDataLine]):
     """MetaData Line repository."""
     model_type = MetaDataLine
+    struct_type = MetaDataLineStruct
+    keyset_columns = ('name', 'id')
+
+    def row_statement(self) -> Select:
+        return (select(MetaDataLine.id, MetaDataLine.name,
+                       MetaDataTagValue.id.label('tag_value_id'), MetaDataTagValue.tag_id, MetaDataTagValue.value)
+                .outerjoin(MetaDataTagValue, and_(MetaDataTagValue.book_id == MetaDataLine.book_id,
+                                                  MetaDataTagValue.line_id == MetaDataLine.id)))
+
+    def to_struct(self, row: Row) -> MetaDataLineStruct:
+        line_id, name, tag_value_id, tag_id, value = row
+        tag = MetaDataTagValueStruct(tag_value_id, tag_id, value) if tag_value_id is not None else None
+        return MetaDataLineStruct(line_id, name, tag)
+
+    # to-one relations are joined into the line query, the attribute collection is
+    # fetched with one extra `IN (...)` query for the whole page, so a page always
+    # costs the same number of round trips however many rows it holds
+    graph_options = (
+        joinedload(MetaDataLine.tag).joinedload(MetaDataTagValue.meta_data_tag),
+        selectinload(MetaDataLine.attributes).joinedload(MetaDataAttributeValue.attribute),
+    )
+
+    async def list_graph(self, *filters: FilterTypes, **kwargs: Any) -> tuple[list[MetaDataLine], int]:
+        """List lines with the tag value, tag definition, attribute values and attribute definitions loaded."""
+        statement = self.scoped(select(MetaDataLine).options(*self.graph_options))
+        return await self.list_and_count(*filters, statement=statement, **kwargs)
+
+    async def get_graph(self, line_id: int) -> MetaDataLine:
+        """Get one line with the tag value, tag definition, attribute values and attribute definitions loaded."""
+        statement = self.scoped(select(MetaDataLine).options(*self.graph_options))
+        return await self.get_one(id=line_id, statement=statement)
+
+    # what the nested update changes, loaded up front so the diff needs no lazy loads
+    nested_options = (joinedload(MetaDataLine.tag), selectinload(MetaDataLine.attributes))
+
+    async def get_nested(self, line_id: int) -> MetaDataLine:
+        """Get one line with its tag value and attribute values loaded."""
+        statement = self.scoped(select(MetaDataLine).options(*self.nested_options))
+        return await self.get_one(id=line_id, statement=statement)
+
+    async def list_nested(self, line_ids: list[int]) -> list[MetaDataLine]:
+        """List lines with their tag values and attribute values loaded."""
+        statement = self.scoped(select(MetaDataLine).options(*self.nested_options))
+        return await self.list(CollectionFilter(field_name='id', values=line_ids), statement=statement)
+
+    async def search(self, query: str, params: KeysetParams, tag: str | None = None) -> KeysetPagination[Any]:
+        """One page of the lines with `query` in their tag value or one of their attribute values, best first.
+
+        A line matching several values ranks by its best match.
+
+        Args:
+            query (str): text to look for.
+            params (KeysetParams): page size, cursor from the previous page and count mode.
+            tag (str | None): only lines whose tag value is of this tag, e.g. `dc:title`.
+        """
+        dialect = self._dialect.name
+        hits = []
+        for model, index in ((MetaDataTagValue, meta_data_tag_value_search),
+                             (MetaDataAttributeValue, meta_data_attribute_value_search)):
+            matches = index.matches(dialect, query).subquery()
+            hits.append(select(model.line_id, matches.c.rank)
+                        .join(matches, matches.c.key == model.id)
+                        .where(*(getattr(model, name) == value for name, value in self.scope.items())))
+        found = union_all(*hits).subquery()
+        ranked = (select(found.c.line_id, func.max(found.c.rank).label('rank'))
+                  .group_by(found.c.line_id).subquery())
+        statement = self.scoped(self.row_statement()).join(ranked, ranked.c.line_id == MetaDataLine.id)
+        if tag is not None:
+            statement = statement.where(MetaDataTagValue.tag_id.in_(select(MetaDataTag.id)
+                                                                    .where(MetaDataTag.tag == tag)))
+        return await ranked_page(self.session, statement, MetaDataLine.id, ranked.c.rank, params, self.to_struct)
+
+
+async def check_references(meta_data_tag_repo: MetaDataTagRepository,
+                           meta_data_attribute_repo: MetaDataAttributeRepository,
+                           data: List[MetaDataLineCreate]) -> list[str | None]:
+    """Per entry, why it cannot be saved (unknown tag or attribute, attribute given twice) or `None`.
+
+    One query for the tags and one for the attributes, however many entries there are.
+    """
+    known_tags = await meta_data_tag_repo.existing_ids({item.tag.tag_id for item in data})
+    known_attributes = await meta_data_attribute_repo.existing_ids(
+        {attribute.id for item in data for attribute in item.attributes or []})
+    problems: list[str | None] = []
+    for item in data:
+        attribute_ids = [attribute.id for attribute in item.attributes or []]
+        unknown = [attribute_id for attribute_id in attribute_ids if attribute_id not in known_attributes]
+        if item.tag.tag_id not in known_tags:
+            problems.append('tag not found')
+        elif unknown:
+            problems.append(f'attribute {unknown[0]} not found')
+        elif len(set(attribute_ids)) != len(attribute_ids):
+            problems.append('attribute given more than once')
+        else:
+            problems.append(None)
+    return problems
+
+
+def new_line(item: MetaDataLineCreate) -> MetaDataLine:
+    """A line with its tag value and attribute values, saved together when the line is added."""
+    return MetaDataLine(name=item.name,
+                        tag=MetaDataTagValue(**item.tag.model_dump()),
+                        attributes=[MetaDataAttributeValue(attribute_id=attribute.id, attribute_value=attribute.value)
+                                    for attribute in item.attributes or []])
+
+
+def set_if_changed(obj: Any, **values: Any) -> None:
+    """Assign only the values that differ, an equal assignment still marks the row dirty and bumps `updated_at`."""
+    for name, value in values.items():
+        if getattr(obj, name) != value:
+            setattr(obj, name, value)
+
+
+def set_tag_value(line: MetaDataLine, tag: MetaDataValueCreate) -> None:
+    if line.tag is None:
+        line.tag = MetaDataTagValue(**tag.model_dump())
+    else:
+        set_if_changed(line.tag, tag_id=tag.tag_id, value=tag.value, is_empty_tag=tag.value is None)
+
+
+def sync_attribute_values(line: MetaDataLine, attributes: List[MetaDataAttributeTag]) -> None:
+    """Make the attribute values of `line` match `attributes`, matched by attribute id.
+
+    Only the differences become SQL: the new values are inserted in one batch,
+    changed values are updated and dropped ones deleted, unchanged values are not
+    written at all.
+    """
+    wanted = {attribute.id: attribute.value for attribute in attributes}
+    for value in list(line.attributes):
+        if value.attribute_id not in wanted:
+            line.attributes.remove(value)
+        else:
+            set_if_changed(value, attribute_value=wanted[value.attribute_id])
+    present = {value.attribute_id for value in line.attributes}
+    line.attributes.extend(MetaDataAttributeValue(attribute_id=attribute_id, attribute_value=attribute_value)
+                           for attribute_id, attribute_value in wanted.items() if attribute_id not in present)
+
+
+# tables each response is built from, see `compute_validator()`
+def book_line_sources(book_id: int) -> list:
+    return [(MetaDataLine, MetaDataLine.book_id == book_id), (MetaDataTagValue, MetaDataTagValue.book_id == book_id)]
+
+
+def line_sources(book_id: int, line_id: int, graph: bool = False) -> list:
+    sources = [(MetaDataLine, and_(MetaDataLine.book_id == book_id, MetaDataLine.id == line_id)),
+               (MetaDataTagValue, and_(MetaDataTagValue.book_id == book_id, MetaDataTagValue.line_id == line_id))]
+    if graph:
+        sources += [(MetaDataAttributeValue, and_(MetaDataAttributeValue.book_id == book_id,
+                                                  MetaDataAttributeValue.line_id == line_id)),
+                    (MetaDataTag, None), (MetaDataAttribute, None)]
+    return sources
 
 
 # we can optionally override the default `select` used for the repository to pass in
 # specific SQL options such as join details
-async def provide_meta_data_line_repo(db_session: AsyncSession) -> MetaDataLineRepository:
+async def provide_meta_data_line_repo(db_routed_session: AsyncSession, book_id: int) -> MetaDataLineRepository:
     """This provides a simple example demonstrating how to override the join options
     for the repository."""
-    return MetaDataLineRepository(session=db_session)
+    return MetaDataLineRepository(session=db_routed_session, scope={'book_id': book_id},
+                                  statement=select(MetaDataLine).options(joinedload(MetaDataLine.tag)))
 
 
-async def provide_meta_data_tag_value_repo(db_session: AsyncSession) -> MetaDataTagValueRepository:
-    return MetaDataTagValueRepository(session=db_session)
+async def provide_meta_data_tag_value_repo(db_routed_session: AsyncSession,
+                                           book_id: int) -> MetaDataTagValueRepository:
+    return MetaDataTagValueRepository(session=db_routed_session, scope={'book_id': book_id})
 
 
-async def provide_meta_data_attribute_value_repo(db_session: AsyncSession) -> MetaDataAttributeValueRepository:
-    return MetaDataAttributeValueRepository(session=db_session)
+async def provide_meta_data_attribute_value_repo(db_routed_session: AsyncSession,
+                                                 book_id: int) -> MetaDataAttributeValueRepository:
+    return MetaDataAttributeValueRepository(session=db_routed_session, scope={'book_id': book_id})
 
 
 class MetaDataController(Controller):
@@ -58,23 +227,101 @@ class MetaDataController(Controller):
     dependencies = {
         'meta_data_line_repo': Provide(provide_meta_data_line_repo),
         'meta_data_tag_value_repo': Provide(provide_meta_data_tag_value_repo),
-        'meta_data_attribute_value_repo': Provide(provide_meta_data_attribute_value_repo)
+        'meta_data_attribute_value_repo': Provide(provide_meta_data_attribute_value_repo),
+        'meta_data_tag_repo': Provide(provide_meta_data_tag_repo),
+        'meta_data_attribute_repo': Provide(provide_meta_data_attribute_repo),
     }
     meta_data_line_controller_tag = ['Meta Data Line - CRUD']
 
     @get(tags=meta_data_line_controller_tag)
     async def list_meta_data_lines(
             self,
+            request: Request,
+            meta_data_line_repo: MetaDataLineRepository,
+            limit_offset: LimitOffset,
+            book_id: int,
+    ) -> OffsetPagination[MetaDataLineStruct]:
+        """List the lines of a book."""
+        check_not_modified(request, await compute_validator(
+            meta_data_line_repo.session, book_line_sources(book_id), *request_parts(request)))
+        try:
+            order_by2 = OrderBy(field_name=MetaDataLine.name)
+            results, total = await meta_data_line_repo.list_structs_and_count(limit_offset, order_by2)
+            return OffsetPagination[MetaDataLineStruct](
+                items=results,
+                total=total,
+                limit=limit_offset.limit,
+                offset=limit_offset.offset,
+            )
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @get('/cursor', tags=meta_data_line_controller_tag)
+    async def list_meta_data_lines_by_cursor(
+            self,
+            request: Request,
+            meta_data_line_repo: MetaDataLineRepository,
+            keyset: KeysetParams,
+            book_id: int,
+    ) -> KeysetPagination[MetaDataLineStruct]:
+        """List items using keyset (cursor) pagination.
+
+        Pass `next_cursor`/`prev_cursor` from the previous response as `cursor`
+        to move between pages, `count` selects how the total is worked out.
+        """
+        check_not_modified(request, await compute_validator(
+            meta_data_line_repo.session, book_line_sources(book_id), *request_parts(request)))
+        try:
+            return await meta_data_line_repo.list_keyset(keyset, structs=True)
+        except ValidationException:
+            raise
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @get('/search', tags=meta_data_line_controller_tag)
+    async def search_meta_data_lines(
+            self,
+            request: Request,
+            meta_data_line_repo: MetaDataLineRepository,
+            keyset: KeysetParams,
+            book_id: int,
+            q: str = Parameter(query='q', min_length=1, max_length=100,
+                               description='Text to look for in the tag and attribute values.', ),
+            tag: Optional[str] = Parameter(query='tag', required=False,
+                                           description='Only lines of this tag, e.g. dc:title.', ),
+    ) -> KeysetPagination[MetaDataLineStruct]:
+        """Search the lines of a book by their tag and attribute values, best matches first.
+
+        Pass `next_cursor` from the previous response as `cursor` for the next page.
+        """
+        check_not_modified(request, await compute_validator(
+            meta_data_line_repo.session,
+            book_line_sources(book_id) + [(MetaDataAttributeValue, MetaDataAttributeValue.book_id == book_id),
+                                          (MetaDataTag, None)],
+            *request_parts(request)))
+        try:
+            return await meta_data_line_repo.search(q, keyset, tag)
+        except ValidationException:
+            raise
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @get('/graph', tags=meta_data_line_controller_tag)
+    async def list_meta_data_line_graphs(
+            self,
+            request: Request,
             meta_data_line_repo: MetaDataLineRepository,
             limit_offset: LimitOffset,
-    ) -> OffsetPagination[MetaDataLineDTO]:
-        """List items."""
+            book_id: int,
+    ) -> OffsetPagination[MetaDataLineGraphDTO]:
+        """List the lines of a book with their tag and attributes."""
+        check_not_modified(request, await compute_validator(
+            meta_data_line_repo.session, metadata_sources(book_id), *request_parts(request)))
         try:
             order_by2 = OrderBy(field_name=MetaDataLine.name)
-            results, total = await meta_data_line_repo.list_and_count(limit_offset, order_by2)
-            type_adapter = TypeAdapter(list[MetaDataLineDTO])
-            return OffsetPagination[MetaDataLineDTO](
-                items=type_adapter.validate_python(results),
+            results, total = await meta_data_line_repo.list_graph(limit_offset, order_by2)
+            return OffsetPagination[MetaDataLineGraphDTO](
+                items=meta_data_line_graph_dto_list.validate_python(results),
                 total=total,
                 limit=limit_offset.limit,
                 offset=limit_offset.offset,
@@ -82,36 +329,58 @@ class MetaDataController(Controller):
         except Exception as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
 
+    @get('/graph/details/{line_id: int}', tags=meta_data_line_controller_tag)
+    async def get_meta_data_line_graph_details(self,
+                                               request: Request,
+                                               meta_data_line_repo: MetaDataLineRepository,
+                                               book_id: int,
+                                               line_id: int = Parameter(title='Meta Data Line ID',
+                                                                        description='The line to get.', ),
+                                               ) -> MetaDataLineGraphDTO:
+        """Get an item with its tag and attributes."""
+        check_not_modified(request, await compute_validator(
+            meta_data_line_repo.session, line_sources(book_id, line_id, graph=True), *request_parts(request)))
+        try:
+            obj = await meta_data_line_repo.get_graph(line_id)
+            return MetaDataLineGraphDTO.model_validate(obj)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
     @get('/details/{line_id: int}', tags=meta_data_line_controller_tag)
     async def get_meta_data_line_details(self,
+                                         request: Request,
                                          meta_data_line_repo: MetaDataLineRepository,
+                                         book_id: int,
                                          line_id: int = Parameter(title='Meta Data Tag ID',
                                                                   description='The meta_data to update.', ),
-                                         ) -> MetaDataLineDTO:
+                                         ) -> MetaDataLineStruct:
         """Interact with SQLAlchemy engine and session."""
+        check_not_modified(request, await compute_validator(
+            meta_data_line_repo.session, line_sources(book_id, line_id), *request_parts(request)))
         try:
-            obj = await meta_data_line_repo.get_one(id=line_id)
-            return MetaDataLineDTO.model_validate(obj)
+            return await meta_data_line_repo.get_struct(line_id)
         except Exception as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
 
     @post(tags=meta_data_line_controller_tag)
     async def create_meta_data_line(self,
                                     meta_data_line_repo: MetaDataLineRepository,
-                                    meta_data_tag_value_repo: MetaDataTagValueRepository,
-                                    data: MetaDataLineCreate, ) -> MetaDataLineDTO:
-        """Create a new meta_data tag."""
+                                    meta_data_tag_repo: MetaDataTagRepository,
+                                    meta_data_attribute_repo: MetaDataAttributeRepository,
+                                    data: MetaDataLineCreate, ) -> MetaDataLineNestedDTO:
+        """Create a line with its tag value and attribute values in one transaction.
+
+        The line, the tag value and the attribute values are flushed as three INSERTs,
+        the attribute values as one batch, and nothing is saved if any of them fails.
+        """
+        problem = (await check_references(meta_data_tag_repo, meta_data_attribute_repo, [data]))[0]
+        if problem is not None:
+            raise HTTPException(detail=problem, status_code=status_codes.HTTP_400_BAD_REQUEST)
         try:
-            _data = data.model_dump(exclude_unset=True, by_alias=False, exclude_none=True)
-            # get json element as a class
-            tag: MetaDataTagValue = _data.pop('tag')
-            saved_line: MetaDataLine = await meta_data_line_repo.add(MetaDataLine(**_data))
+            # a refresh would expire the tag and attribute values the response is built from
+            obj = await meta_data_line_repo.add(new_line(data), auto_refresh=False)
             await meta_data_line_repo.session.commit()
-            # add foreign key of the record that was just saved
-            tag.update({'line_id': saved_line.id})
-            saved_tag: MetaDataTagValue = await meta_data_tag_value_repo.add(**tag)
-            await meta_data_tag_value_repo.session.commit()
-            return tag
+            return MetaDataLineNestedDTO.model_validate(obj)
         except Exception as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
 
@@ -120,17 +389,31 @@ class MetaDataController(Controller):
            tags=meta_data_line_controller_tag)
     async def update_meta_data_line(
             self,
+            request: Request,
             meta_data_line_repo: MetaDataLineRepository,
+            meta_data_tag_repo: MetaDataTagRepository,
+            meta_data_attribute_repo: MetaDataAttributeRepository,
             data: MetaDataLineCreate,
-            line_id: int = Parameter(title='Meta Data Tag ID', description='The meta_data to update.', ),
-    ) -> MetaDataLineCreate:
-        """Update an meta_data tag."""
+            line_id: int = Parameter(title='Meta Data Line ID', description='The line to update.', ),
+    ) -> MetaDataLineNestedDTO:
+        """Update a line with its tag value and attribute values in one transaction.
+
+        The attribute values are compared with the stored ones and only the
+        differences are written, see `sync_attribute_values()`. PUT replaces them,
+        leaving `attributes` out removes them all; PATCH keeps them unless the body
+        has `attributes`.
+        """
+        problem = (await check_references(meta_data_tag_repo, meta_data_attribute_repo, [data]))[0]
+        if problem is not None:
+            raise HTTPException(detail=problem, status_code=status_codes.HTTP_400_BAD_REQUEST)
         try:
-            _data = data.model_dump(exclude_unset=True, exclude_none=True)
-            _data.update({"id": line_id})
-            obj = await meta_data_line_repo.update(MetaDataLine(**_data))
+            obj = await meta_data_line_repo.get_nested(line_id)
+            set_if_changed(obj, name=data.name)
+            set_tag_value(obj, data.tag)
+            if request.method == HttpMethod.PUT or 'attributes' in data.model_fields_set:
+                sync_attribute_values(obj, data.attributes or [])
             await meta_data_line_repo.session.commit()
-            return MetaDataLineCreate.model_validate(obj)
+            return MetaDataLineNestedDTO.model_validate(obj)
         except Exception as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
 
@@ -150,6 +433,102 @@ class MetaDataController(Controller):
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
 
 
+    @post('/bulk', tags=meta_data_line_controller_tag)
+    async def create_meta_data_lines(self,
+                                     meta_data_line_repo: MetaDataLineRepository,
+                                     meta_data_tag_repo: MetaDataTagRepository,
+                                     meta_data_attribute_repo: MetaDataAttributeRepository,
+                                     data: List[MetaDataLineCreate], ) -> BulkResult[MetaDataLineDTO]:
+        """Create many lines with their tag and attribute values in one transaction.
+
+        Entries pointing at an unknown tag or attribute, or with a name longer than its
+        column, are reported in `errors`, the rest are saved.
+        """
+        try:
+            problems = await check_references(meta_data_tag_repo, meta_data_attribute_repo, data)
+            errors: list[BulkItemError] = []
+            objs: list[MetaDataLine] = []
+            for index, (item, problem) in enumerate(zip(data, problems)):
+                problem = problem or meta_data_line_repo.value_problem({'name': item.name}, new=True)
+                if problem is not None:
+                    errors.append(BulkItemError(index=index, id=item.tag.tag_id, detail=problem))
+                    continue
+                objs.append(new_line(item))
+            # lines, tag values and attribute values are flushed as three batched INSERTs
+            objs = await meta_data_line_repo.add_many(objs)
+            await meta_data_line_repo.session.commit()
+            return BulkResult[MetaDataLineDTO](items=meta_data_line_dto_list.validate_python(objs), errors=errors)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @route('/bulk',
+           http_method=[HttpMethod.PUT, HttpMethod.PATCH],
+           tags=meta_data_line_controller_tag)
+    async def update_meta_data_lines(
+            self,
+            meta_data_line_repo: MetaDataLineRepository,
+            meta_data_tag_repo: MetaDataTagRepository,
+            meta_data_attribute_repo: MetaDataAttributeRepository,
+            data: List[MetaDataLineUpdate],
+    ) -> BulkResult[MetaDataLineDTO]:
+        """Update many lines with their tag values in one transaction.
+
+        Entries with `attributes` get their attribute values synced as in the single
+        update, the others keep them. Unknown line ids, tags and attributes and names
+        longer than their column are reported in `errors`, the rest are saved.
+        """
+        try:
+            errors = await meta_data_line_repo.check_ids([item.id for item in data])
+            problems = await check_references(meta_data_tag_repo, meta_data_attribute_repo, data)
+            skipped = {error.index for error in errors}
+            for index, (item, problem) in enumerate(zip(data, problems)):
+                problem = problem or meta_data_line_repo.value_problem({'name': item.name})
+                if index not in skipped and problem is not None:
+                    errors.append(BulkItemError(index=index, id=item.id, detail=problem))
+                    skipped.add(index)
+            valid = {item.id: item for index, item in enumerate(data) if index not in skipped}
+            objs = await meta_data_line_repo.list_nested(list(valid)) if valid else []
+            for obj in objs:
+                item = valid[obj.id]
+                set_if_changed(obj, name=item.name)
+                set_tag_value(obj, item.tag)
+                if 'attributes' in item.model_fields_set:
+                    sync_attribute_values(obj, item.attributes or [])
+            # the unit of work groups the INSERTs, UPDATEs and DELETEs into executemany batches
+            await meta_data_line_repo.session.commit()
+            return BulkResult[MetaDataLineDTO](items=meta_data_line_dto_list.validate_python(objs),
+                                               errors=sorted(errors, key=lambda error: error.index))
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @delete('/bulk', status_code=status_codes.HTTP_200_OK, tags=meta_data_line_controller_tag)
+    async def delete_meta_data_line_items(
+            self,
+            meta_data_line_repo: MetaDataLineRepository,
+            meta_data_tag_value_repo: MetaDataTagValueRepository,
+            meta_data_attribute_value_repo: MetaDataAttributeValueRepository,
+            line_ids: List[int] = Parameter(query='id', title='Meta Data Line IDs',
+                                            description='The ids of the lines to delete.', ),
+    ) -> BulkResult[MetaDataLineDTO]:
+        """Delete many lines with their tag and attribute values in one transaction.
+
+        Unknown ids are reported in `errors`.
+        """
+        try:
+            errors = await meta_data_line_repo.check_ids(line_ids)
+            skipped = {error.index for error in errors}
+            valid = [line_id for index, line_id in enumerate(line_ids) if index not in skipped]
+            objs = await meta_data_line_repo.list(CollectionFilter(field_name='id', values=valid)) if valid else []
+            items = meta_data_line_dto_list.validate_python(objs)
+            if valid:
+                await meta_data_attribute_value_repo.delete_many(valid, id_attribute='line_id')
+                await meta_data_tag_value_repo.delete_many(valid, id_attribute='line_id')
+                await meta_data_line_repo.delete_many(valid)
+            await meta_data_line_repo.session.commit()
+            return BulkResult[MetaDataLineDTO](items=items, errors=errors)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
 """
 {
   "name":"string",
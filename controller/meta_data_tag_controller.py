@@ -1,22 +1,29 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List
 
 import advanced_alchemy
-from litestar.exceptions import HTTPException
+from litestar.exceptions import HTTPException, ValidationException
 from litestar import status_codes
 from advanced_alchemy import SQLAlchemyAsyncRepository
 from litestar import Controller
 from litestar import HttpMethod
+from litestar import Request
 from litestar import get, post, delete
 from litestar import route
 from litestar.di import Provide
 from litestar.pagination import OffsetPagination
 from litestar.params import Parameter
 from litestar.repository.filters import LimitOffset, OrderBy
-from pydantic import TypeAdapter
 
-from model.meta_data_tag import MetaDataTag, MetaDataTagDTO, MetaDataTagCreate
+from cache import meta_data_tag_cache
+from conditional import check_not_modified, compute_validator, request_parts
+from search import SQLAlchemyAsyncSearchRepository
+from shared import (BulkResult, KeysetPagination, KeysetParams, SQLAlchemyAsyncBulkRepository,
+                    SQLAlchemyAsyncKeysetRepository)
+
+from model.meta_data_tag import (MetaDataTag, MetaDataTagDTO, MetaDataTagCreate, MetaDataTagStruct, MetaDataTagUpdate,
+                                 meta_data_tag_dto_list, meta_data_tag_search)
 from model.meta_data_tag_value import MetaDataTagValue
 
 if TYPE_CHECKING:
@@ -25,18 +32,24 @@ if TYPE_CHECKING:
 from logger import logger
 
 
-class MetaDataTagRepository(SQLAlchemyAsyncRepository[MetaDataTag]):
+class MetaDataTagRepository(SQLAlchemyAsyncKeysetRepository[MetaDataTag],
+                            SQLAlchemyAsyncBulkRepository[MetaDataTag],
+                            SQLAlchemyAsyncSearchRepository[MetaDataTag]):
     """MetaData Tag repository."""
 
     model_type = MetaDataTag
+    struct_type = MetaDataTagStruct
+    search_index = meta_data_tag_search
+    keyset_columns = ('sort_order', 'name', 'id')
+    referenced_by = (MetaDataTagValue.tag_id,)
 
 
 # we can optionally override the default `select` used for the repository to pass in
 # specific SQL options such as join details
-async def provide_meta_data_tag_repo(db_session: AsyncSession) -> MetaDataTagRepository:
+async def provide_meta_data_tag_repo(db_routed_session: AsyncSession) -> MetaDataTagRepository:
     """This provides a simple example demonstrating how to override the join options
     for the repository."""
-    return MetaDataTagRepository(session=db_session)
+    return MetaDataTagRepository(session=db_routed_session)
 
 
 class MetaDataTagController(Controller):
@@ -49,34 +62,98 @@ class MetaDataTagController(Controller):
     @get(tags=meta_data_tag_controller_tag)
     async def list_meta_data_tags(
             self,
+            request: Request,
             meta_data_tag_repo: MetaDataTagRepository,
             limit_offset: LimitOffset,
-    ) -> OffsetPagination[MetaDataTagDTO]:
+    ) -> OffsetPagination[MetaDataTagStruct]:
         """List items."""
+        validator = await compute_validator(
+            meta_data_tag_repo.session, [(MetaDataTag, None)], *request_parts(request))
+        check_not_modified(request, validator)
         try:
-            order_by1 = OrderBy(field_name=MetaDataTag.sort_order)
-            order_by2 = OrderBy(field_name=MetaDataTag.name)
-            results, total = await meta_data_tag_repo.list_and_count(limit_offset, order_by1, order_by2)
-            type_adapter = TypeAdapter(list[MetaDataTagDTO])
-            return OffsetPagination[MetaDataTagDTO](
-                items=type_adapter.validate_python(results),
-                total=total,
-                limit=limit_offset.limit,
-                offset=limit_offset.offset,
-            )
+            async def load() -> OffsetPagination[MetaDataTagStruct]:
+                order_by1 = OrderBy(field_name=MetaDataTag.sort_order)
+                order_by2 = OrderBy(field_name=MetaDataTag.name)
+                results, total = await meta_data_tag_repo.list_structs_and_count(limit_offset, order_by1, order_by2)
+                return OffsetPagination[MetaDataTagStruct](
+                    items=results,
+                    total=total,
+                    limit=limit_offset.limit,
+                    offset=limit_offset.offset,
+                )
+
+            key = f'page:{limit_offset.limit}:{limit_offset.offset}'
+            return await meta_data_tag_cache.get_or_load(key, load, OffsetPagination[MetaDataTagStruct],
+                                                         version=validator.etag if validator else None)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @get('/cursor', tags=meta_data_tag_controller_tag)
+    async def list_meta_data_tags_by_cursor(
+            self,
+            request: Request,
+            meta_data_tag_repo: MetaDataTagRepository,
+            keyset: KeysetParams,
+    ) -> KeysetPagination[MetaDataTagStruct]:
+        """List items using keyset (cursor) pagination.
+
+        Pass `next_cursor`/`prev_cursor` from the previous response as `cursor`
+        to move between pages, `count` selects how the total is worked out.
+        """
+        validator = await compute_validator(
+            meta_data_tag_repo.session, [(MetaDataTag, None)], *request_parts(request))
+        check_not_modified(request, validator)
+        try:
+            async def load() -> KeysetPagination[MetaDataTagStruct]:
+                return await meta_data_tag_repo.list_keyset(keyset, structs=True)
+
+            key = f'cursor:{keyset.page_size}:{keyset.count}:{keyset.cursor.encode() if keyset.cursor else ""}'
+            return await meta_data_tag_cache.get_or_load(key, load, KeysetPagination[MetaDataTagStruct],
+                                                         version=validator.etag if validator else None)
+        except ValidationException:
+            raise
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @get('/search', tags=meta_data_tag_controller_tag)
+    async def search_meta_data_tags(
+            self,
+            request: Request,
+            meta_data_tag_repo: MetaDataTagRepository,
+            keyset: KeysetParams,
+            q: str = Parameter(query='q', min_length=1, max_length=100,
+                               description='Text to look for in the name and the tag.', ),
+    ) -> KeysetPagination[MetaDataTagStruct]:
+        """Search tags by name and tag, best matches first.
+
+        Pass `next_cursor` from the previous response as `cursor` for the next page.
+        """
+        check_not_modified(request, await compute_validator(
+            meta_data_tag_repo.session, [(MetaDataTag, None)], *request_parts(request)))
+        try:
+            return await meta_data_tag_repo.search(q, keyset)
+        except ValidationException:
+            raise
         except Exception as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
 
     @get('/details/{tag_id: int}', tags=meta_data_tag_controller_tag)
     async def get_meta_data_tag_details(self,
+                                        request: Request,
                                         meta_data_tag_repo: MetaDataTagRepository,
                                         tag_id: int = Parameter(title='Meta Data Tag ID',
                                                                 description='The meta_data to update.', ),
-                                        ) -> MetaDataTagDTO:
+                                        ) -> MetaDataTagStruct:
         """Interact with SQLAlchemy engine and session."""
+        validator = await compute_validator(
+            meta_data_tag_repo.session, [(MetaDataTag, MetaDataTag.id == tag_id)], *request_parts(request))
+        check_not_modified(request, validator)
         try:
-            obj = await meta_data_tag_repo.get_one(id=tag_id)
-            return MetaDataTagDTO.model_validate(obj)
+            async def load() -> MetaDataTagStruct:
+                return await meta_data_tag_repo.get_struct(tag_id)
+
+            return await meta_data_tag_cache.get_or_load(f'id:{tag_id}', load, MetaDataTagStruct,
+                                                         version=validator.etag if validator else None)
         except Exception as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
 
@@ -89,6 +166,7 @@ class MetaDataTagController(Controller):
             # _data["slug"] = await meta_data_tag_repo.get_available_slug(_data["name"])
             obj = await meta_data_tag_repo.add(MetaDataTag(**_data))
             await meta_data_tag_repo.session.commit()
+            await meta_data_tag_cache.invalidate()
             return MetaDataTagDTO.model_validate(obj)
         except Exception as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
@@ -108,6 +186,7 @@ class MetaDataTagController(Controller):
             _data.update({'id': tag_id})
             obj = await meta_data_tag_repo.update(MetaDataTag(**_data))
             await meta_data_tag_repo.session.commit()
+            await meta_data_tag_cache.invalidate()
             return MetaDataTagCreate.model_validate(obj)
         except Exception as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
@@ -124,9 +203,67 @@ class MetaDataTagController(Controller):
         try:
             _ = await meta_data_tag_repo.delete(tag_id)
             await meta_data_tag_repo.session.commit()
+            await meta_data_tag_cache.invalidate()
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+
+    @post('/bulk', tags=meta_data_tag_controller_tag)
+    async def create_meta_data_tags(self, meta_data_tag_repo: MetaDataTagRepository,
+                                    data: List[MetaDataTagCreate], ) -> BulkResult[MetaDataTagDTO]:
+        """Create many meta_data tags in one transaction.
+
+        Entries the table would refuse, e.g. a name longer than its column, are reported
+        in `errors`, the rest are saved.
+        """
+        try:
+            result = await meta_data_tag_repo.bulk_add(
+                [item.model_dump(exclude_unset=True, by_alias=False, exclude_none=True) for item in data])
+            await meta_data_tag_repo.session.commit()
+            await meta_data_tag_cache.invalidate()
+            return BulkResult[MetaDataTagDTO](items=meta_data_tag_dto_list.validate_python(result.items),
+                                              errors=result.errors)
         except Exception as ex:
             raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
 
+    @route('/bulk',
+           http_method=[HttpMethod.PUT, HttpMethod.PATCH],
+           tags=meta_data_tag_controller_tag)
+    async def update_meta_data_tags(
+            self,
+            meta_data_tag_repo: MetaDataTagRepository,
+            data: List[MetaDataTagUpdate],
+    ) -> BulkResult[MetaDataTagDTO]:
+        """Update many meta_data tags in one transaction, unknown ids are reported in `errors`."""
+        try:
+            result = await meta_data_tag_repo.bulk_update(
+                [item.model_dump(exclude_unset=True, exclude_none=True) for item in data])
+            await meta_data_tag_repo.session.commit()
+            await meta_data_tag_cache.invalidate()
+            return BulkResult[MetaDataTagDTO](items=meta_data_tag_dto_list.validate_python(result.items),
+                                              errors=result.errors)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @delete('/bulk', status_code=status_codes.HTTP_200_OK, tags=meta_data_tag_controller_tag)
+    async def delete_meta_data_tags(
+            self,
+            meta_data_tag_repo: MetaDataTagRepository,
+            tag_ids: List[int] = Parameter(query='id', title='Meta Data Tag IDs',
+                                           description='The ids of the meta data tags to delete.', ),
+    ) -> BulkResult[MetaDataTagDTO]:
+        """Delete many meta_data tags in one transaction.
+
+        Unknown ids and tags a line still has a value of are reported in `errors`, the rest are deleted.
+        """
+        try:
+            result = await meta_data_tag_repo.bulk_delete(tag_ids)
+            await meta_data_tag_repo.session.commit()
+            await meta_data_tag_cache.invalidate()
+            return BulkResult[MetaDataTagDTO](items=meta_data_tag_dto_list.validate_python(result.items),
+                                              errors=result.errors)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
 
 class MetaDataTagValueRepository(SQLAlchemyAsyncRepository[MetaDataTagValue]):
     """MetaData Tag repository."""
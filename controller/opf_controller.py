@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from litestar import Controller
+from litestar import Request
+from litestar import get
+from litestar.response import Stream
+
+from conditional import check_not_modified, compute_validator, request_parts
+from opf import metadata_sources, stream_metadata
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+
+class OpfController(Controller):
+    path = '/opf'
+    opf_controller_tag = ['OPF - Package Document']
+
+    @get('/metadata', tags=opf_controller_tag)
+    async def get_opf_metadata(self, request: Request, db_routed_session: AsyncSession,
+                               db_routed_engine: AsyncEngine, book_id: int) -> Stream:
+        """Stream the `<metadata>` block of the book's content.opf.
+
+        Rows are read with a server side cursor on a connection owned by the stream,
+        so the response does not depend on the request session staying open.
+        """
+        check_not_modified(request, await compute_validator(
+            db_routed_session, metadata_sources(book_id), *request_parts(request)))
+        return Stream(stream_metadata(db_routed_engine, book_id), media_type='application/xml')
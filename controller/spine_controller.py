@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, List
+
+import advanced_alchemy
+from litestar.exceptions import HTTPException
+from litestar import status_codes
+from litestar import Controller
+from litestar import Request
+from litestar import get, post, put, delete
+from litestar.di import Provide
+from litestar.pagination import OffsetPagination
+from litestar.params import Parameter
+from litestar.repository.filters import LimitOffset, OrderBy
+from sqlalchemy import case, func, select, update
+
+from conditional import check_not_modified, compute_validator, request_parts
+from model.spine_item_ref import SpineItemRef, SpineItemRefDTO, SpineItemRefCreate, spine_item_ref_dto_list
+from shared import SQLAlchemyAsyncScopedRepository
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class SpineItemRefRepository(SQLAlchemyAsyncScopedRepository[SpineItemRef]):
+    """Spine itemref repository."""
+    model_type = SpineItemRef
+
+    async def next_position(self) -> int:
+        """Position after the last itemref of the book."""
+        result = await self.session.execute(
+            self.scoped(select(func.coalesce(func.max(SpineItemRef.position) + 1, 0))))
+        return result.scalar_one()
+
+    async def reorder(self, item_ref_ids: list[int]) -> None:
+        """Set the position of every itemref of the book with a single UPDATE.
+
+        Args:
+            item_ref_ids (list[int]): every itemref id of the book, in the new order.
+
+        Raises:
+            ValueError: `item_ref_ids` is not exactly the set of itemrefs of the book.
+        """
+        result = await self.session.execute(self.scoped(select(SpineItemRef.id)))
+        existing = set(result.scalars())
+        if len(item_ref_ids) != len(existing) or set(item_ref_ids) != existing:
+            raise ValueError('the new order must list every itemref of the book exactly once')
+        if not item_ref_ids:
+            return
+        await self.session.execute(
+            update(SpineItemRef)
+            .where(*self.scope_criteria())
+            .values(position=case({item_ref_id: position for position, item_ref_id in enumerate(item_ref_ids)},
+                                  value=SpineItemRef.id),
+                    # Core updates skip the ORM hook that touches `updated_at`, ETags depend on it
+                    updated_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def provide_spine_item_ref_repo(db_routed_session: AsyncSession, book_id: int) -> SpineItemRefRepository:
+    return SpineItemRefRepository(session=db_routed_session, scope={'book_id': book_id})
+
+
+class SpineController(Controller):
+    path = '/spine'
+    dependencies = {
+        'spine_item_ref_repo': Provide(provide_spine_item_ref_repo),
+    }
+    spine_controller_tag = ['Spine - CRUD']
+
+    @get(tags=spine_controller_tag)
+    async def list_spine_item_refs(
+            self,
+            request: Request,
+            spine_item_ref_repo: SpineItemRefRepository,
+            limit_offset: LimitOffset,
+            book_id: int,
+    ) -> OffsetPagination[SpineItemRefDTO]:
+        """List the itemrefs of a book in reading order."""
+        check_not_modified(request, await compute_validator(
+            spine_item_ref_repo.session, [(SpineItemRef, SpineItemRef.book_id == book_id)],
+            *request_parts(request)))
+        try:
+            order_by = OrderBy(field_name=SpineItemRef.position)
+            results, total = await spine_item_ref_repo.list_and_count(limit_offset, order_by)
+            return OffsetPagination[SpineItemRefDTO](
+                items=spine_item_ref_dto_list.validate_python(results),
+                total=total,
+                limit=limit_offset.limit,
+                offset=limit_offset.offset,
+            )
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @post(tags=spine_controller_tag)
+    async def create_spine_item_ref(self,
+                                    spine_item_ref_repo: SpineItemRefRepository,
+                                    data: SpineItemRefCreate, ) -> SpineItemRefDTO:
+        """Add an itemref, appended to the end of the spine unless a position is given.
+
+        The idref must be the ID of a manifest item of the same book.
+        """
+        try:
+            _data = data.model_dump(exclude_unset=True, by_alias=False, exclude_none=True)
+            if 'position' not in _data:
+                _data['position'] = await spine_item_ref_repo.next_position()
+            obj = await spine_item_ref_repo.add(SpineItemRef(**_data))
+            await spine_item_ref_repo.session.commit()
+            return SpineItemRefDTO.model_validate(obj)
+        except advanced_alchemy.exceptions.ConflictError as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_409_CONFLICT)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @put('/order', status_code=status_codes.HTTP_204_NO_CONTENT, tags=spine_controller_tag)
+    async def reorder_spine(
+            self,
+            spine_item_ref_repo: SpineItemRefRepository,
+            data: List[int],
+    ) -> None:
+        """Reorder the spine, `data` lists every itemref id of the book in the new reading order."""
+        try:
+            await spine_item_ref_repo.reorder(data)
+            await spine_item_ref_repo.session.commit()
+        except ValueError as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_400_BAD_REQUEST)
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
+
+    @delete('/item/{spine_item_ref_id: int}', tags=spine_controller_tag)
+    async def delete_spine_item_ref(
+            self,
+            spine_item_ref_repo: SpineItemRefRepository,
+            spine_item_ref_id: int = Parameter(title='Spine Itemref ID', description='The itemref to delete.', ),
+    ) -> None:
+        """Remove an itemref from the spine."""
+        try:
+            _ = await spine_item_ref_repo.delete(spine_item_ref_id)
+            await spine_item_ref_repo.session.commit()
+        except Exception as ex:
+            raise HTTPException(detail=str(ex), status_code=status_codes.HTTP_404_NOT_FOUND)
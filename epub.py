@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Awaitable, Callable, NamedTuple
+
+import anyio
+import anyio.to_thread
+from litestar.plugins import CLIPluginProtocol
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from blob_store import BLOB_GC_GRACE_SECONDS, BlobStore, blob_store, collect_garbage, map_file, send_file
+from images import collect_derivatives
+from jobs import job_queue
+from model.blob import Blob
+from model.manifest_item import ManifestItem
+from opf import MissingIdentifierError, stream_package, unique_identifier
+from opf_import import IMPORT_WORKERS, file_jobs, import_books, import_paths
+from opf_render import render_book
+from templating import TEMPLATE_MODULE_DIR, compile_templates
+from zip_stream import ZipStreamWriter
+
+if TYPE_CHECKING:
+    from click import Group
+    from litestar.contrib.sqlalchemy.plugins import SQLAlchemyAsyncConfig
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+    from jobs import JobContext
+    from opf_import import ImportedBook
+    from shared import BulkResult
+
+# content files of a book live at <EPUB_CONTENT_DIR>/<book_id>/<manifest href>
+CONTENT_DIR = Path(os.environ.get('EPUB_CONTENT_DIR', 'content'))
+
+OPF_PATH = 'OEBPS/content.opf'
+CONTAINER_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">\n'
+    '  <rootfiles>\n'
+    f'    <rootfile full-path="{OPF_PATH}" media-type="application/oebps-package+xml"/>\n'
+    '  </rootfiles>\n'
+    '</container>\n'
+).encode('utf-8')
+
+READ_SIZE = 64 * 1024
+
+# media types that are already compressed, deflating them again only costs CPU
+PRECOMPRESSED_MEDIA_TYPES = {
+    'image/jpeg', 'image/png', 'image/gif', 'image/webp',
+    'font/woff', 'font/woff2', 'application/font-woff',
+    'audio/mpeg', 'audio/mp4', 'video/mp4',
+}
+
+
+class MissingContentError(Exception):
+    """Manifest items whose files are neither in the blob store nor in the content directory."""
+
+    def __init__(self, hrefs: list[str]) -> None:
+        super().__init__('missing content files: ' + ', '.join(hrefs))
+        self.hrefs = hrefs
+
+
+def content_path(book_id: int, href: str, content_dir: Path = CONTENT_DIR) -> Path:
+    """Resolve a manifest href inside the book's content directory."""
+    root = (content_dir / str(book_id)).resolve()
+    path = (root / href).resolve()
+    if not path.is_relative_to(root):
+        raise MissingContentError([href])
+    return path
+
+
+class ContentFile(NamedTuple):
+    """The file of a manifest item, `size` and `crc32` are known for blobs only."""
+    href: str
+    media_type: str
+    path: Path
+    size: int | None = None
+    crc32: int | None = None
+
+
+async def manifest_files(engine: AsyncEngine, book_id: int, content_dir: Path = CONTENT_DIR,
+                         store: BlobStore = blob_store) -> list[ContentFile]:
+    """The file of every manifest item of the book.
+
+    Items with uploaded content are read from the blob store, the others from
+    `<content_dir>/<book_id>/<href>`.
+
+    Raises:
+        MissingContentError: some manifest items have no file, checked before anything is streamed.
+    """
+    statement = (select(ManifestItem.href, ManifestItem.media_type, Blob.sha256, Blob.size, Blob.crc32)
+                 .outerjoin(Blob, Blob.sha256 == ManifestItem.blob_sha256)
+                 .where(ManifestItem.book_id == book_id)
+                 .order_by(ManifestItem.id))
+    async with engine.connect() as conn:
+        rows = (await conn.execute(statement)).all()
+    files = [ContentFile(href, media_type, content_path(book_id, href, content_dir)) if sha256 is None
+             else ContentFile(href, media_type, store.path(sha256), size, crc32)
+             for href, media_type, sha256, size, crc32 in rows]
+    missing = [file.href for file in files if not await anyio.Path(file.path).is_file()]
+    if missing:
+        raise MissingContentError(missing)
+    return files
+
+
+async def stream_epub(engine: AsyncEngine, book_id: int, files: list[ContentFile], identifier: str,
+                      progress: Callable[[int, int], Awaitable[None]] | None = None,
+                      zero_copy: bool = False) -> AsyncGenerator[bytes | ContentFile, None]:
+    """Yield the .epub container of a book chunk by chunk.
+
+    `mimetype` is the first entry and stored uncompressed as the OCF spec requires,
+    followed by `META-INF/container.xml`, the package document and the manifest files.
+    Content is read and compressed a chunk at a time so memory use does not grow
+    with the size of the book. `identifier` is the package's `unique-identifier`,
+    see `opf.unique_identifier()`. `progress` is awaited with the number of content
+    files written so far and the total.
+
+    Already compressed blobs are stored as they are, their header is written from
+    the size and CRC recorded with the blob. With `zero_copy` such an entry's
+    content is yielded as its `ContentFile` instead of bytes, for the consumer to
+    copy from the file itself (`blob_store.send_file()`).
+    """
+    writer = ZipStreamWriter()
+    yield writer.write_stored('mimetype', b'application/epub+zip')
+    yield writer.write_stored('META-INF/container.xml', CONTAINER_XML)
+    async for chunk in writer.write_entry(OPF_PATH, stream_package(engine, book_id, identifier)):
+        yield chunk
+    opf_dir = OPF_PATH.rsplit('/', 1)[0]
+    for number, file in enumerate(files, start=1):
+        name = f'{opf_dir}/{file.href}'
+        compress = file.media_type not in PRECOMPRESSED_MEDIA_TYPES
+        if not compress and file.crc32 is not None:
+            yield writer.write_stored_header(name, file.crc32, file.size)
+            if zero_copy:
+                yield file
+            else:
+                async for chunk in map_file(file.path, 0, file.size, READ_SIZE):
+                    yield chunk
+        else:
+            async for chunk in writer.write_entry(name, map_file(file.path, chunk_size=READ_SIZE),
+                                                  compress=compress):
+                yield chunk
+        if progress is not None:
+            await progress(number, len(files))
+    yield writer.finish()
+
+
+async def export_epub(engine: AsyncEngine, book_id: int, output: Path, content_dir: Path = CONTENT_DIR,
+                      progress: Callable[[int, int], Awaitable[None]] | None = None) -> None:
+    """Write the .epub of a book to `output`.
+
+    Stored blobs are copied into the file by the kernel, without passing through Python.
+
+    Raises:
+        MissingContentError: some manifest items have no file.
+        MissingIdentifierError: the book has no `<dc:identifier>` with an id.
+    """
+    files = await manifest_files(engine, book_id, content_dir)
+    identifier = await unique_identifier(engine, book_id)
+    async with await anyio.open_file(output, 'wb') as file:
+        async for chunk in stream_epub(engine, book_id, files, identifier, progress, zero_copy=True):
+            if isinstance(chunk, ContentFile):
+                await file.flush()
+                await anyio.to_thread.run_sync(send_file, chunk.path, file.wrapped.fileno(), chunk.size)
+            else:
+                await file.write(chunk)
+
+
+async def export_job(context: JobContext) -> dict[str, Any]:
+    """`epub_export` job: params `book_id`, the .epub is the job's result file."""
+    book_id = context.params['book_id']
+    output = context.result_path(f'book-{book_id}.epub')
+    await export_epub(context.engine, book_id, output, progress=context.progress)
+    return {'book_id': book_id, 'size': output.stat().st_size}
+
+
+job_queue.register('epub_export', export_job)
+
+
+class EpubCLIPlugin(CLIPluginProtocol):
+    """Adds `litestar epub export BOOK_ID OUTPUT`, `litestar epub import PATHS...`, `litestar epub render`,
+    `litestar epub gc-blobs` and `litestar epub compile-templates`."""
+
+    def __init__(self, config: SQLAlchemyAsyncConfig) -> None:
+        self._config = config
+
+    def on_cli_init(self, cli: Group) -> None:
+        import click
+
+        config = self._config
+
+        @cli.group(name='epub')
+        def epub_group() -> None:
+            """Build EPUB files from the stored book data."""
+
+        @epub_group.command(name='export')
+        @click.argument('book_id', type=int)
+        @click.argument('output', type=click.Path(dir_okay=False, path_type=Path))
+        @click.option('--content-dir', type=click.Path(file_okay=False, path_type=Path), default=CONTENT_DIR,
+                      show_default=True, help='directory holding <book_id>/<href> content files')
+        def export_command(book_id: int, output: Path, content_dir: Path) -> None:
+            """Write the .epub of BOOK_ID to OUTPUT."""
+
+            async def run() -> None:
+                engine = config.get_engine()
+                try:
+                    await export_epub(engine, book_id, output, content_dir)
+                finally:
+                    await engine.dispose()
+
+            try:
+                anyio.run(run)
+            except (MissingContentError, MissingIdentifierError) as ex:
+                raise click.ClickException(str(ex)) from ex
+            click.echo(f'wrote {output}')
+
+        @epub_group.command(name='import')
+        @click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, path_type=Path))
+        @click.option('--workers', type=click.IntRange(min=1), default=IMPORT_WORKERS, show_default=True,
+                      help='processes parsing files in parallel')
+        def import_command(paths: tuple[Path, ...], workers: int) -> None:
+            """Create a book from the metadata of each .epub or .opf file in PATHS.
+
+            Directories are searched recursively.
+            """
+            files = import_paths(paths)
+
+            async def run() -> BulkResult[ImportedBook]:
+                engine = config.get_engine()
+                try:
+                    async with AsyncSession(engine, expire_on_commit=False) as session:
+                        with ProcessPoolExecutor(max_workers=workers) as executor:
+                            return await import_books(session, executor, file_jobs(files), window=workers * 2)
+                finally:
+                    await engine.dispose()
+
+            result = anyio.run(run)
+            for error in result.errors:
+                click.echo(f'skipped {error.detail}', err=True)
+            click.echo(f'imported {len(result.items)} of {len(files)} files, '
+                       f'{sum(book.lines for book in result.items)} lines')
+
+        @epub_group.command(name='render')
+        @click.argument('book_id', type=int, required=False)
+        def render_command(book_id: int | None) -> None:
+            """Render the stored metadata lines of BOOK_ID, or of every book.
+
+            Writes keep the rendered lines up to date, this fills them in for rows
+            written before the columns existed or by raw SQL.
+            """
+
+            async def run() -> int:
+                engine = config.get_engine()
+                try:
+                    async with engine.begin() as conn:
+                        return await conn.run_sync(render_book, book_id)
+                finally:
+                    await engine.dispose()
+
+            click.echo(f'rendered {anyio.run(run)} lines')
+
+        @epub_group.command(name='gc-blobs')
+        @click.option('--grace', type=click.IntRange(min=0), default=BLOB_GC_GRACE_SECONDS, show_default=True,
+                      help='seconds a blob has to be unused before it is deleted')
+        def gc_blobs_command(grace: int) -> None:
+            """Delete stored content files no manifest item refers to any more, with their image derivatives."""
+
+            async def run() -> tuple[int, int]:
+                engine = config.get_engine()
+                try:
+                    async with AsyncSession(engine) as session:
+                        return await collect_garbage(session, grace=grace), await collect_derivatives(session)
+                finally:
+                    await engine.dispose()
+
+            files, sources = anyio.run(run)
+            click.echo(f'removed {files} files and the image derivatives of {sources} sources')
+
+        @epub_group.command(name='compile-templates')
+        def compile_templates_command() -> None:
+            """Compile the Mako templates ahead of time, e.g. while building an image.
+
+            Application processes then import the compiled modules instead of
+            compiling the templates on their first render.
+            """
+            click.echo(f'compiled {compile_templates()} templates into {TEMPLATE_MODULE_DIR}')
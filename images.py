@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import shutil
+from pathlib import Path
+from typing import Literal, Optional
+
+import anyio
+import anyio.to_thread
+import msgspec
+from prometheus_client import Counter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from blob_store import BLOB_DIR
+from metrics import METRICS_PREFIX
+from model.blob import Blob
+from opf_import import WorkerPool
+
+# derivatives of a source image at <IMAGE_CACHE_DIR>/<2 hex digits>/<source SHA-256>/<spec>.<extension>
+IMAGE_CACHE_DIR = Path(os.environ.get('IMAGE_CACHE_DIR', str(BLOB_DIR / 'derivatives')))
+# processes resizing and encoding images
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '0')) or os.cpu_count() or 1
+# largest width or height a derivative may ask for
+IMAGE_MAX_DIMENSION = int(os.environ.get('IMAGE_MAX_DIMENSION', '4096'))
+
+ImageFormat = Literal['jpeg', 'png', 'webp']
+
+# output format by media type, images of other types can't be sources
+IMAGE_FORMATS: dict[str, ImageFormat] = {
+    'image/jpeg': 'jpeg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'png',
+}
+IMAGE_MEDIA_TYPES: dict[ImageFormat, str] = {'jpeg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp'}
+
+DERIVATIVES = Counter(
+    f'{METRICS_PREFIX}_image_derivatives', 'Image derivative requests, by whether the derivative was '
+    'cached, generated or joined a generation already running', ['outcome'],
+)
+
+
+class ImageSpec(msgspec.Struct, frozen=True):
+    """How to derive an image from its source.
+
+    The image is scaled down to fit `width` x `height`, never up. `contain`
+    keeps the whole image, `cover` fills both dimensions and crops the rest.
+    Without `format` the source's format is kept, see `IMAGE_FORMATS`.
+    """
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fit: Literal['contain', 'cover'] = 'contain'
+    format: Optional[ImageFormat] = None
+    quality: int = 80
+
+    @property
+    def name(self) -> str:
+        """File name of the derivative, everything that changes the output is in it."""
+        return (f'{self.width or 0}x{self.height or 0}-{self.fit}-q{self.quality}'
+                f'.{"jpg" if self.format == "jpeg" else self.format}')
+
+    def for_media_type(self, media_type: str) -> ImageSpec:
+        """The spec with the output format filled in for a source of `media_type`."""
+        if media_type not in IMAGE_FORMATS:
+            raise ValueError(f'{media_type} is not an image that can be resized')
+        if self.format is not None:
+            return self
+        return msgspec.structs.replace(self, format=IMAGE_FORMATS[media_type])
+
+
+# named specs for `?preset=`, the ones catalogue pages and reading devices ask for
+IMAGE_PRESETS: dict[str, ImageSpec] = {
+    'thumbnail': ImageSpec(width=160, height=240, fit='cover', format='webp', quality=75),
+    'catalogue': ImageSpec(width=320, height=480, fit='cover', format='webp'),
+    'cover': ImageSpec(width=1600, height=2400, format='jpeg', quality=85),
+    'e-ink': ImageSpec(width=1072, height=1448, format='png'),
+}
+
+
+class UndecodableImage(Exception):
+    """The source is not an image that can be decoded, it is truncated, damaged or of another type."""
+
+
+def make_derivative(source: str, target: str, spec: ImageSpec) -> int:
+    """Write the derivative of the image at `source` to `target`, returns its size.
+
+    Module level so the process pool can run it. The file is written under a
+    temporary name and renamed, a reader never sees half an image.
+
+    Raises:
+        UndecodableImage: the source could not be decoded, an error writing the target is raised as is.
+    """
+    from PIL import Image, ImageOps
+
+    size = (spec.width or IMAGE_MAX_DIMENSION, spec.height or IMAGE_MAX_DIMENSION)
+    try:
+        with Image.open(source) as image:
+            # JPEG sources decode at a fraction of their size when that is still larger than needed
+            image.draft('RGB', size)
+            image = ImageOps.exif_transpose(image)
+            if spec.fit == 'cover' and spec.width and spec.height:
+                image = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+            else:
+                image.thumbnail(size, Image.Resampling.LANCZOS)
+            if spec.format == 'jpeg' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+    except (OSError, Image.DecompressionBombError) as ex:
+        # UnidentifiedImageError is an OSError too; the message alone crosses back from the process
+        raise UndecodableImage(f'the image cannot be decoded: {ex}') from None
+    temporary = f'{target}.{os.getpid()}.tmp'
+    image.save(temporary, spec.format.upper(), quality=spec.quality, optimize=True)
+    os.replace(temporary, target)
+    return os.path.getsize(target)
+
+
+# resizing runs in its own pool, a large import does not hold up derivatives
+image_pool = WorkerPool(IMAGE_WORKERS)
+
+
+class ImageDerivatives:
+    """Resized and re-encoded images, generated on first request and kept by source hash and spec.
+
+    Concurrent requests for a derivative that is being generated wait for that
+    generation instead of starting their own, a burst of catalogue views resizes
+    a cover once. Across processes the rename in `make_derivative()` keeps the
+    file whole, two processes may still both generate it.
+    """
+
+    def __init__(self, root: Path = IMAGE_CACHE_DIR, pool: WorkerPool = image_pool) -> None:
+        self.root = root
+        self.pool = pool
+        self._pending: dict[Path, asyncio.Task[Path]] = {}
+
+    def path(self, source_sha256: str, spec: ImageSpec) -> Path:
+        return self.root / source_sha256[:2] / source_sha256 / spec.name
+
+    async def get(self, source: Path, source_sha256: str, spec: ImageSpec) -> Path:
+        """The path of the derivative of `source`, generated in the process pool if it is not there yet.
+
+        Args:
+            source: the source image file.
+            source_sha256: SHA-256 of the source's content, the derivatives are kept under it.
+            spec: how to derive the image, with its format filled in.
+        """
+        path = self.path(source_sha256, spec)
+        if path not in self._pending and await anyio.Path(path).is_file():
+            DERIVATIVES.labels('cached').inc()
+            return path
+        # looked up after the check above, another request may have started the generation meanwhile
+        task = self._pending.get(path)
+        if task is None:
+            task = self._pending[path] = asyncio.ensure_future(self._generate(source, path, spec))
+            task.add_done_callback(functools.partial(self._forget, path))
+            DERIVATIVES.labels('generated').inc()
+        else:
+            DERIVATIVES.labels('joined').inc()
+        # a waiter that gives up must not cancel the generation the others wait for
+        return await asyncio.shield(task)
+
+    def _forget(self, path: Path, task: asyncio.Task[Path]) -> None:
+        self._pending.pop(path, None)
+        # retrieved here, in case every request waiting for it went away
+        if not task.cancelled():
+            task.exception()
+
+    async def _generate(self, source: Path, path: Path, spec: ImageSpec) -> Path:
+        await anyio.Path(path.parent).mkdir(parents=True, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.pool.executor, make_derivative, str(source), str(path), spec)
+        return path
+
+    def remove_unknown(self, known: set[str]) -> int:
+        """Delete the derivatives of sources not in `known`, returns how many sources had some."""
+        removed = 0
+        for directory in self.root.glob('??/*'):
+            if directory.name not in known:
+                shutil.rmtree(directory, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+image_derivatives = ImageDerivatives()
+
+
+async def collect_derivatives(session: AsyncSession, derivatives: ImageDerivatives = image_derivatives) -> int:
+    """Delete the derivatives of blobs that are gone, returns how many sources had some."""
+    known = set((await session.scalars(select(Blob.sha256))).all())
+    return await anyio.to_thread.run_sync(derivatives.remove_unknown, known)
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from logger import logger
+from model.job import JOB_CANCELLED, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, Job
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+# jobs run at the same time by one application process
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+# job results live at <JOB_RESULT_DIR>/<job_id>/, uploads waiting for a job under <JOB_RESULT_DIR>/input/
+JOB_RESULT_DIR = Path(os.environ.get('JOB_RESULT_DIR', 'job-results'))
+# seconds shutdown waits for running jobs before interrupting them
+JOB_DRAIN_SECONDS = float(os.environ.get('JOB_DRAIN_SECONDS', '30'))
+# running jobs without a progress update for this long are taken to be lost with their process
+JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', '3600'))
+# seconds between looks for jobs queued by other application processes
+JOB_POLL_SECONDS = 2.0
+# seconds between progress writes of one job
+PROGRESS_INTERVAL = 1.0
+
+INTERRUPTED = 'interrupted by shutdown'
+
+
+class JobCancelled(Exception):
+    """Raised by `JobContext.progress()` when the job was cancelled from another process."""
+
+
+class JobContext:
+    """What a job handler gets to work with: its parameters, the database and its result directory."""
+
+    def __init__(self, queue: JobQueue, job_id: int, params: dict[str, Any]) -> None:
+        self.queue = queue
+        self.job_id = job_id
+        self.params = params
+        self.result_file: str | None = None
+        self.done = 0
+        self.total: int | None = None
+        self._written = 0.0
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return self.queue.engine
+
+    def session(self) -> AsyncSession:
+        return self.queue.session_maker()
+
+    @property
+    def result_dir(self) -> Path:
+        return self.queue.result_dir / str(self.job_id)
+
+    def result_path(self, name: str) -> Path:
+        """Path of the file the job produces, it is what `/jobs/{job_id}/result` downloads."""
+        self.result_dir.mkdir(parents=True, exist_ok=True)
+        self.result_file = f'{self.job_id}/{Path(name).name}'
+        return self.queue.result_dir / self.result_file
+
+    async def progress(self, done: int, total: int | None = None) -> None:
+        """Record how far the job is.
+
+        Writes are throttled to one per `PROGRESS_INTERVAL`, each one also checks
+        whether the job was cancelled through another application process.
+
+        Raises:
+            JobCancelled: the job was cancelled.
+        """
+        self.done = done
+        if total is not None:
+            self.total = total
+        now = time.monotonic()
+        if now - self._written < PROGRESS_INTERVAL and done != self.total:
+            return
+        self._written = now
+        async with self.session() as session:
+            await session.execute(update(Job).where(Job.id == self.job_id)
+                                  .values(done=self.done, total=self.total, updated_at=utc_now()))
+            cancel_requested = await session.scalar(select(Job.cancel_requested).where(Job.id == self.job_id))
+            await session.commit()
+        if cancel_requested:
+            raise JobCancelled()
+
+
+# a job handler returns the JSON result of the job
+JobHandler = Callable[[JobContext], Awaitable[Optional[dict[str, Any]]]]
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobQueue:
+    """Runs long exports and imports in the background of the application process.
+
+    Jobs are rows of the `job` table, so their state survives a restart and any
+    application process can answer `/jobs/{job_id}`. Each process runs up to
+    `workers` jobs at a time, claiming queued rows with a conditional UPDATE so
+    two processes never run the same job.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, result_dir: Path = JOB_RESULT_DIR,
+                 drain_seconds: float = JOB_DRAIN_SECONDS) -> None:
+        self.workers = workers
+        self.result_dir = result_dir
+        self.drain_seconds = drain_seconds
+        self.handlers: dict[str, JobHandler] = {}
+        self.engine: AsyncEngine | None = None
+        self.session_maker: Callable[[], AsyncSession] | None = None
+        self._accepting = False
+        self._wake = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        self._running: dict[int, asyncio.Task] = {}
+        self._cancelled: set[int] = set()
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self.handlers[kind] = handler
+
+    def input_dir(self) -> Path:
+        """A new directory for files a job is going to read.
+
+        Jobs name it in their `input_dir` param, relative to `result_dir`, and it is
+        removed when the job finishes.
+        """
+        path = self.result_dir / 'input' / uuid.uuid4().hex
+        path.mkdir(parents=True)
+        return path
+
+    async def submit(self, session: AsyncSession, kind: str, params: dict[str, Any],
+                     total: int | None = None) -> Job:
+        """Queue a job and commit it, a worker picks it up straight away when one is free."""
+        if kind not in self.handlers:
+            raise ValueError(f'unknown job kind {kind!r}')
+        job = Job(kind=kind, status=JOB_QUEUED, params=params, done=0, total=total, cancel_requested=False)
+        session.add(job)
+        await session.commit()
+        self._wake.set()
+        return job
+
+    async def cancel(self, session: AsyncSession, job_id: int) -> Job:
+        """Cancel a queued or running job, finished jobs are left as they are."""
+        job = await session.get_one(Job, job_id)
+        if job.status == JOB_QUEUED:
+            result = await session.execute(update(Job).where(Job.id == job_id, Job.status == JOB_QUEUED)
+                                           .values(status=JOB_CANCELLED, finished_at=utc_now(), updated_at=utc_now()))
+            if result.rowcount == 0:
+                # a worker claimed it in the meantime
+                await session.refresh(job)
+        if job.status == JOB_RUNNING:
+            job.cancel_requested = True
+            # the job runs here, otherwise its process notices on the next progress update
+            task = self._running.get(job_id)
+            if task is not None:
+                self._cancelled.add(job_id)
+                task.cancel()
+        await session.commit()
+        await session.refresh(job)
+        return job
+
+    def remove_input(self, params: dict[str, Any]) -> None:
+        if params.get('input_dir'):
+            shutil.rmtree(self.result_dir / params['input_dir'], ignore_errors=True)
+
+    def remove_files(self, job_id: int, params: dict[str, Any]) -> None:
+        """Delete the result and input files of a job."""
+        shutil.rmtree(self.result_dir / str(job_id), ignore_errors=True)
+        self.remove_input(params)
+
+    async def on_startup(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        self.session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        self.result_dir.mkdir(parents=True, exist_ok=True)
+        self._wake = asyncio.Event()
+        await self._fail_stale()
+        self._accepting = True
+        self._workers = [asyncio.create_task(self._work(), name=f'job-worker-{number}')
+                         for number in range(self.workers)]
+
+    async def on_shutdown(self) -> None:
+        """Stop taking jobs and give the running ones `drain_seconds` to finish.
+
+        Jobs still running after that are cancelled and marked failed, queued jobs
+        stay queued for the next start.
+        """
+        if not self._workers:
+            return
+        self._accepting = False
+        self._wake.set()
+        running = list(self._running.values())
+        if running:
+            logger.info(f'waiting up to {self.drain_seconds}s for {len(running)} running jobs')
+            _, pending = await asyncio.wait(running, timeout=self.drain_seconds)
+            for task in pending:
+                task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # the plugin disposed the engine before the shutdown hooks ran, close what the drain reopened
+        await self.engine.dispose()
+
+    async def _fail_stale(self) -> None:
+        cutoff = utc_now() - timedelta(seconds=JOB_STALE_SECONDS)
+        async with self.session_maker() as session:
+            await session.execute(update(Job).where(Job.status == JOB_RUNNING, Job.updated_at < cutoff)
+                                  .values(status=JOB_FAILED, error=INTERRUPTED,
+                                          finished_at=utc_now(), updated_at=utc_now()))
+            await session.commit()
+
+    async def _claim(self) -> tuple[int, str, dict[str, Any]] | None:
+        async with self.session_maker() as session:
+            while True:
+                row = (await session.execute(
+                    select(Job.id, Job.kind, Job.params)
+                    .where(Job.status == JOB_QUEUED, Job.kind.in_(self.handlers))
+                    .order_by(Job.id).limit(1))).first()
+                if row is None:
+                    return None
+                result = await session.execute(update(Job).where(Job.id == row.id, Job.status == JOB_QUEUED)
+                                               .values(status=JOB_RUNNING, started_at=utc_now(), updated_at=utc_now()))
+                await session.commit()
+                if result.rowcount == 1:
+                    return row.id, row.kind, row.params
+
+    async def _work(self) -> None:
+        while self._accepting:
+            try:
+                claimed = await self._claim()
+            except Exception as ex:
+                logger.error('job claim failed ' + str(ex))
+                claimed = None
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                if self._accepting:
+                    self._wake.clear()
+                continue
+            await self._run(*claimed)
+
+    async def _run(self, job_id: int, kind: str, params: dict[str, Any]) -> None:
+        context = JobContext(self, job_id, params)
+        task = asyncio.create_task(self.handlers[kind](context), name=f'job-{job_id}')
+        self._running[job_id] = task
+        values: dict[str, Any]
+        try:
+            result = await task
+            values = {'status': JOB_SUCCEEDED, 'result': result, 'result_file': context.result_file}
+            if context.total is not None:
+                values['done'] = context.total
+        except JobCancelled:
+            values = {'status': JOB_CANCELLED}
+        except asyncio.CancelledError:
+            # cancelled through `cancel()`, or still running when the shutdown drain ran out
+            values = {'status': JOB_CANCELLED} if job_id in self._cancelled else {'status': JOB_FAILED,
+                                                                                  'error': INTERRUPTED}
+        except Exception as ex:
+            logger.error(f'job {job_id} ({kind}) failed ' + str(ex))
+            values = {'status': JOB_FAILED, 'error': str(ex)}
+        finally:
+            self._running.pop(job_id, None)
+            self._cancelled.discard(job_id)
+        if values['status'] != JOB_SUCCEEDED:
+            shutil.rmtree(context.result_dir, ignore_errors=True)
+        self.remove_input(params)
+        async with self.session_maker() as session:
+            await session.execute(update(Job).where(Job.id == job_id)
+                                  .values(finished_at=utc_now(), updated_at=utc_now(), **values))
+            await session.commit()
+
+
+job_queue = JobQueue()
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+from litestar.contrib.prometheus import PrometheusConfig, PrometheusMiddleware
+from litestar.utils import join_paths
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from database import pool_stats
+from logger import logger
+
+if TYPE_CHECKING:
+    from litestar import Request
+    from litestar.handlers import BaseRouteHandler
+    from litestar.types import Receive, Scope, Send
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+METRICS_PREFIX = 'bookcreator'
+# statements slower than this are counted per endpoint and logged
+SLOW_QUERY_MS = int(os.environ.get('DB_SLOW_QUERY_MS', '200'))
+
+QUERY_DURATION = Histogram(
+    f'{METRICS_PREFIX}_db_query_duration_seconds', 'Duration of single SQL statements, in seconds',
+    ['method', 'path'], buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5),
+)
+QUERIES_PER_REQUEST = Histogram(
+    f'{METRICS_PREFIX}_db_queries_per_request', 'SQL statements run by one request',
+    ['method', 'path'], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+QUERY_TIME_PER_REQUEST = Histogram(
+    f'{METRICS_PREFIX}_db_query_seconds_per_request', 'Time one request spent in SQL statements, in seconds',
+    ['method', 'path'], buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+)
+SLOW_QUERIES = Counter(
+    f'{METRICS_PREFIX}_db_slow_queries', f'SQL statements slower than DB_SLOW_QUERY_MS ({SLOW_QUERY_MS} ms)',
+    ['method', 'path'],
+)
+
+
+@dataclass
+class RequestQueries:
+    """SQL statements run while handling one request."""
+    method: str
+    path: str
+    count: int = 0
+    seconds: float = 0.0
+
+
+# set by `RouteMetricsMiddleware` for the request being handled, `None` outside requests
+_request_queries: ContextVar[RequestQueries | None] = ContextVar('request_queries', default=None)
+
+_route_templates: dict[int, str] = {}
+
+
+def route_template(route_handler: BaseRouteHandler) -> str:
+    """Full path template of `route_handler`, e.g. `/meta-data-tag/{tag_id:int}`.
+
+    Used as the `path` label instead of the requested path, which would give every
+    id its own time series.
+    """
+    template = _route_templates.get(id(route_handler))
+    if template is None:
+        layers = [layer.path for layer in reversed(route_handler.ownership_layers[1:]) if hasattr(layer, 'path')]
+        template = join_paths([*layers, sorted(route_handler.paths)[0]])
+        _route_templates[id(route_handler)] = template
+    return template
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                           executemany: bool) -> None:
+    conn.info['query_started_at'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                          executemany: bool) -> None:
+    started_at = conn.info.pop('query_started_at', None)
+    if started_at is None:
+        return
+    seconds = time.perf_counter() - started_at
+    queries = _request_queries.get()
+    method, path = (queries.method, queries.path) if queries is not None else ('', '')
+    if queries is not None:
+        queries.count += 1
+        queries.seconds += seconds
+    QUERY_DURATION.labels(method, path).observe(seconds)
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.labels(method, path).inc()
+        logger.warning(f'slow query {seconds * 1000:.1f} ms {method} {path}: {" ".join(statement.split())[:500]}')
+
+
+def _handle_error(context: Any) -> None:
+    if context.connection is not None:
+        context.connection.info.pop('query_started_at', None)
+
+
+def install_query_hooks() -> None:
+    """Time every statement of every engine, sync engines behind async ones included."""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+
+class RouteMetricsMiddleware(PrometheusMiddleware):
+    """`PrometheusMiddleware` labelled by route template, also recording the SQL each request runs."""
+
+    def _get_default_labels(self, request: Request[Any, Any, Any]) -> dict[str, str | int | float]:
+        labels = super()._get_default_labels(request)
+        labels['path'] = route_template(request.scope['route_handler'])
+        return labels
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        queries = RequestQueries(method=scope.get('method', scope['type']),
+                                 path=route_template(scope['route_handler']))
+        token = _request_queries.set(queries)
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _request_queries.reset(token)
+            QUERIES_PER_REQUEST.labels(queries.method, queries.path).observe(queries.count)
+            QUERY_TIME_PER_REQUEST.labels(queries.method, queries.path).observe(queries.seconds)
+
+
+class PoolCollector(Collector):
+    """Reports the connection pools of the tracked engines when `/metrics` is scraped."""
+
+    def __init__(self) -> None:
+        self.engines: dict[str, Callable[[], AsyncEngine | None]] = {}
+
+    def track(self, database: str, engine: Callable[[], AsyncEngine | None]) -> None:
+        self.engines[database] = engine
+
+    def collect(self) -> Iterator[GaugeMetricFamily | CounterMetricFamily]:
+        gauges = {
+            name: GaugeMetricFamily(f'{METRICS_PREFIX}_db_pool_{name}', documentation, labels=['database'])
+            for name, documentation in (
+                ('size', 'Connections the pool keeps open'),
+                ('max_overflow', 'Connections the pool may open beyond its size'),
+                ('checked_in', 'Idle connections in the pool'),
+                ('checked_out', 'Connections in use'),
+                ('overflow', 'Connections open beyond the pool size'),
+                ('wait_max_seconds', 'Longest wait for a connection so far'),
+            )
+        }
+        counters = {
+            name: CounterMetricFamily(f'{METRICS_PREFIX}_db_pool_{name}', documentation, labels=['database'])
+            for name, documentation in (
+                ('checkouts', 'Connections handed out'),
+                ('timeouts', 'Checkouts that gave up after DB_POOL_TIMEOUT'),
+                ('wait_seconds', 'Total time spent waiting for connections'),
+            )
+        }
+        for database, engine_getter in self.engines.items():
+            engine = engine_getter()
+            if engine is None:
+                continue
+            stats = pool_stats(engine.pool)
+            values = {
+                'size': stats.size, 'max_overflow': stats.max_overflow, 'checked_in': stats.checked_in,
+                'checked_out': stats.checked_out, 'overflow': stats.overflow, 'checkouts': stats.checkouts,
+                'timeouts': stats.timeouts,
+                'wait_max_seconds': stats.wait_max_ms / 1000 if stats.wait_max_ms is not None else None,
+                'wait_seconds': getattr(engine.pool, 'wait_total', None),
+            }
+            for name, value in values.items():
+                if value is not None:
+                    (gauges.get(name) or counters[name]).add_metric([database], value)
+        yield from gauges.values()
+        yield from counters.values()
+
+
+pool_collector = PoolCollector()
+REGISTRY.register(pool_collector)
+
+
+def prometheus_config() -> PrometheusConfig:
+    """Request metrics for every route except `/metrics` itself.
+
+    With several worker processes set PROMETHEUS_MULTIPROC_DIR; the request and query
+    metrics are then merged across workers, the pool gauges are per process and
+    only reported without it.
+    """
+    return PrometheusConfig(app_name=METRICS_PREFIX, prefix=METRICS_PREFIX, exclude=['^/metrics'],
+                            middleware_class=RouteMetricsMiddleware)
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import anyio
+import sqlalchemy as sa
+from advanced_alchemy.types import DateTimeUTC
+from alembic import command, op
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from litestar.plugins import CLIPluginProtocol
+from sqlalchemy import inspect
+
+from logger import logger
+from model.book import BOOK_PARTITIONS
+
+if TYPE_CHECKING:
+    from click import Group
+    from litestar.contrib.sqlalchemy.plugins import SQLAlchemyAsyncConfig
+    from sqlalchemy import Connection
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / 'migrations'
+# advanced-alchemy's default, so its `litestar database ...` commands see the same revisions
+VERSION_TABLE = 'alembic_versions'
+# upgrade a database that is behind on startup instead of refusing to start; meant for one
+# application process and local SQLite, several processes starting at once would race
+MIGRATE_ON_STARTUP = os.environ.get('DB_MIGRATE_ON_STARTUP', '0').lower() in {'1', 'true', 'yes', 'on'}
+# the schema `Base.metadata.create_all()` made before there were migrations
+BASELINE_REVISION = '0001'
+
+
+class SchemaOutOfDate(Exception):
+    """The database is not at the revision the code was written for."""
+
+
+def alembic_config(connection: Connection | None = None) -> Config:
+    """Alembic configuration of the migrations in `migrations/`, without an `alembic.ini`.
+
+    `migrations/env.py` runs the migrations on `connection`, which lets them run
+    inside an event loop through `AsyncConnection.run_sync()`.
+    """
+    config = Config()
+    config.set_main_option('script_location', str(MIGRATIONS_DIR))
+    config.version_table_name = VERSION_TABLE
+    config.attributes['connection'] = connection
+    return config
+
+
+@lru_cache(maxsize=1)
+def head_revisions() -> frozenset[str]:
+    """The revisions the code expects, read from the migration scripts once per process."""
+    return frozenset(ScriptDirectory.from_config(alembic_config()).get_heads())
+
+
+def current_revisions(connection: Connection) -> frozenset[str]:
+    """The revisions the database is at, empty when it has never been migrated."""
+    context = MigrationContext.configure(connection, opts={'version_table': VERSION_TABLE})
+    return frozenset(context.get_current_heads())
+
+
+def upgrade(connection: Connection, revision: str = 'head') -> None:
+    """Migrate the database of `connection` to `revision`, e.g. through `AsyncConnection.run_sync()`."""
+    command.upgrade(alembic_config(connection), revision)
+
+
+def stamp(connection: Connection, revision: str) -> None:
+    """Record `revision` as the one the database is at, without migrating."""
+    command.stamp(alembic_config(connection), revision)
+
+
+def _created_without_migrations(connection: Connection) -> bool:
+    # the tables every version of the application had, the ones added since may be missing
+    inspector = inspect(connection)
+    return inspector.has_table('meta_data_tag') or inspector.has_table('meta_data_line')
+
+
+def audit_columns() -> list[sa.Column]:
+    """`created_at` and `updated_at` of `Base`, for the tables of the migrations."""
+    return [sa.Column('created_at', DateTimeUTC(timezone=True), nullable=False),
+            sa.Column('updated_at', DateTimeUTC(timezone=True), nullable=False)]
+
+
+def create_book_table(name: str, key: str, *columns: Any) -> sa.Table:
+    """Create a table scoped by book in a migration, see `model.book.book_table_args()`."""
+    partitioned = BOOK_PARTITIONS > 0
+    return op.create_table(
+        name,
+        sa.Column(key, sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        *columns,
+        sa.ForeignKeyConstraint(['book_id'], ['book.book_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint(key, *(['book_id'] if partitioned else [])),
+        **({'postgresql_partition_by': 'HASH (book_id)'} if partitioned else {}),
+    )
+
+
+async def check_revision(engine: AsyncEngine, migrate: bool = MIGRATE_ON_STARTUP) -> None:
+    """Make sure the database schema matches the code, run on every application start.
+
+    Costs one look at the version table; only a database that is behind takes
+    more, then it is either upgraded (`migrate`) or the start is refused. A
+    database `create_all()` made before there were migrations is at
+    `BASELINE_REVISION`, with `migrate` it is stamped so and upgraded.
+
+    Raises:
+        SchemaOutOfDate: the database needs migrations and `migrate` is off.
+    """
+    async with engine.connect() as connection:
+        current = await connection.run_sync(current_revisions)
+        if current == head_revisions():
+            return
+        unversioned = not current and await connection.run_sync(_created_without_migrations)
+    if unversioned and not migrate:
+        raise SchemaOutOfDate(f'the database was created before it had migrations, mark it with '
+                              f'`litestar --app main:app migrations stamp {BASELINE_REVISION}` and upgrade it')
+    if not migrate:
+        raise SchemaOutOfDate(f'the database is at revision {", ".join(sorted(current)) or "none"} and the code '
+                              f'needs {", ".join(sorted(head_revisions()))}, '
+                              f'run `litestar --app main:app migrations upgrade`')
+    start = BASELINE_REVISION if unversioned else ', '.join(sorted(current)) or 'none'
+    logger.info(f'upgrading the database from revision {start}')
+    async with engine.begin() as connection:
+        if unversioned:
+            await connection.run_sync(stamp, BASELINE_REVISION)
+        await connection.run_sync(upgrade)
+
+
+class MigrationCLIPlugin(CLIPluginProtocol):
+    """Adds `litestar migrations upgrade|downgrade|stamp|current|revision`."""
+
+    def __init__(self, config: SQLAlchemyAsyncConfig) -> None:
+        self._config = config
+
+    def on_cli_init(self, cli: Group) -> None:
+        import click
+
+        config = self._config
+
+        def run(name: str, *args: Any, **kwargs: Any) -> None:
+            """Run the alembic command `name` on a connection of the application's database."""
+
+            def on_connection(connection: Connection) -> None:
+                getattr(command, name)(alembic_config(connection), *args, **kwargs)
+
+            async def main() -> None:
+                engine = config.get_engine()
+                try:
+                    async with engine.begin() as connection:
+                        await connection.run_sync(on_connection)
+                finally:
+                    await engine.dispose()
+
+            anyio.run(main)
+
+        @cli.group(name='migrations')
+        def migrations_group() -> None:
+            """Create and migrate the database schema."""
+
+        @migrations_group.command(name='upgrade')
+        @click.argument('revision', default='head')
+        def upgrade_command(revision: str) -> None:
+            """Migrate the database up to REVISION, the latest one by default."""
+            run('upgrade', revision)
+
+        @migrations_group.command(name='downgrade')
+        @click.argument('revision')
+        def downgrade_command(revision: str) -> None:
+            """Migrate the database back to REVISION, e.g. `-1` for the one before the current."""
+            run('downgrade', revision)
+
+        @migrations_group.command(name='stamp')
+        @click.argument('revision')
+        def stamp_command(revision: str) -> None:
+            """Record REVISION as current without migrating, e.g. `0001` for a database made by `create_all()`
+            before there were migrations."""
+            run('stamp', revision)
+
+        @migrations_group.command(name='current')
+        def current_command() -> None:
+            """Show the revision the database is at."""
+            run('current')
+
+        @migrations_group.command(name='revision')
+        @click.argument('message')
+        @click.option('--autogenerate', is_flag=True, help='compare the models with the database for the steps')
+        def revision_command(message: str, autogenerate: bool) -> None:
+            """Write a new migration script to `migrations/versions/`."""
+            run('revision', message=message, autogenerate=autogenerate)
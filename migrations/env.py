@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import TYPE_CHECKING, Any
+
+from alembic import context
+
+# every model module, so `Base.metadata` holds all tables `migrations revision --autogenerate` compares
+import model.job  # noqa: F401
+import model.meta_data_attribute_value  # noqa: F401
+import model.meta_data_tag_value  # noqa: F401
+import model.spine_item_ref  # noqa: F401
+from model.base import Base
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection
+
+config = context.config
+target_metadata = Base.metadata
+
+# FTS5 tables of `search.SearchIndex` and their shadow tables, made by raw DDL rather than models
+FTS_TABLE = re.compile(r'_fts(_data|_idx|_content|_docsize|_config)?$')
+
+
+def include_object(obj: Any, name: str, type_: str, reflected: bool, compare_to: Any) -> bool:
+    """Leave out of `--autogenerate` what the models only create through DDL events or on other dialects."""
+    if type_ == 'table' and reflected and compare_to is None and FTS_TABLE.search(name):
+        return False
+    if type_ == 'index' and not reflected and obj._ddl_if is not None:
+        return obj._ddl_if.dialect in (None, context.get_context().dialect.name)
+    return True
+
+
+def configure(**kwargs: Any) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        include_object=include_object,
+        version_table=getattr(config, 'version_table_name', 'alembic_versions'),
+        render_as_batch=getattr(config, 'render_as_batch', True),
+        compare_type=getattr(config, 'compare_type', False),
+        user_module_prefix=getattr(config, 'user_module_prefix', 'sa.'),
+        **kwargs,
+    )
+
+
+def run_migrations(connection: Connection) -> None:
+    if connection.dialect.name == 'sqlite':
+        # batch operations copy a table and drop the original, which SQLite refuses while another
+        # table refers to it and foreign keys are on; `database.create_engine()` turns them back on
+        connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+    configure(connection=connection)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online() -> None:
+    """`litestar database ...` hands over the application's engine."""
+    async with config.engine.connect() as connection:
+        await connection.run_sync(run_migrations)
+    await config.engine.dispose()
+
+
+if context.is_offline_mode():
+    configure(url=config.db_url, literal_binds=True, dialect_opts={'paramstyle': 'named'})
+    with context.begin_transaction():
+        context.run_migrations()
+elif config.attributes.get('connection') is not None:
+    # `migration.upgrade()` runs inside the application's event loop on one of its connections
+    run_migrations(config.attributes['connection'])
+else:
+    asyncio.run(run_migrations_online())
@@ -0,0 +1,82 @@
+"""Initial schema, as `create_all()` made it before there were migrations.
+
+A database created then is at this revision, `migrations stamp 0001` marks it
+so and the revisions after it bring it up to date.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+from migration import audit_columns
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'meta_data_attribute',
+        sa.Column('meta_data_attribute_id', sa.Integer(), nullable=False),
+        sa.Column('sort_order', sa.Integer(), nullable=False),
+        *audit_columns(),
+        sa.Column('name', sa.String(length=30), nullable=False),
+        sa.Column('place_holder', sa.String(length=100), nullable=True),
+        sa.Column('tool_tip', sa.String(length=100), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('meta_data_attribute_id'),
+    )
+    op.create_table(
+        'meta_data_line',
+        sa.Column('line_id', sa.Integer(), nullable=False),
+        *audit_columns(),
+        sa.Column('name', sa.String(length=30), nullable=False),
+        sa.PrimaryKeyConstraint('line_id'),
+    )
+    op.create_table(
+        'meta_data_tag',
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        *audit_columns(),
+        sa.Column('sort_order', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=30), nullable=False),
+        sa.Column('tag', sa.String(length=30), nullable=False),
+        sa.Column('place_holder', sa.String(length=100), nullable=True),
+        sa.Column('tool_tip', sa.String(length=100), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('tag_id'),
+    )
+    op.create_table(
+        'meta_data_attribute_value',
+        sa.Column('meta_data_attribute_value_id', sa.Integer(), nullable=False),
+        sa.Column('line_id', sa.Integer(), nullable=False),
+        sa.Column('attribute_id', sa.Integer(), nullable=False),
+        *audit_columns(),
+        sa.Column('attribute_value', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('meta_data_attribute_value_id'),
+        sa.ForeignKeyConstraint(['line_id'], ['meta_data_line.line_id']),
+        sa.ForeignKeyConstraint(['attribute_id'], ['meta_data_attribute.meta_data_attribute_id']),
+    )
+    op.create_table(
+        'meta_data_tag_value',
+        sa.Column('meta_data_value_id', sa.Integer(), nullable=False),
+        sa.Column('line_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        *audit_columns(),
+        sa.Column('is_empty_tag', sa.Boolean(), nullable=True),
+        sa.Column('value', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('meta_data_value_id'),
+        sa.ForeignKeyConstraint(['line_id'], ['meta_data_line.line_id']),
+        sa.ForeignKeyConstraint(['tag_id'], ['meta_data_tag.tag_id']),
+    )
+
+
+def downgrade() -> None:
+    for name in ('meta_data_tag_value', 'meta_data_attribute_value', 'meta_data_tag', 'meta_data_line',
+                 'meta_data_attribute'):
+        op.drop_table(name)
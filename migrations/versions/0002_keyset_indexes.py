@@ -0,0 +1,27 @@
+"""Index the tag and attribute lists in their keyset order.
+
+The line list is ordered within its book, its index comes with the books in 0003.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from alembic import op
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_meta_data_tag_keyset', 'meta_data_tag', ['sort_order', 'name', 'tag_id'])
+    op.create_index('ix_meta_data_attribute_keyset', 'meta_data_attribute',
+                    ['sort_order', 'name', 'meta_data_attribute_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_meta_data_attribute_keyset', 'meta_data_attribute')
+    op.drop_index('ix_meta_data_tag_keyset', 'meta_data_tag')
@@ -0,0 +1,146 @@
+"""Scope the metadata lines and their values by book.
+
+Lines and values written before there were books all go to one book made for
+them, titled `DEFAULT_BOOK_TITLE`. With `DB_BOOK_PARTITIONS` on Postgres the
+tables are made again hash partitioned by `book_id`, which only works while
+they are empty; a table with rows cannot turn into a partitioned one in place.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+from advanced_alchemy.types import DateTimeUTC
+from alembic import op
+
+from migration import audit_columns, create_book_table
+from model.book import BOOK_PARTITIONS, create_book_partitions
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+DEFAULT_BOOK_TITLE = 'Untitled'
+
+VALUE_TABLES = ('meta_data_tag_value', 'meta_data_attribute_value')
+SCOPED_TABLES = ('meta_data_line', *VALUE_TABLES)
+
+# Postgres' names for unnamed foreign keys, given to the ones SQLite reflects for a batch copy as well
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+
+
+def partitioned() -> bool:
+    return BOOK_PARTITIONS > 0 and op.get_bind().dialect.name == 'postgresql'
+
+
+def has_rows() -> bool:
+    connection = op.get_bind()
+    return any(connection.scalar(sa.select(sa.func.count()).select_from(sa.table(name))) for name in SCOPED_TABLES)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'book',
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        *audit_columns(),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('language', sa.String(length=35), nullable=True),
+        sa.PrimaryKeyConstraint('book_id'),
+    )
+    if partitioned():
+        create_partitioned_tables()
+    else:
+        add_book_columns()
+    op.create_index('ix_meta_data_line_keyset', 'meta_data_line', ['book_id', 'name', 'line_id'])
+    for name in VALUE_TABLES:
+        op.create_index(f'ix_{name}_book_line', name, ['book_id', 'line_id'])
+
+
+def add_book_columns() -> None:
+    """Add `book_id` to the tables, filled in with the default book, and key the values by `(book_id, line_id)`."""
+    for name in SCOPED_TABLES:
+        op.add_column(name, sa.Column('book_id', sa.Integer(), nullable=True))
+    if has_rows():
+        book = sa.table('book', sa.column('book_id', sa.Integer()), sa.column('title', sa.String()),
+                        sa.column('created_at', DateTimeUTC(timezone=True)),
+                        sa.column('updated_at', DateTimeUTC(timezone=True)))
+        now = datetime.now(timezone.utc)
+        book_id = op.get_bind().scalar(book.insert().values(title=DEFAULT_BOOK_TITLE, created_at=now, updated_at=now)
+                                       .returning(book.c.book_id))
+        for name in SCOPED_TABLES:
+            op.execute(sa.table(name, sa.column('book_id')).update().values(book_id=book_id))
+    # the values' foreign key needs the unique constraint it refers to
+    with op.batch_alter_table('meta_data_line', naming_convention=NAMING_CONVENTION) as batch:
+        batch.alter_column('book_id', existing_type=sa.Integer(), nullable=False)
+        batch.create_foreign_key('meta_data_line_book_id_fkey', 'book', ['book_id'], ['book_id'], ondelete='CASCADE')
+        batch.create_unique_constraint('uq_meta_data_line_book_line', ['book_id', 'line_id'])
+    for name in VALUE_TABLES:
+        with op.batch_alter_table(name, naming_convention=NAMING_CONVENTION) as batch:
+            batch.alter_column('book_id', existing_type=sa.Integer(), nullable=False)
+            batch.drop_constraint(f'{name}_line_id_fkey', type_='foreignkey')
+            batch.create_foreign_key(f'{name}_book_id_fkey', 'book', ['book_id'], ['book_id'], ondelete='CASCADE')
+            batch.create_foreign_key(f'fk_{name}_line', 'meta_data_line', ['book_id', 'line_id'],
+                                     ['book_id', 'line_id'], ondelete='CASCADE')
+
+
+def create_partitioned_tables() -> None:
+    """Replace the empty tables by ones partitioned by `book_id`."""
+    if has_rows():
+        raise RuntimeError('DB_BOOK_PARTITIONS asks for partitioned tables, the metadata lines and values '
+                           'have to be empty to make them; migrate without it and move the rows over')
+    for name in (*VALUE_TABLES, 'meta_data_line'):
+        op.drop_table(name)
+    tables = [
+        create_book_table(
+            'meta_data_line', 'line_id',
+            *audit_columns(),
+            sa.Column('name', sa.String(length=30), nullable=False),
+            sa.UniqueConstraint('book_id', 'line_id', name='uq_meta_data_line_book_line'),
+        ),
+        create_book_table(
+            'meta_data_attribute_value', 'meta_data_attribute_value_id',
+            sa.Column('line_id', sa.Integer(), nullable=False),
+            sa.Column('attribute_id', sa.Integer(), nullable=False),
+            *audit_columns(),
+            sa.Column('attribute_value', sa.String(), nullable=True),
+            sa.ForeignKeyConstraint(['attribute_id'], ['meta_data_attribute.meta_data_attribute_id']),
+            sa.ForeignKeyConstraint(['book_id', 'line_id'], ['meta_data_line.book_id', 'meta_data_line.line_id'],
+                                    name='fk_meta_data_attribute_value_line', ondelete='CASCADE'),
+        ),
+        create_book_table(
+            'meta_data_tag_value', 'meta_data_value_id',
+            sa.Column('line_id', sa.Integer(), nullable=False),
+            sa.Column('tag_id', sa.Integer(), nullable=False),
+            *audit_columns(),
+            sa.Column('is_empty_tag', sa.Boolean(), nullable=True),
+            sa.Column('value', sa.String(), nullable=True),
+            sa.ForeignKeyConstraint(['tag_id'], ['meta_data_tag.tag_id']),
+            sa.ForeignKeyConstraint(['book_id', 'line_id'], ['meta_data_line.book_id', 'meta_data_line.line_id'],
+                                    name='fk_meta_data_tag_value_line', ondelete='CASCADE'),
+        ),
+    ]
+    create_book_partitions(None, op.get_bind(), tables)
+
+
+def downgrade() -> None:
+    if partitioned():
+        raise RuntimeError('the tables partitioned by book cannot go back to the plain ones without books')
+    for name in VALUE_TABLES:
+        op.drop_index(f'ix_{name}_book_line', name)
+    op.drop_index('ix_meta_data_line_keyset', 'meta_data_line')
+    for name in VALUE_TABLES:
+        with op.batch_alter_table(name, naming_convention=NAMING_CONVENTION) as batch:
+            batch.drop_constraint(f'fk_{name}_line', type_='foreignkey')
+            batch.drop_constraint(f'{name}_book_id_fkey', type_='foreignkey')
+            batch.drop_column('book_id')
+            batch.create_foreign_key(f'{name}_line_id_fkey', 'meta_data_line', ['line_id'], ['line_id'])
+    with op.batch_alter_table('meta_data_line', naming_convention=NAMING_CONVENTION) as batch:
+        batch.drop_constraint('uq_meta_data_line_book_line', type_='unique')
+        batch.drop_constraint('meta_data_line_book_id_fkey', type_='foreignkey')
+        batch.drop_column('book_id')
+    op.drop_table('book')
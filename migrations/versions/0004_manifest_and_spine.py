@@ -0,0 +1,52 @@
+"""The manifest items and spine itemrefs of each book.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+from migration import audit_columns, create_book_table
+from model.book import create_book_partitions
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    tables = [
+        create_book_table(
+            'manifest_item', 'manifest_item_id',
+            *audit_columns(),
+            sa.Column('item_id', sa.String(length=100), nullable=False),
+            sa.Column('href', sa.String(length=255), nullable=False),
+            sa.Column('media_type', sa.String(length=100), nullable=False),
+            sa.Column('properties', sa.String(length=255), nullable=True),
+            sa.UniqueConstraint('book_id', 'item_id', name='uq_manifest_item_book_item_id'),
+        ),
+        create_book_table(
+            'spine_item_ref', 'spine_item_ref_id',
+            *audit_columns(),
+            sa.Column('position', sa.Integer(), nullable=False),
+            sa.Column('idref', sa.String(length=100), nullable=False),
+            sa.Column('linear', sa.Boolean(), nullable=False),
+            sa.Column('properties', sa.String(length=255), nullable=True),
+            sa.ForeignKeyConstraint(['book_id', 'idref'], ['manifest_item.book_id', 'manifest_item.item_id'],
+                                    name='fk_spine_item_ref_manifest_item'),
+        ),
+    ]
+    create_book_partitions(None, op.get_bind(), tables)
+    op.create_index('ix_manifest_item_book_href', 'manifest_item', ['book_id', 'href'])
+    op.create_index('ix_spine_item_ref_book_position', 'spine_item_ref', ['book_id', 'position'])
+    op.create_index('ix_spine_item_ref_book_idref', 'spine_item_ref', ['book_id', 'idref'])
+
+
+def downgrade() -> None:
+    # the partitions go with their tables, the indexes too
+    op.drop_table('spine_item_ref')
+    op.drop_table('manifest_item')
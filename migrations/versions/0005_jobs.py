@@ -0,0 +1,42 @@
+"""The queue of background jobs.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+from migration import audit_columns
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'job',
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        *audit_columns(),
+        sa.Column('kind', sa.String(length=30), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('params', sa.JSON(), nullable=False),
+        sa.Column('done', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('cancel_requested', sa.Boolean(), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('result_file', sa.String(length=255), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('job_id'),
+    )
+    op.create_index('ix_job_status', 'job', ['status', 'job_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('job')
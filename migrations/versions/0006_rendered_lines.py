@@ -0,0 +1,34 @@
+"""Store each metadata line's rendered element and the sort key of its tag.
+
+The columns of the lines that are already there are filled in by rendering
+them, as `litestar epub render` does.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+from opf_render import render_book
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('meta_data_line', sa.Column('tag_sort_order', sa.Integer(), nullable=True))
+    op.add_column('meta_data_line', sa.Column('rendered_xml', sa.Text(), nullable=True))
+    op.create_index('ix_meta_data_line_render', 'meta_data_line', ['book_id', 'tag_sort_order', 'name', 'line_id'])
+    render_book(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_index('ix_meta_data_line_render', 'meta_data_line')
+    with op.batch_alter_table('meta_data_line') as batch:
+        batch.drop_column('rendered_xml')
+        batch.drop_column('tag_sort_order')
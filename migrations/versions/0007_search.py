@@ -0,0 +1,35 @@
+"""Text search over the tag and attribute catalogs and the values of the lines.
+
+Postgres gets `pg_trgm` indexes, SQLite FTS5 tables filled from the rows that
+are already there and kept current by triggers, see `search.SearchIndex`.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from alembic import op
+
+from model.meta_data_attribute import meta_data_attribute_search
+from model.meta_data_attribute_value import meta_data_attribute_value_search
+from model.meta_data_tag import meta_data_tag_search
+from model.meta_data_tag_value import meta_data_tag_value_search
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+SEARCH_INDEXES = (meta_data_tag_search, meta_data_attribute_search,
+                  meta_data_tag_value_search, meta_data_attribute_value_search)
+
+
+def upgrade() -> None:
+    for search_index in SEARCH_INDEXES:
+        search_index.create(op.get_bind())
+
+
+def downgrade() -> None:
+    for search_index in SEARCH_INDEXES:
+        search_index.drop(op.get_bind())
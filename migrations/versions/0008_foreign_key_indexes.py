@@ -0,0 +1,28 @@
+"""Index the catalog foreign keys of the tag and attribute values.
+
+Joins from the catalogs to their values and the foreign key checks of catalog
+deletes scanned the value tables. The line foreign keys are `(book_id, line_id)`
+and already covered by the `*_book_line` indexes.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from alembic import op
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_meta_data_tag_value_tag', 'meta_data_tag_value', ['tag_id'])
+    op.create_index('ix_meta_data_attribute_value_attribute', 'meta_data_attribute_value', ['attribute_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_meta_data_attribute_value_attribute', 'meta_data_attribute_value')
+    op.drop_index('ix_meta_data_tag_value_tag', 'meta_data_tag_value')
@@ -0,0 +1,50 @@
+"""Store manifest item files in the content-addressed blob store.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from advanced_alchemy.types import DateTimeUTC
+from alembic import op
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'blob',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('created_at', DateTimeUTC(timezone=True), nullable=False),
+        sa.Column('updated_at', DateTimeUTC(timezone=True), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('crc32', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('sha256'),
+    )
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite only takes a foreign key inline with ADD COLUMN, and a batch copy of
+        # manifest_item would have to drop the table the spine refers to
+        op.execute('ALTER TABLE manifest_item ADD COLUMN blob_sha256 VARCHAR(64) '
+                   'CONSTRAINT fk_manifest_item_blob REFERENCES blob (sha256)')
+    else:
+        op.add_column('manifest_item', sa.Column('blob_sha256', sa.String(length=64),
+                                                 sa.ForeignKey('blob.sha256', name='fk_manifest_item_blob'),
+                                                 nullable=True))
+    op.create_index('ix_manifest_item_blob', 'manifest_item', ['blob_sha256'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_manifest_item_blob', 'manifest_item')
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite refuses to drop a column with a foreign key, a batch copy of the table doesn't have it
+        with op.batch_alter_table('manifest_item') as batch:
+            batch.drop_column('blob_sha256')
+    else:
+        op.drop_constraint('fk_manifest_item_blob', 'manifest_item', type_='foreignkey')
+        op.drop_column('manifest_item', 'blob_sha256')
+    op.drop_table('blob')
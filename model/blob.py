@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from model.base import Base
+
+
+class Blob(Base):
+    """
+    A content file in the blob store, named by the SHA-256 of its bytes.
+
+    Manifest items of any book with the same file share the row and the file.
+    `crc32` is what a zip entry of the file needs, so exports can write the
+    entry header without reading the file first.
+    """
+    __tablename__ = 'blob'
+
+    sha256: Mapped[str] = mapped_column(String(length=64), primary_key=True, sort_order=-10)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False, sort_order=1)
+    crc32: Mapped[int] = mapped_column(BigInteger, nullable=False, sort_order=2)
+
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Any, Optional, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import DDL, ForeignKey, String, Table, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection
+
+from model.base import BaseModel, Base
+
+# Postgres only: hash partitions of every table scoped by book, 0 keeps them plain tables.
+# It shapes the tables when they are created, so changing it later needs a migration.
+BOOK_PARTITIONS = int(os.environ.get('DB_BOOK_PARTITIONS', '0'))
+
+
+class Book(Base):
+    """
+    A title whose metadata, manifest and spine are kept apart from every other book.
+    """
+    __tablename__ = 'book'
+
+    id: Mapped[int] = mapped_column(primary_key=True, name='book_id', sort_order=-10)
+    title: Mapped[str] = mapped_column(String(length=255), nullable=False, sort_order=1)
+    language: Mapped[Optional[str]] = mapped_column(String(length=35), nullable=True, sort_order=2)
+
+
+def book_id_column() -> Mapped[int]:
+    """`book_id` of a table scoped by book.
+
+    A partitioned table's primary key has to contain the partition key, so with
+    `BOOK_PARTITIONS` the column joins the primary key; `book_mapper_args()` keeps
+    the ORM identity on the id alone either way.
+    """
+    return mapped_column(ForeignKey(Book.id, ondelete='CASCADE'), nullable=False,
+                         primary_key=BOOK_PARTITIONS > 0, sort_order=-6)
+
+
+def book_table_args(*args: Any) -> tuple:
+    """`__table_args__` of a table scoped by book, hash partitioned by `book_id` with `BOOK_PARTITIONS`."""
+    if BOOK_PARTITIONS:
+        return (*args, {'postgresql_partition_by': 'HASH (book_id)'})
+    return args
+
+
+def book_mapper_args() -> dict[str, Any]:
+    return {'primary_key': ['id']}
+
+
+@event.listens_for(Base.metadata, 'after_create')
+def create_book_partitions(target: Any, connection: Connection, tables: List[Table] = (), **kw: Any) -> None:
+    """Create the partitions of the tables partitioned by `book_table_args()`."""
+    if connection.dialect.name != 'postgresql':
+        return
+    for table in tables:
+        if table.dialect_options['postgresql'].get('partition_by'):
+            for remainder in range(BOOK_PARTITIONS):
+                connection.execute(DDL(
+                    f'CREATE TABLE IF NOT EXISTS {table.name}_p{remainder} PARTITION OF {table.name} '
+                    f'FOR VALUES WITH (MODULUS {BOOK_PARTITIONS}, REMAINDER {remainder})'))
+
+
+class BookDTO(BaseModel):
+    id: Optional[int]
+    title: str
+    language: Optional[str] = None
+
+
+class BookCreate(BaseModel):
+    title: str
+    language: Optional[str] = None
+
+
+book_dto_list = TypeAdapter(List[BookDTO])
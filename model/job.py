@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import JSON, DateTime, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from model.base import BaseModel, Base
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+JOB_FINISHED = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+
+class Job(Base):
+    """
+    A long running export or import, run by `jobs.JobQueue` outside the request that asked for it.
+    """
+    __tablename__ = 'job'
+    # workers pick up the queued jobs in order when they start
+    __table_args__ = (Index('ix_job_status', 'status', 'job_id'),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, name='job_id', sort_order=-10)
+    kind: Mapped[str] = mapped_column(String(length=30), nullable=False, sort_order=1)
+    status: Mapped[str] = mapped_column(String(length=20), nullable=False, default=JOB_QUEUED, sort_order=2)
+    params: Mapped[dict[str, Any]] = mapped_column(JSON(), nullable=False, default=dict, sort_order=3)
+    # units of work done so far, out of `total` when the job knows it
+    done: Mapped[int] = mapped_column(nullable=False, default=0, sort_order=4)
+    total: Mapped[Optional[int]] = mapped_column(nullable=True, sort_order=5)
+    cancel_requested: Mapped[bool] = mapped_column(nullable=False, default=False, sort_order=6)
+    result: Mapped[Optional[dict[str, Any]]] = mapped_column(JSON(), nullable=True, sort_order=7)
+    # file the job wrote, relative to JOB_RESULT_DIR
+    result_file: Mapped[Optional[str]] = mapped_column(String(length=255), nullable=True, sort_order=8)
+    error: Mapped[Optional[str]] = mapped_column(String(), nullable=True, sort_order=9)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True, sort_order=10)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True, sort_order=11)
+
+
+class JobDTO(BaseModel):
+    id: int
+    kind: str
+    status: str
+    params: dict[str, Any]
+    done: int
+    total: Optional[int] = None
+    cancel_requested: bool = False
+    result: Optional[dict[str, Any]] = None
+    result_file: Optional[str] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+job_dto_list = TypeAdapter(List[JobDTO])
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Optional, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import ForeignKey, Index, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from model.base import BaseModel, Base
+from model.blob import Blob
+from model.book import book_id_column, book_mapper_args, book_table_args
+
+
+class ManifestItem(Base):
+    """
+    <item href="cover.xhtml" id="cover" media-type="application/xhtml+xml" properties="svg"/>
+
+    item_id = value of the ID attribute, unique within a book and referenced by the spine IDREF
+    blob_sha256 = the item's file in the blob store, set by uploading its content
+    """
+    __tablename__ = 'manifest_item'
+    __table_args__ = book_table_args(
+        UniqueConstraint('book_id', 'item_id', name='uq_manifest_item_book_item_id'),
+        Index('ix_manifest_item_book_href', 'book_id', 'href'),
+        Index('ix_manifest_item_blob', 'blob_sha256'),
+    )
+    __mapper_args__ = book_mapper_args()
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, name='manifest_item_id', sort_order=-10)
+    book_id: Mapped[int] = book_id_column()
+    item_id: Mapped[str] = mapped_column(String(length=100), nullable=False, sort_order=1)
+    href: Mapped[str] = mapped_column(String(length=255), nullable=False, sort_order=2)
+    media_type: Mapped[str] = mapped_column(String(length=100), nullable=False, sort_order=3)
+    properties: Mapped[Optional[str]] = mapped_column(String(length=255), nullable=True, sort_order=4)
+    blob_sha256: Mapped[Optional[str]] = mapped_column(ForeignKey(Blob.sha256, name='fk_manifest_item_blob'),
+                                                       nullable=True, sort_order=5)
+
+
+class ManifestItemDTO(BaseModel):
+    id: Optional[int]
+    book_id: int
+    item_id: str
+    href: str
+    media_type: str
+    properties: Optional[str] = None
+    blob_sha256: Optional[str] = None
+
+
+class ManifestItemCreate(BaseModel):
+    item_id: str
+    href: str
+    media_type: str
+    properties: Optional[str] = None
+
+
+manifest_item_dto_list = TypeAdapter(List[ManifestItemDTO])
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any, Optional, List
+import msgspec
+from pydantic import TypeAdapter
+from sqlalchemy import Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.types import String
 
@@ -8,6 +11,7 @@ if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
 
 from model.base import BaseModel, Base
+from search import SearchIndex
 
 
 class MetaDataAttribute(Base):
@@ -18,6 +22,8 @@ class MetaDataAttribute(Base):
     Attribute = scheme
     """
     __tablename__ = 'meta_data_attribute'
+    # keyset pagination order, see `SQLAlchemyAsyncKeysetRepository`
+    __table_args__ = (Index('ix_meta_data_attribute_keyset', 'sort_order', 'name', 'meta_data_attribute_id'),)
 
     id: Mapped[int] = mapped_column(primary_key=True, name='meta_data_attribute_id', sort_order=-10)
     sort_order: Mapped[int | None] = mapped_column(nullable=False, default=0, sort_order=0)
@@ -34,6 +40,10 @@ class MetaDataAttribute(Base):
             self.sort_order = 0
 
 
+# see `search.SearchIndex`
+meta_data_attribute_search = SearchIndex(MetaDataAttribute.__table__, 'meta_data_attribute_id', ('name',))
+
+
 class MetaDataAttributeDTO(BaseModel):
     id: int | None
     sort_order: Optional[int] = 0
@@ -43,9 +53,26 @@ class MetaDataAttributeDTO(BaseModel):
     description: Optional[str] = None
 
 
+class MetaDataAttributeStruct(msgspec.Struct):
+    """`MetaDataAttributeDTO` for read responses, built positionally from a column row and encoded by msgspec."""
+    id: Optional[int]
+    sort_order: Optional[int]
+    name: str
+    place_holder: Optional[str]
+    tool_tip: Optional[str]
+    description: Optional[str]
+
+
 class MetaDataAttributeCreate(BaseModel):
     name: str
     sort_order: Optional[int] = 0
     place_holder: Optional[str] = None
     tool_tip: Optional[str] = None
     description: Optional[str] = None
+
+
+class MetaDataAttributeUpdate(MetaDataAttributeCreate):
+    id: int
+
+
+meta_data_attribute_dto_list = TypeAdapter(List[MetaDataAttributeDTO])
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any, Optional
 
-from sqlalchemy import String, ForeignKey, Boolean
+from sqlalchemy import String, ForeignKey, ForeignKeyConstraint, Index, Boolean
 from sqlalchemy.orm import Mapped, mapped_column, relationship, DeclarativeBase
 
 from model.meta_data_line import MetaDataLine
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
 
 from model.base import Base
+from model.book import book_id_column, book_mapper_args, book_table_args
+from search import SearchIndex
 
 
 class MetaDataAttributeValue(Base):
@@ -20,9 +22,18 @@ class MetaDataAttributeValue(Base):
     <meta name="cover" content="id-3687803259850171647"/>
     """
     __tablename__ = 'meta_data_attribute_value'
+    __table_args__ = book_table_args(
+        ForeignKeyConstraint(['book_id', 'line_id'], [MetaDataLine.book_id, MetaDataLine.id],
+                             name='fk_meta_data_attribute_value_line', ondelete='CASCADE'),
+        Index('ix_meta_data_attribute_value_book_line', 'book_id', 'line_id'),
+        Index('ix_meta_data_attribute_value_attribute', 'attribute_id'),
+    )
+    __mapper_args__ = book_mapper_args()
 
-    id: Mapped[int] = mapped_column(primary_key=True, name='meta_data_attribute_value_id', sort_order=-10)
-    line_id: Mapped[int] = mapped_column(ForeignKey(MetaDataLine.id), sort_order=-5)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, name='meta_data_attribute_value_id',
+                                    sort_order=-10)
+    book_id: Mapped[int] = book_id_column()
+    line_id: Mapped[int] = mapped_column(sort_order=-5)
     attribute_id: Mapped[int] = mapped_column(ForeignKey(MetaDataAttribute.id), sort_order=-5)
     attribute_value: Mapped[Optional[str]] = mapped_column(String(), nullable=True, sort_order=7)
 
@@ -31,8 +42,14 @@ class MetaDataAttributeValue(Base):
                      primaryjoin='MetaDataAttributeValue.attribute_id==MetaDataAttribute.id')
     )
 
-    # meta_data_attribute_master_value: Mapped['MetaDataLine'] = (
-    #     relationship(MetaDataLine,
-    #                  primaryjoin='MetaDataLine.id==MetaDataAttributeValue.line_id',
-    #                  back_populates='attributes')
-    # )
+    meta_data_attribute_master_value: Mapped['MetaDataLine'] = (
+        relationship(MetaDataLine,
+                     primaryjoin='and_(MetaDataLine.book_id==MetaDataAttributeValue.book_id, '
+                                 'MetaDataLine.id==MetaDataAttributeValue.line_id)',
+                     back_populates='attributes')
+    )
+
+
+# see `search.SearchIndex`
+meta_data_attribute_value_search = SearchIndex(MetaDataAttributeValue.__table__, 'meta_data_attribute_value_id',
+                                               ('attribute_value',))
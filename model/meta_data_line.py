@@ -1,26 +1,49 @@
 from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any, Optional, List
+import msgspec
+from pydantic import TypeAdapter
+from sqlalchemy import Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.types import String
+from sqlalchemy.types import String, Text
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
 
 from model.base import BaseModel, Base
+from model.book import book_id_column, book_mapper_args, book_table_args
+from model.meta_data_attribute import MetaDataAttributeDTO
+from model.meta_data_tag import MetaDataTagDTO
 
 
 class MetaDataLine(Base):
     __tablename__ = 'meta_data_line'
+    __table_args__ = book_table_args(
+        # target of the (book_id, line_id) foreign keys of the value tables
+        UniqueConstraint('book_id', 'line_id', name='uq_meta_data_line_book_line'),
+        # keyset pagination order within a book, see `SQLAlchemyAsyncKeysetRepository`
+        Index('ix_meta_data_line_keyset', 'book_id', 'name', 'line_id'),
+        # the OPF export reads `rendered_xml` in this order, see `opf.stream_metadata_lines()`
+        Index('ix_meta_data_line_render', 'book_id', 'tag_sort_order', 'name', 'line_id'),
+    )
+    __mapper_args__ = book_mapper_args()
 
-    id: Mapped[int] = mapped_column(primary_key=True, name='line_id', sort_order=-10)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, name='line_id', sort_order=-10)
+    book_id: Mapped[int] = book_id_column()
     name: Mapped[str] = mapped_column(String(length=30), nullable=False, sort_order=1)
+    # the rendered element and its tag's sort order, kept up to date by `opf_render`
+    tag_sort_order: Mapped[Optional[int]] = mapped_column(nullable=True, sort_order=2)
+    rendered_xml: Mapped[Optional[str]] = mapped_column(Text(), nullable=True, deferred=True, sort_order=3)
+    # the values belong to the line: they are saved and deleted with it, and a value
+    # taken out of `attributes` is deleted
     tag: Mapped['MetaDataTagValue'] = (
-        relationship('MetaDataTagValue', back_populates='meta_data_tag_master_value',)
+        relationship('MetaDataTagValue', back_populates='meta_data_tag_master_value',
+                     cascade='all, delete-orphan')
+    )
+    attributes: Mapped[List['MetaDataAttributeValue']] = (
+        relationship('MetaDataAttributeValue', back_populates='meta_data_attribute_master_value',
+                     cascade='all, delete-orphan')
     )
-    # attributes: Mapped[List['MetaDataAttributeValue']] = (
-    #     relationship('MetaDataAttributeValue', back_populates='meta_data_attribute_master_value',)
-    # )
 
 
 class MetaDataTagValueDTO(BaseModel):
@@ -36,7 +59,8 @@ class MetaDataValueCreate(BaseModel):
 
 class MetaDataAttributeValueDTO(BaseModel):
     id: int | None
-    attributes: List[MetaDataAttributeTag] | None
+    attribute_id: int
+    attribute_value: str | None
 
 
 class MetaDataAttributeValueCreate(BaseModel):
@@ -55,7 +79,60 @@ class MetaDataLineDTO(BaseModel):
     # attributes: List[MetaDataAttributeTag] | None
 
 
+class MetaDataTagValueStruct(msgspec.Struct):
+    id: Optional[int]
+    tag_id: int
+    value: Optional[str]
+
+
+class MetaDataLineStruct(msgspec.Struct):
+    """`MetaDataLineDTO` for read responses, built from a line joined to its tag value and encoded by msgspec."""
+    id: Optional[int]
+    name: str
+    tag: Optional[MetaDataTagValueStruct]
+
+
+class MetaDataTagValueGraphDTO(BaseModel):
+    id: int | None
+    tag_id: int
+    is_empty_tag: Optional[bool] = False
+    value: str | None
+    meta_data_tag: Optional[MetaDataTagDTO] = None
+
+
+class MetaDataAttributeValueGraphDTO(BaseModel):
+    id: int | None
+    attribute_id: int
+    attribute_value: str | None
+    attribute: Optional[MetaDataAttributeDTO] = None
+
+
+class MetaDataLineGraphDTO(BaseModel):
+    """A line with its tag value, tag definition, attribute values and attribute definitions."""
+    id: Optional[int]
+    name: str
+    tag: Optional[MetaDataTagValueGraphDTO] = None
+    attributes: List[MetaDataAttributeValueGraphDTO] = []
+
+
+class MetaDataLineNestedDTO(BaseModel):
+    """A line with its tag value and attribute values, as the nested create/update write them."""
+    id: Optional[int]
+    name: str
+    tag: MetaDataTagValueDTO
+    attributes: List[MetaDataAttributeValueDTO] = []
+
+
 class MetaDataLineCreate(BaseModel):
     name: str
     tag: MetaDataValueCreate
-    # attributes: List[MetaDataAttributeTag] | None
+    # `id` is the attribute id, each attribute at most once per line
+    attributes: List[MetaDataAttributeTag] | None = None
+
+
+class MetaDataLineUpdate(MetaDataLineCreate):
+    id: int
+
+
+meta_data_line_dto_list = TypeAdapter(List[MetaDataLineDTO])
+meta_data_line_graph_dto_list = TypeAdapter(List[MetaDataLineGraphDTO])
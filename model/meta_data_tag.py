@@ -2,13 +2,16 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any, Optional, List
 
-from sqlalchemy import String, ForeignKey
+import msgspec
+from pydantic import TypeAdapter
+from sqlalchemy import String, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
 
 from model.base import BaseModel, Base
+from search import SearchIndex
 
 
 class MetaDataTag(Base):
@@ -20,6 +23,8 @@ class MetaDataTag(Base):
     meta_data_tag = meta
     """
     __tablename__ = 'meta_data_tag'
+    # keyset pagination order, see `SQLAlchemyAsyncKeysetRepository`
+    __table_args__ = (Index('ix_meta_data_tag_keyset', 'sort_order', 'name', 'tag_id'),)
     id: Mapped[int] = mapped_column(primary_key=True, name='tag_id', sort_order=-10)
     # meta_data_tag_value_id: Mapped[int] = mapped_column(ForeignKey("MetaDataTagValue.id"), sort_order=-5)
 
@@ -38,6 +43,10 @@ class MetaDataTag(Base):
             self.sort_order = 0
 
 
+# see `search.SearchIndex`
+meta_data_tag_search = SearchIndex(MetaDataTag.__table__, 'tag_id', ('name', 'tag'))
+
+
 class MetaDataTagDTO(BaseModel):
     id: Optional[int]
     sort_order: Optional[int] = 0
@@ -48,6 +57,17 @@ class MetaDataTagDTO(BaseModel):
     description: Optional[str] = None
 
 
+class MetaDataTagStruct(msgspec.Struct):
+    """`MetaDataTagDTO` for read responses, built positionally from a column row and encoded by msgspec."""
+    id: Optional[int]
+    sort_order: Optional[int]
+    name: str
+    tag: str
+    place_holder: Optional[str]
+    tool_tip: Optional[str]
+    description: Optional[str]
+
+
 class MetaDataTagCreate(BaseModel):
     name: str
     tag: str
@@ -55,3 +75,10 @@ class MetaDataTagCreate(BaseModel):
     place_holder: Optional[str] = None
     tool_tip: Optional[str] = None
     description: Optional[str] = None
+
+
+class MetaDataTagUpdate(MetaDataTagCreate):
+    id: int
+
+
+meta_data_tag_dto_list = TypeAdapter(List[MetaDataTagDTO])
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any, Optional, List
 
-from sqlalchemy import String, ForeignKey, Boolean
+from sqlalchemy import String, ForeignKey, ForeignKeyConstraint, Index, Boolean
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from model.meta_data_line import MetaDataLine
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
 
 from model.base import Base
+from model.book import book_id_column, book_mapper_args, book_table_args
+from search import SearchIndex
 
 
 class MetaDataTagValue(Base):
@@ -20,8 +22,17 @@ class MetaDataTagValue(Base):
     <meta name="cover" content="id-3687803259850171647"/>
     """
     __tablename__ = 'meta_data_tag_value'
-    id: Mapped[int] = mapped_column(primary_key=True, name='meta_data_value_id', sort_order=-10)
-    line_id: Mapped[int] = mapped_column(ForeignKey(MetaDataLine.id), sort_order=-5)
+    __table_args__ = book_table_args(
+        ForeignKeyConstraint(['book_id', 'line_id'], [MetaDataLine.book_id, MetaDataLine.id],
+                             name='fk_meta_data_tag_value_line', ondelete='CASCADE'),
+        Index('ix_meta_data_tag_value_book_line', 'book_id', 'line_id'),
+        Index('ix_meta_data_tag_value_tag', 'tag_id'),
+    )
+    __mapper_args__ = book_mapper_args()
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, name='meta_data_value_id', sort_order=-10)
+    book_id: Mapped[int] = book_id_column()
+    line_id: Mapped[int] = mapped_column(sort_order=-5)
     tag_id: Mapped[int] = mapped_column(ForeignKey(MetaDataTag.id), sort_order=-5)
     is_empty_tag: Mapped[Optional[bool]] = mapped_column(Boolean(), nullable=True, sort_order=1, default=False)
     value: Mapped[Optional[str]] = mapped_column(String(), nullable=True, sort_order=6)
@@ -34,7 +45,8 @@ class MetaDataTagValue(Base):
 
     meta_data_tag_master_value: Mapped['MetaDataLine'] = (
         relationship(MetaDataLine,
-                     primaryjoin='MetaDataLine.id==MetaDataTagValue.line_id',
+                     primaryjoin='and_(MetaDataLine.book_id==MetaDataTagValue.book_id, '
+                                 'MetaDataLine.id==MetaDataTagValue.line_id)',
                      back_populates='tag')
     )
 
@@ -45,3 +57,7 @@ class MetaDataTagValue(Base):
         else:
             if self.is_empty_tag is None:
                 self.is_empty_tag = False
+
+
+# see `search.SearchIndex`
+meta_data_tag_value_search = SearchIndex(MetaDataTagValue.__table__, 'meta_data_value_id', ('value',))
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import Optional, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import Boolean, ForeignKeyConstraint, Index, String
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from model.base import BaseModel, Base
+from model.book import book_id_column, book_mapper_args, book_table_args
+from model.manifest_item import ManifestItem
+
+
+class SpineItemRef(Base):
+    """
+    <itemref idref="chapter_001" linear="yes"/>
+
+    idref = value of a manifest item ID attribute of the same book, enforced by a foreign key
+    """
+    __tablename__ = 'spine_item_ref'
+    __table_args__ = book_table_args(
+        ForeignKeyConstraint(['book_id', 'idref'], [ManifestItem.book_id, ManifestItem.item_id],
+                             name='fk_spine_item_ref_manifest_item'),
+        Index('ix_spine_item_ref_book_position', 'book_id', 'position'),
+        Index('ix_spine_item_ref_book_idref', 'book_id', 'idref'),
+    )
+    __mapper_args__ = book_mapper_args()
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, name='spine_item_ref_id', sort_order=-10)
+    book_id: Mapped[int] = book_id_column()
+    position: Mapped[int] = mapped_column(nullable=False, default=0, sort_order=1)
+    idref: Mapped[str] = mapped_column(String(length=100), nullable=False, sort_order=2)
+    linear: Mapped[bool] = mapped_column(Boolean(), nullable=False, default=True, sort_order=3)
+    properties: Mapped[Optional[str]] = mapped_column(String(length=255), nullable=True, sort_order=4)
+
+    manifest_item: Mapped['ManifestItem'] = (
+        relationship(ManifestItem,
+                     primaryjoin='and_(SpineItemRef.book_id==ManifestItem.book_id, '
+                                 'SpineItemRef.idref==ManifestItem.item_id)',
+                     viewonly=True)
+    )
+
+
+class SpineItemRefDTO(BaseModel):
+    id: Optional[int]
+    book_id: int
+    position: int
+    idref: str
+    linear: bool = True
+    properties: Optional[str] = None
+
+
+class SpineItemRefCreate(BaseModel):
+    idref: str
+    position: Optional[int] = None
+    linear: Optional[bool] = True
+    properties: Optional[str] = None
+
+
+spine_item_ref_dto_list = TypeAdapter(List[SpineItemRefDTO])
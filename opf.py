@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, AsyncGenerator, AsyncIterable, Iterable
+from xml.sax.saxutils import escape, quoteattr
+
+from sqlalchemy import and_, select
+
+from model.meta_data_attribute import MetaDataAttribute
+from model.meta_data_attribute_value import MetaDataAttributeValue
+from model.meta_data_line import MetaDataLine
+from model.meta_data_tag import MetaDataTag
+from model.meta_data_tag_value import MetaDataTagValue
+from model.manifest_item import ManifestItem
+from model.spine_item_ref import SpineItemRef
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+METADATA_OPEN = ('<metadata xmlns:dc="http://purl.org/dc/elements/1.1/" '
+                 'xmlns:opf="http://www.idpf.org/2007/opf">\n')
+METADATA_CLOSE = '</metadata>\n'
+PACKAGE_OPEN = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier={unique_identifier}>\n')
+PACKAGE_CLOSE = '</package>\n'
+
+
+class MissingIdentifierError(Exception):
+    """The book has no `<dc:identifier>` line with an id, the package's `unique-identifier` has nothing to name."""
+
+    def __init__(self, book_id: int) -> None:
+        super().__init__(f'book {book_id} has no <dc:identifier> metadata line with an id attribute')
+
+
+def metadata_sources(book_id: int) -> list:
+    """Tables the metadata block of a book is built from, see `conditional.compute_validator()`."""
+    return [(MetaDataLine, MetaDataLine.book_id == book_id), (MetaDataTagValue, MetaDataTagValue.book_id == book_id),
+            (MetaDataAttributeValue, MetaDataAttributeValue.book_id == book_id),
+            (MetaDataTag, None), (MetaDataAttribute, None)]
+
+
+# rows fetched from the server side cursor per round trip
+FETCH_SIZE = 500
+# bytes collected before a chunk is handed to the response
+CHUNK_SIZE = 16 * 1024
+
+
+def render_element(tag: str, value: str | None, is_empty_tag: bool | None,
+                   attributes: Iterable[tuple[str, str | None]]) -> str:
+    """Render one metadata line.
+
+    <meta property="role" refines="#author_0" scheme="marc:relators">aut</meta>
+    <meta name="cover" content="id-3687803259850171647"/>
+    """
+    attrs = ''.join(f' {name}={quoteattr(attr_value or "")}' for name, attr_value in attributes)
+    if is_empty_tag or value is None:
+        return f'<{tag}{attrs}/>'
+    return f'<{tag}{attrs}>{escape(value)}</{tag}>'
+
+
+async def stream_metadata_lines(engine: AsyncEngine, book_id: int) -> AsyncGenerator[str, None]:
+    """Yield each rendered metadata line of the book, reading the rows through a server side cursor.
+
+    The lines are rendered when they are written, see `opf_render`, so this is one
+    scan of `ix_meta_data_line_render`.
+    """
+    statement = (select(MetaDataLine.rendered_xml)
+                 .where(MetaDataLine.book_id == book_id, MetaDataLine.rendered_xml.is_not(None))
+                 .order_by(MetaDataLine.tag_sort_order, MetaDataLine.name, MetaDataLine.id))
+    async with engine.connect() as conn:
+        result = await conn.stream(statement)
+        async for partition in result.partitions(FETCH_SIZE):
+            for (rendered_xml,) in partition:
+                yield rendered_xml
+
+
+async def stream_manifest_lines(engine: AsyncEngine, book_id: int) -> AsyncGenerator[str, None]:
+    """Yield each `<item>` of the book's manifest."""
+    statement = (select(ManifestItem.item_id, ManifestItem.href, ManifestItem.media_type, ManifestItem.properties)
+                 .where(ManifestItem.book_id == book_id)
+                 .order_by(ManifestItem.id))
+    async with engine.connect() as conn:
+        result = await conn.stream(statement)
+        async for partition in result.partitions(FETCH_SIZE):
+            for item_id, href, media_type, properties in partition:
+                attributes = [('href', href), ('id', item_id), ('media-type', media_type)]
+                if properties:
+                    attributes.append(('properties', properties))
+                yield render_element('item', None, True, attributes)
+
+
+async def stream_spine_lines(engine: AsyncEngine, book_id: int) -> AsyncGenerator[str, None]:
+    """Yield each `<itemref>` of the book's spine in reading order."""
+    statement = (select(SpineItemRef.idref, SpineItemRef.linear, SpineItemRef.properties)
+                 .where(SpineItemRef.book_id == book_id)
+                 .order_by(SpineItemRef.position, SpineItemRef.id))
+    async with engine.connect() as conn:
+        result = await conn.stream(statement)
+        async for partition in result.partitions(FETCH_SIZE):
+            for idref, linear, properties in partition:
+                attributes = [('idref', idref)]
+                if not linear:
+                    attributes.append(('linear', 'no'))
+                if properties:
+                    attributes.append(('properties', properties))
+                yield render_element('itemref', None, True, attributes)
+
+
+async def _chunked(parts: AsyncIterable[str]) -> AsyncGenerator[bytes, None]:
+    """Collect `parts` into chunks of roughly `CHUNK_SIZE` bytes."""
+    buffer: list[str] = []
+    size = 0
+    async for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+async def _indented(lines: AsyncIterable[str], indent: str) -> AsyncGenerator[str, None]:
+    async for line in lines:
+        yield f'{indent}{line}\n'
+
+
+async def stream_metadata(engine: AsyncEngine, book_id: int) -> AsyncGenerator[bytes, None]:
+    """Yield the `<metadata>` block of the book's content.opf in chunks of roughly `CHUNK_SIZE` bytes.
+
+    The opening tag goes out before the query runs so the client sees the first byte
+    straight away, after that only one chunk is held in memory at a time.
+    """
+    yield METADATA_OPEN.encode('utf-8')
+    async for chunk in _chunked(_indented(stream_metadata_lines(engine, book_id), '  ')):
+        yield chunk
+    yield METADATA_CLOSE.encode('utf-8')
+
+
+async def _package_parts(engine: AsyncEngine, book_id: int) -> AsyncGenerator[str, None]:
+    async for line in _indented(stream_metadata_lines(engine, book_id), '    '):
+        yield line
+    yield '  </metadata>\n  <manifest>\n'
+    async for line in _indented(stream_manifest_lines(engine, book_id), '    '):
+        yield line
+    yield '  </manifest>\n  <spine>\n'
+    async for line in _indented(stream_spine_lines(engine, book_id), '    '):
+        yield line
+    yield '  </spine>\n'
+
+
+async def unique_identifier(engine: AsyncEngine, book_id: int) -> str:
+    """The id attribute of the book's `<dc:identifier>` line, the first in metadata order when there are several.
+
+    Raises:
+        MissingIdentifierError: no identifier line has an id.
+    """
+    statement = (select(MetaDataAttributeValue.attribute_value)
+                 .join(MetaDataLine, and_(MetaDataLine.book_id == MetaDataAttributeValue.book_id,
+                                          MetaDataLine.id == MetaDataAttributeValue.line_id))
+                 .join(MetaDataAttribute, MetaDataAttribute.id == MetaDataAttributeValue.attribute_id)
+                 .join(MetaDataTagValue, and_(MetaDataTagValue.book_id == MetaDataLine.book_id,
+                                              MetaDataTagValue.line_id == MetaDataLine.id))
+                 .join(MetaDataTag, MetaDataTag.id == MetaDataTagValue.tag_id)
+                 .where(MetaDataAttributeValue.book_id == book_id, MetaDataTag.tag == 'dc:identifier',
+                        MetaDataAttribute.name == 'id', MetaDataAttributeValue.attribute_value != '')
+                 .order_by(MetaDataLine.tag_sort_order, MetaDataLine.name, MetaDataLine.id)
+                 .limit(1))
+    async with engine.connect() as conn:
+        identifier = await conn.scalar(statement)
+    if identifier is None:
+        raise MissingIdentifierError(book_id)
+    return identifier
+
+
+async def stream_package(engine: AsyncEngine, book_id: int, unique_identifier: str) -> AsyncGenerator[bytes, None]:
+    """Yield the whole content.opf package document of a book.
+
+    `unique_identifier` is the id attribute of the `<dc:identifier>` metadata line,
+    see `unique_identifier()`; it is looked up before the stream starts, so a book
+    without one fails before the first byte.
+    """
+    yield (PACKAGE_OPEN.format(unique_identifier=quoteattr(unique_identifier))
+           + '  ' + METADATA_OPEN).encode('utf-8')
+    async for chunk in _chunked(_package_parts(engine, book_id)):
+        yield chunk
+    yield PACKAGE_CLOSE.encode('utf-8')
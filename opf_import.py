@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, AsyncGenerator, AsyncIterable, Awaitable, Callable, Iterable, Optional
+from xml.etree.ElementTree import ParseError, iterparse
+
+from sqlalchemy import func, select
+
+from cache import meta_data_attribute_cache, meta_data_tag_cache
+from jobs import job_queue
+from model.book import Book
+from model.meta_data_attribute import MetaDataAttribute
+from model.meta_data_attribute_value import MetaDataAttributeValue
+from model.meta_data_line import MetaDataLine
+from model.meta_data_tag import MetaDataTag
+from model.meta_data_tag_value import MetaDataTagValue
+from shared import BulkItemError, BulkResult
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from jobs import JobContext
+
+# processes parsing OPF files in parallel
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', '0')) or os.cpu_count() or 1
+# lines added to the session per flush
+IMPORT_BATCH_SIZE = 1000
+IMPORT_SUFFIXES = ('.epub', '.opf')
+
+CONTAINER_PATH = 'META-INF/container.xml'
+CONTAINER_ROOTFILE = '{urn:oasis:names:tc:opendocument:xmlns:container}rootfile'
+NAMESPACE_PREFIXES = {
+    'http://purl.org/dc/elements/1.1/': 'dc',
+    'http://purl.org/dc/terms/': 'dcterms',
+    'http://www.idpf.org/2007/opf': 'opf',
+    'http://www.w3.org/XML/1998/namespace': 'xml',
+}
+# OPF 2 allows the lines to be wrapped in these
+METADATA_WRAPPERS = {'metadata', 'dc-metadata', 'x-metadata'}
+
+
+class OpfImportError(Exception):
+    """A file that is not an OPF package document or an EPUB holding one."""
+
+
+@dataclass
+class ParsedLine:
+    tag: str
+    value: Optional[str]
+    attributes: list[tuple[str, str]]
+
+    @property
+    def name(self) -> str:
+        """Line name: the id, property or name attribute, the element name without them."""
+        attributes = dict(self.attributes)
+        return attributes.get('id') or attributes.get('property') or attributes.get('name') or self.tag.split(':')[-1]
+
+
+@dataclass
+class ParsedBook:
+    source: str
+    lines: list[ParsedLine] = field(default_factory=list)
+
+    def first_value(self, tag: str) -> Optional[str]:
+        # OPF 2 files often capitalize the Dublin Core names, `dc:Title`
+        return next((line.value for line in self.lines if line.tag.lower() == tag and line.value), None)
+
+
+@dataclass
+class ImportedBook:
+    book_id: int
+    title: str
+    source: str
+    lines: int
+    # lines or attributes whose name does not fit the meta data tables
+    skipped: int = 0
+
+
+def qualified_name(name: str, element: bool) -> str:
+    """`{http://purl.org/dc/elements/1.1/}title` -> `dc:title`, OPF elements keep no prefix."""
+    if not name.startswith('{'):
+        return name
+    namespace, local = name[1:].split('}', 1)
+    prefix = NAMESPACE_PREFIXES.get(namespace)
+    if prefix is None or (element and prefix == 'opf'):
+        return local
+    return f'{prefix}:{local}'
+
+
+def parse_opf(file: IO[bytes], source: str) -> ParsedBook:
+    """Read the `<metadata>` lines of a package document.
+
+    The document is parsed incrementally and each line is dropped from the tree
+    once read; parsing stops at `</metadata>`, so the manifest and spine are not
+    even read.
+    """
+    book = ParsedBook(source=source)
+    in_metadata = False
+    try:
+        for event, element in iterparse(file, events=('start', 'end')):
+            name = qualified_name(element.tag, element=True)
+            if event == 'start':
+                in_metadata = in_metadata or name == 'metadata'
+                continue
+            if name == 'metadata':
+                return book
+            if in_metadata and name not in METADATA_WRAPPERS:
+                value = element.text.strip() if element.text else ''
+                book.lines.append(ParsedLine(
+                    tag=name, value=value or None,
+                    attributes=[(qualified_name(key, element=False), attribute_value)
+                                for key, attribute_value in element.attrib.items()]))
+                element.clear()
+    except ParseError as ex:
+        raise OpfImportError(f'{source}: {ex}') from ex
+    raise OpfImportError(f'{source}: no <metadata> element')
+
+
+def parse_epub(file: IO[bytes], source: str) -> ParsedBook:
+    """Read the `<metadata>` lines of the package document that META-INF/container.xml points at."""
+    try:
+        with zipfile.ZipFile(file) as epub:
+            with epub.open(CONTAINER_PATH) as container:
+                rootfile = next((element.get('full-path') for _, element in iterparse(container)
+                                 if element.tag == CONTAINER_ROOTFILE and element.get('full-path')), None)
+            if rootfile is None:
+                raise OpfImportError(f'{source}: {CONTAINER_PATH} names no package document')
+            with epub.open(rootfile) as opf:
+                return parse_opf(opf, source)
+    except (KeyError, ParseError, zipfile.BadZipFile) as ex:
+        raise OpfImportError(f'{source}: {ex}') from ex
+
+
+def parse_opf_file(path: str, source: str | None = None) -> ParsedBook:
+    """Parse an .epub or .opf file, run in the worker processes.
+
+    `source` names the file in the result, the path by default.
+    """
+    source = source or path
+    with open(path, 'rb') as file:
+        if zipfile.is_zipfile(file):
+            return parse_epub(file, source)
+        file.seek(0)
+        return parse_opf(file, source)
+
+
+def parse_opf_bytes(source: str, data: bytes) -> ParsedBook:
+    """Parse an uploaded .epub or .opf file, run in the worker processes."""
+    file = BytesIO(data)
+    if zipfile.is_zipfile(file):
+        return parse_epub(file, source)
+    file.seek(0)
+    return parse_opf(file, source)
+
+
+def import_paths(paths: Iterable[Path]) -> list[Path]:
+    """The .epub and .opf files among `paths`, directories searched recursively."""
+    files: list[Path] = []
+    for path in paths:
+        if path.is_dir():
+            files += sorted(file for file in path.rglob('*') if file.suffix.lower() in IMPORT_SUFFIXES)
+        else:
+            files.append(path)
+    return files
+
+
+class WorkerPool:
+    """A process pool started on first use, one per purpose so the work of one does not queue behind another."""
+
+    def __init__(self, workers: int = IMPORT_WORKERS) -> None:
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def on_shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+parse_pool = WorkerPool()
+
+# a parse job: the function and its arguments
+ParseJob = tuple[Callable[..., ParsedBook], tuple[Any, ...]]
+
+
+async def parse_all(executor: Executor, jobs: AsyncIterable[ParseJob],
+                    window: int) -> AsyncGenerator[tuple[int, ParsedBook | Exception], None]:
+    """Run the jobs in `executor`, yielding `(index, book or error)` as they finish.
+
+    At most `window` jobs are submitted at a time, so a large import never holds
+    more than that many parsed books waiting for the database.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = aiter(jobs)
+    pending: dict[asyncio.Future, int] = {}
+    submitted = 0
+    exhausted = False
+    while pending or not exhausted:
+        while not exhausted and len(pending) < window:
+            try:
+                function, args = await anext(iterator)
+            except StopAsyncIteration:
+                exhausted = True
+                break
+            pending[loop.run_in_executor(executor, function, *args)] = submitted
+            submitted += 1
+        if not pending:
+            break
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            index = pending.pop(future)
+            yield index, future.exception() or future.result()
+
+
+class NameResolver:
+    """Tag and attribute ids by name, registering the names the catalog does not have yet.
+
+    One resolver serves a whole import, so each distinct name costs one lookup
+    however many books use it.
+    """
+
+    def __init__(self) -> None:
+        self.tags: dict[str, int] = {}
+        self.attributes: dict[str, int] = {}
+
+    async def resolve(self, session: AsyncSession, tags: set[str], attributes: set[str]) -> bool:
+        """Look up or register `tags` and `attributes`, returns whether anything was registered."""
+        registered = False
+        missing = tags - self.tags.keys()
+        if missing:
+            rows = await session.execute(select(MetaDataTag.tag, func.min(MetaDataTag.id))
+                                         .where(MetaDataTag.tag.in_(missing)).group_by(MetaDataTag.tag))
+            self.tags.update(rows.tuples().all())
+            new_tags = [MetaDataTag(name=tag.split(':')[-1], tag=tag) for tag in sorted(missing - self.tags.keys())]
+            if new_tags:
+                session.add_all(new_tags)
+                await session.flush()
+                self.tags.update((tag.tag, tag.id) for tag in new_tags)
+                registered = True
+        missing = attributes - self.attributes.keys()
+        if missing:
+            rows = await session.execute(select(MetaDataAttribute.name, func.min(MetaDataAttribute.id))
+                                         .where(MetaDataAttribute.name.in_(missing)).group_by(MetaDataAttribute.name))
+            self.attributes.update(rows.tuples().all())
+            new_attributes = [MetaDataAttribute(name=name) for name in sorted(missing - self.attributes.keys())]
+            if new_attributes:
+                session.add_all(new_attributes)
+                await session.flush()
+                self.attributes.update((attribute.name, attribute.id) for attribute in new_attributes)
+                registered = True
+        return registered
+
+
+def _fits(name: str, column: Any) -> bool:
+    return len(name) <= column.type.length
+
+
+async def save_book(session: AsyncSession, resolver: NameResolver, parsed: ParsedBook,
+                    batch_size: int = IMPORT_BATCH_SIZE) -> ImportedBook:
+    """Store a parsed book with its lines, tag values and attribute values.
+
+    New tags and attributes are committed first, so a book that fails later does
+    not leave the resolver pointing at rolled back rows. The lines are flushed in
+    batches of `batch_size` and the book is committed once.
+    """
+    lines = [line for line in parsed.lines if _fits(line.tag, MetaDataTag.tag)]
+    skipped = len(parsed.lines) - len(lines)
+    attribute_names = {name for line in lines for name, _ in line.attributes if _fits(name, MetaDataAttribute.name)}
+    if await resolver.resolve(session, {line.tag for line in lines}, attribute_names):
+        await session.commit()
+        await meta_data_tag_cache.invalidate()
+        await meta_data_attribute_cache.invalidate()
+
+    title = parsed.first_value('dc:title') or Path(parsed.source).stem
+    language = parsed.first_value('dc:language')
+    book = Book(title=title[:Book.title.type.length],
+                language=language[:Book.language.type.length] if language else None)
+    session.add(book)
+    await session.flush()
+    book_id = book.id
+    for start in range(0, len(lines), batch_size):
+        for line in lines[start:start + batch_size]:
+            attributes = [(name, value) for name, value in line.attributes if name in resolver.attributes]
+            skipped += len(line.attributes) - len(attributes)
+            session.add(MetaDataLine(
+                book_id=book_id, name=line.name[:MetaDataLine.name.type.length],
+                tag=MetaDataTagValue(tag_id=resolver.tags[line.tag], value=line.value),
+                attributes=[MetaDataAttributeValue(attribute_id=resolver.attributes[name], attribute_value=value)
+                            for name, value in attributes]))
+        # lines, tag values and attribute values go out as three batched INSERTs
+        await session.flush()
+        session.expunge_all()
+    await session.commit()
+    return ImportedBook(book_id=book_id, title=book.title, source=parsed.source, lines=len(lines), skipped=skipped)
+
+
+async def import_books(session: AsyncSession, executor: Executor, jobs: AsyncIterable[ParseJob],
+                       window: int = IMPORT_WORKERS * 2,
+                       progress: Callable[[int], Awaitable[None]] | None = None) -> BulkResult[ImportedBook]:
+    """Parse the jobs in `executor` and store every book as it comes in, one transaction per book.
+
+    Files that cannot be parsed or stored are reported in `errors` with their job
+    index, the other books are kept. `progress` is awaited with the number of files
+    handled so far after each one.
+    """
+    resolver = NameResolver()
+    items: list[ImportedBook] = []
+    errors: list[BulkItemError] = []
+    async for index, parsed in parse_all(executor, jobs, window):
+        if isinstance(parsed, Exception):
+            errors.append(BulkItemError(index=index, detail=str(parsed)))
+        else:
+            try:
+                items.append(await save_book(session, resolver, parsed))
+            except Exception as ex:
+                await session.rollback()
+                # the names registered by this book may have been rolled back with it
+                resolver = NameResolver()
+                errors.append(BulkItemError(index=index, detail=f'{parsed.source}: {ex}'))
+        if progress is not None:
+            await progress(len(items) + len(errors))
+    return BulkResult[ImportedBook](items=items, errors=sorted(errors, key=lambda error: error.index))
+
+
+async def file_jobs(paths: Iterable[Path]) -> AsyncGenerator[ParseJob, None]:
+    for path in paths:
+        yield parse_opf_file, (str(path),)
+
+
+async def import_job(context: JobContext) -> dict[str, Any]:
+    """`opf_import` job: params `files` holds `[name, path]` pairs of the uploaded files.
+
+    The paths are relative to the queue's `result_dir`.
+    """
+    files = context.params['files']
+
+    async def jobs() -> AsyncGenerator[ParseJob, None]:
+        for source, path in files:
+            yield parse_opf_file, (str(context.queue.result_dir / path), source)
+
+    await context.progress(0, len(files))
+    async with context.session() as session:
+        result = await import_books(session, parse_pool.executor, jobs(), progress=context.progress)
+    return asdict(result)
+
+
+job_queue.register('opf_import', import_job)
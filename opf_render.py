@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import TYPE_CHECKING, Any, Iterable
+
+from sqlalchemy import Select, and_, bindparam, event, inspect, select, update
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from model.meta_data_attribute import MetaDataAttribute
+from model.meta_data_attribute_value import MetaDataAttributeValue
+from model.meta_data_line import MetaDataLine
+from model.meta_data_tag import MetaDataTag
+from model.meta_data_tag_value import MetaDataTagValue
+from opf import render_element
+
+if TYPE_CHECKING:
+    from sqlalchemy import Connection
+
+# lines rendered per query and per executemany UPDATE
+RENDER_BATCH_SIZE = 1000
+
+PENDING_KEY = 'opf_render_pending'
+
+# catalog columns that end up in the rendered element or its sort key
+TAG_COLUMNS = ('tag', 'sort_order')
+ATTRIBUTE_COLUMNS = ('name', 'sort_order')
+
+
+def render_statement(line_ids: Iterable[int]) -> Select:
+    """One row per attribute value (or per line without attributes) of the lines, a line's rows adjacent."""
+    return (
+        select(MetaDataLine.book_id,
+               MetaDataLine.id,
+               MetaDataTag.sort_order,
+               MetaDataTag.tag,
+               MetaDataTagValue.value,
+               MetaDataTagValue.is_empty_tag,
+               MetaDataAttribute.name,
+               MetaDataAttributeValue.attribute_value)
+        .join(MetaDataTagValue, and_(MetaDataTagValue.book_id == MetaDataLine.book_id,
+                                     MetaDataTagValue.line_id == MetaDataLine.id))
+        .join(MetaDataTag, MetaDataTag.id == MetaDataTagValue.tag_id)
+        .outerjoin(MetaDataAttributeValue, and_(MetaDataAttributeValue.book_id == MetaDataLine.book_id,
+                                                MetaDataAttributeValue.line_id == MetaDataLine.id))
+        .outerjoin(MetaDataAttribute, MetaDataAttribute.id == MetaDataAttributeValue.attribute_id)
+        .where(MetaDataLine.id.in_(list(line_ids)))
+        .order_by(MetaDataLine.id, MetaDataAttribute.sort_order, MetaDataAttributeValue.id)
+    )
+
+
+def render_rows(rows: Iterable[Any]) -> list[dict[str, Any]]:
+    """Parameters of the line UPDATE, one per line, from the rows of `render_statement()`."""
+    params: list[dict[str, Any]] = []
+    current = None
+    attributes: list[tuple[str, str | None]] = []
+    for book_id, line_id, sort_order, tag, value, is_empty_tag, attribute_name, attribute_value in rows:
+        if current is not None and current[1] != line_id:
+            params.append(_line_params(current, attributes))
+            attributes = []
+        current = (book_id, line_id, sort_order, tag, value, is_empty_tag)
+        if attribute_name is not None:
+            attributes.append((attribute_name, attribute_value))
+    if current is not None:
+        params.append(_line_params(current, attributes))
+    return params
+
+
+def _line_params(line: tuple, attributes: list[tuple[str, str | None]]) -> dict[str, Any]:
+    book_id, line_id, sort_order, tag, value, is_empty_tag = line
+    return {'b_book_id': book_id, 'b_line_id': line_id, 'tag_sort_order': sort_order,
+            'rendered_xml': render_element(tag, value, is_empty_tag, attributes)}
+
+
+# the book id is part of the key so Postgres only touches the book's partition
+_update_rendered = (
+    update(MetaDataLine.__table__)
+    .where(MetaDataLine.__table__.c.book_id == bindparam('b_book_id'),
+           MetaDataLine.__table__.c.line_id == bindparam('b_line_id'))
+    .values(tag_sort_order=bindparam('tag_sort_order'), rendered_xml=bindparam('rendered_xml'))
+)
+
+
+def render_lines(connection: Connection, line_ids: Iterable[int]) -> int:
+    """Store the rendered element and sort key of each line, returns the number of lines rendered.
+
+    Lines without a tag value (or deleted ones) have nothing to render, their
+    columns are cleared.
+    """
+    line_ids = sorted(set(line_ids))
+    rendered = 0
+    for start in range(0, len(line_ids), RENDER_BATCH_SIZE):
+        batch = line_ids[start:start + RENDER_BATCH_SIZE]
+        params = render_rows(connection.execute(render_statement(batch)))
+        if params:
+            connection.execute(_update_rendered, params)
+        missing = set(batch).difference(param['b_line_id'] for param in params)
+        if missing:
+            connection.execute(update(MetaDataLine.__table__)
+                               .where(MetaDataLine.__table__.c.line_id.in_(missing),
+                                      MetaDataLine.__table__.c.rendered_xml.is_not(None))
+                               .values(tag_sort_order=None, rendered_xml=None))
+        rendered += len(params)
+    return rendered
+
+
+def render_book(connection: Connection, book_id: int | None = None) -> int:
+    """Render every line of a book, or of all books, e.g. to fill the columns in for existing rows."""
+    statement = select(MetaDataLine.id)
+    if book_id is not None:
+        statement = statement.where(MetaDataLine.book_id == book_id)
+    return render_lines(connection, connection.scalars(statement).all())
+
+
+def lines_using(connection: Connection, tag_ids: Iterable[int], attribute_ids: Iterable[int]) -> set[int]:
+    """Ids of the lines with a value of one of the tags or attributes."""
+    line_ids: set[int] = set()
+    tag_ids, attribute_ids = list(tag_ids), list(attribute_ids)
+    if tag_ids:
+        line_ids.update(connection.scalars(select(MetaDataTagValue.line_id)
+                                           .where(MetaDataTagValue.tag_id.in_(tag_ids))))
+    if attribute_ids:
+        line_ids.update(connection.scalars(select(MetaDataAttributeValue.line_id)
+                                           .where(MetaDataAttributeValue.attribute_id.in_(attribute_ids))))
+    return line_ids
+
+
+def _changed(obj: Any, columns: Iterable[str]) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[column].history.has_changes() for column in columns)
+
+
+@dataclass
+class _Pending:
+    """What a flush changed that the rendered lines depend on."""
+    lines: list[MetaDataLine] = field(default_factory=list)
+    values: list[Any] = field(default_factory=list)
+    line_ids: set[int] = field(default_factory=set)
+    tag_ids: set[int] = field(default_factory=set)
+    attribute_ids: set[int] = field(default_factory=set)
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_changes(session: Session, flush_context: Any, instances: Any) -> None:
+    # new objects get their ids during the flush, so they are resolved afterwards
+    pending = _Pending()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, MetaDataLine):
+            if obj not in session.deleted and (obj in session.new or session.is_modified(obj)):
+                pending.lines.append(obj)
+        elif isinstance(obj, (MetaDataTagValue, MetaDataAttributeValue)):
+            pending.values.append(obj)
+            # a value moved to another line leaves the old one to re-render
+            pending.line_ids.update(line_id for line_id in inspect(obj).attrs.line_id.history.deleted
+                                    if line_id is not None)
+        elif isinstance(obj, MetaDataTag) and obj in session.dirty and _changed(obj, TAG_COLUMNS):
+            pending.tag_ids.add(obj.id)
+        elif isinstance(obj, MetaDataAttribute) and obj in session.dirty and _changed(obj, ATTRIBUTE_COLUMNS):
+            pending.attribute_ids.add(obj.id)
+    session.info[PENDING_KEY] = pending
+
+
+@event.listens_for(Session, 'after_flush')
+def _render_changes(session: Session, flush_context: Any) -> None:
+    pending: _Pending | None = session.info.pop(PENDING_KEY, None)
+    if pending is None:
+        return
+    line_ids = set(pending.line_ids)
+    line_ids.update(obj.id for obj in pending.lines if obj.id is not None)
+    line_ids.update(obj.line_id for obj in pending.values if obj.line_id is not None)
+    connection = session.connection()
+    line_ids |= lines_using(connection, pending.tag_ids, pending.attribute_ids)
+    if line_ids:
+        render_lines(connection, line_ids)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _render_after_bulk_update(state: ORMExecuteState) -> Any:
+    """Bulk UPDATEs by primary key (`update_many()`) of tags and attributes skip the flush events."""
+    if not state.is_update or state.bind_mapper is None or not isinstance(state.parameters, list):
+        return None
+    model = state.bind_mapper.class_
+    if model is MetaDataTag:
+        columns, tags = TAG_COLUMNS, True
+    elif model is MetaDataAttribute:
+        columns, tags = ATTRIBUTE_COLUMNS, False
+    else:
+        return None
+    ids = [params['id'] for params in state.parameters if any(column in params for column in columns)]
+    result = state.invoke_statement()
+    if ids:
+        connection = state.session.connection()
+        render_lines(connection, lines_using(connection, ids if tags else [], [] if tags else ids))
+    return result
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import TYPE_CHECKING, AsyncGenerator, Callable
+
+from litestar.datastructures import Cookie, MutableScopeHeaders
+
+if TYPE_CHECKING:
+    from litestar import Request
+    from litestar.contrib.sqlalchemy.plugins import SQLAlchemyAsyncConfig
+    from litestar.types import Message, Scope
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+READ_DATABASE_URL = os.environ.get('DATABASE_READ_URL')
+# seconds a client keeps reading from the primary after it wrote something
+READ_YOUR_WRITES_SECONDS = int(os.environ.get('DATABASE_READ_YOUR_WRITES_SECONDS', '5'))
+
+PRIMARY_COOKIE = 'db_primary_until'
+READ_METHODS = frozenset({'GET', 'HEAD'})
+
+
+class ReadReplica:
+    """Sends GET/HEAD requests to a read-only replica, everything else to the primary.
+
+    A successful write sets a short lived cookie, and while it is valid the client's
+    reads go to the primary as well, so it never reads data older than its own
+    write because of replication lag. Without a replica config every request uses
+    the primary.
+    """
+
+    def __init__(self, config: SQLAlchemyAsyncConfig | None, window: int = READ_YOUR_WRITES_SECONDS) -> None:
+        self.config = config
+        self.window = window
+        self.engine: AsyncEngine | None = None
+        self.session_maker: Callable[[], AsyncSession] | None = None
+
+    async def on_startup(self) -> None:
+        if self.config is not None:
+            # the config builds a new engine on every call unless one is pinned
+            self.engine = self.config.engine_instance = self.config.get_engine()
+            self.session_maker = self.config.create_session_maker()
+
+    async def on_shutdown(self) -> None:
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = self.session_maker = self.config.engine_instance = None
+
+    def use_replica(self, request: Request) -> bool:
+        if self.engine is None or request.method not in READ_METHODS:
+            return False
+        try:
+            return float(request.cookies.get(PRIMARY_COOKIE, 0)) < time.time()
+        except ValueError:
+            return True
+
+    async def provide_session(self, request: Request, db_session: AsyncSession) -> AsyncGenerator[AsyncSession, None]:
+        """`db_routed_session` dependency, the session the `provide_*_repo` functions use."""
+        if not self.use_replica(request):
+            yield db_session
+            return
+        async with self.session_maker() as session:
+            yield session
+
+    def provide_engine(self, request: Request, db_engine: AsyncEngine) -> AsyncEngine:
+        """`db_routed_engine` dependency, for handlers that stream from their own connection."""
+        return self.engine if self.use_replica(request) else db_engine
+
+    async def mark_write(self, message: Message, scope: Scope) -> None:
+        """`before_send` hook starting the read-your-writes window after a successful write."""
+        if (self.engine is None or message['type'] != 'http.response.start'
+                or scope.get('method') in READ_METHODS or message['status'] >= 400):
+            return
+        cookie = Cookie(key=PRIMARY_COOKIE, value=str(int(time.time()) + self.window),
+                        max_age=self.window, path='/', httponly=True, samesite='lax')
+        MutableScopeHeaders.from_message(message=message).add('set-cookie', cookie.to_header(header=''))
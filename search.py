@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
+
+from litestar.contrib.sqlalchemy.repository import ModelT
+from litestar.exceptions import ValidationException
+from sqlalchemy import DDL, Float, Index, Select, and_, case, cast, column, event, func, or_, select, table, text
+
+from shared import KeysetCursor, KeysetPagination, KeysetParams, SQLAlchemyAsyncRowRepository, like_escape
+
+if TYPE_CHECKING:
+    from sqlalchemy import ColumnElement, Connection, Row, Table
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar('T')
+
+# the SQLite trigram tokenizer cannot match shorter queries, they fall back to LIKE
+TRIGRAM_LENGTH = 3
+
+PG_TRGM_EXTENSION = 'CREATE EXTENSION IF NOT EXISTS pg_trgm'
+
+
+@dataclass
+class SearchIndex:
+    """Text search over some columns of a table.
+
+    On Postgres every column gets a `pg_trgm` GIN index, which serves the
+    `ILIKE '%query%'` filter, and matches are ranked by `word_similarity()`.
+    SQLite gets an FTS5 table with the trigram tokenizer, kept in step with the
+    table by triggers, ranked by `bm25()`. Other dialects scan with LIKE.
+    """
+    table: Table
+    key: str
+    columns: tuple[str, ...]
+    indexes: list[Index] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.indexes = [Index(f'ix_{self.table.name}_{name}_trgm', self.table.c[name],
+                              postgresql_using='gin', postgresql_ops={name: 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+                        for name in self.columns]
+        event.listen(self.table, 'before_create', DDL(PG_TRGM_EXTENSION).execute_if(dialect='postgresql'))
+        for statement in self.fts_ddl():
+            event.listen(self.table, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+        event.listen(self.table, 'before_drop',
+                     DDL(f'DROP TABLE IF EXISTS {self.fts_name}').execute_if(dialect='sqlite'))
+
+    @property
+    def fts_name(self) -> str:
+        return f'{self.table.name}_fts'
+
+    def fts_ddl(self) -> list[str]:
+        """The FTS5 external content table over `columns` and the triggers that keep it current."""
+        name, table_name, key = self.fts_name, self.table.name, self.key
+        columns = ', '.join(self.columns)
+        new = ', '.join(f'new.{column}' for column in self.columns)
+        old = ', '.join(f'old.{column}' for column in self.columns)
+        delete = f"INSERT INTO {name}({name}, rowid, {columns}) VALUES ('delete', old.{key}, {old});"
+        insert = f'INSERT INTO {name}(rowid, {columns}) VALUES (new.{key}, {new});'
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5({columns}, content='{table_name}', "
+            f"content_rowid='{key}', tokenize='trigram')",
+            f'CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {table_name} BEGIN {insert} END',
+            f'CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {table_name} BEGIN {delete} END',
+            f'CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE OF {columns} ON {table_name} '
+            f'BEGIN {delete} {insert} END',
+            # rows written before the search table existed
+            f"INSERT INTO {name}({name}) VALUES ('rebuild')",
+        ]
+
+    def create(self, connection: Connection) -> None:
+        """Add the search index to a table that was created without `create_all()`, e.g. by a migration."""
+        if connection.dialect.name == 'postgresql':
+            connection.execute(DDL(PG_TRGM_EXTENSION))
+            for index in self.indexes:
+                index.create(connection)
+        elif connection.dialect.name == 'sqlite':
+            for statement in self.fts_ddl():
+                connection.execute(DDL(statement))
+
+    def drop(self, connection: Connection) -> None:
+        """Drop the search index but not its table, e.g. in a migration's downgrade."""
+        if connection.dialect.name == 'postgresql':
+            for index in self.indexes:
+                index.drop(connection)
+        elif connection.dialect.name == 'sqlite':
+            # the triggers would go on writing to the dropped FTS5 table
+            for trigger in ('insert', 'delete', 'update'):
+                connection.execute(DDL(f'DROP TRIGGER IF EXISTS {self.fts_name}_{trigger}'))
+            connection.execute(DDL(f'DROP TABLE IF EXISTS {self.fts_name}'))
+
+    def matches(self, dialect: str, query: str) -> Select:
+        """`(key, rank)` of the rows with `query` in one of the columns, a higher rank is a better match."""
+        key = self.table.c[self.key]
+        if dialect == 'sqlite' and len(query) >= TRIGRAM_LENGTH:
+            fts = table(self.fts_name, column('rowid'), column(self.fts_name))
+            phrase = '"' + query.replace('"', '""') + '"'
+            return (select(fts.c.rowid.label('key'), (-func.bm25(text(self.fts_name))).label('rank'))
+                    .where(fts.c[self.fts_name].op('MATCH')(phrase)))
+        pattern = '%' + like_escape(query) + '%'
+        found = or_(*(self.table.c[name].ilike(pattern, escape='\\') for name in self.columns))
+        if dialect == 'postgresql':
+            rank = func.greatest(*(func.coalesce(func.word_similarity(query, self.table.c[name]), 0)
+                                   for name in self.columns))
+        else:
+            # without a similarity function, values starting with the query come first
+            prefix = like_escape(query) + '%'
+            rank = cast(case(*((self.table.c[name].ilike(prefix, escape='\\'), 1) for name in self.columns),
+                             else_=0), Float)
+        return select(key.label('key'), rank.label('rank')).where(found)
+
+
+async def ranked_page(session: AsyncSession, statement: Select, key: ColumnElement, rank: ColumnElement,
+                      params: KeysetParams, to_item: Callable[[Row], T]) -> KeysetPagination[T]:
+    """One page of `statement` in rank order, best first, ties by `key`.
+
+    The cursor holds the rank and key of the last row, the next page continues
+    with `WHERE rank < :rank OR (rank = :rank AND key > :key)`. Only forward
+    cursors are handed out, `prev_cursor` is always empty.
+
+    Args:
+        statement: the rows to page through, `to_item()` turns one of its rows into an item.
+        key: unique column breaking rank ties.
+        rank: relevance of a row, higher is better.
+        params: page size, cursor and count mode.
+    """
+    total = None
+    if params.count != 'none':
+        total = await session.scalar(select(func.count()).select_from(statement.subquery()))
+    cursor = params.cursor
+    if cursor is not None:
+        if cursor.backward or len(cursor.values) != 2:
+            raise ValidationException(detail='invalid cursor')
+        last_rank, last_key = cursor.values
+        statement = statement.where(or_(rank < last_rank, and_(rank == last_rank, key > last_key)))
+    statement = statement.add_columns(rank, key).order_by(rank.desc(), key).limit(params.page_size + 1)
+    rows = (await session.execute(statement)).all()
+    has_more = len(rows) > params.page_size
+    rows = rows[:params.page_size]
+    next_cursor = KeysetCursor([rows[-1][-2], rows[-1][-1]]).encode() if has_more else None
+    return KeysetPagination(items=[to_item(row[:-2]) for row in rows], page_size=params.page_size,
+                            next_cursor=next_cursor, total=total)
+
+
+# this class can be re-used with any model that has a `SearchIndex`
+class SQLAlchemyAsyncSearchRepository(SQLAlchemyAsyncRowRepository[ModelT]):
+    """Extends the repository with ranked text search over `search_index`, returning `struct_type` instances."""
+    search_index: SearchIndex
+
+    async def search(self, query: str, params: KeysetParams, *where: ColumnElement[bool]) -> KeysetPagination[Any]:
+        """One page of the rows matching `query`, best matches first.
+
+        Args:
+            query (str): text to look for, anywhere in the indexed columns.
+            params (KeysetParams): page size, cursor from the previous page and count mode.
+            *where: extra criteria on the rows.
+        """
+        hits = self.search_index.matches(self._dialect.name, query).subquery()
+        key = getattr(self.model_type, self.id_attribute)
+        statement = self.scoped(self.row_statement()).join(hits, hits.c.key == key).where(*where)
+        return await ranked_page(self.session, statement, key, hits.c.rank, params, self.to_struct)
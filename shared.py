@@ -1,17 +1,24 @@
 from __future__ import annotations
 
-import random
+import base64
+import json
 import re
-import string
-from typing import TYPE_CHECKING, Any
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Generic, Iterable, List, Literal, Optional, TypeVar
 
+import msgspec
 import unicodedata
+from advanced_alchemy.exceptions import ConflictError, NotFoundError
 from litestar.contrib.sqlalchemy.repository import (
     ModelT,
     SQLAlchemyAsyncRepository,
 )
+from litestar.exceptions import ValidationException
 from litestar.params import Parameter
-from litestar.repository.filters import LimitOffset
+from litestar.repository.filters import CollectionFilter, LimitOffset, OrderBy
+from sqlalchemy import ColumnElement, Row, Select, String, func, inspect, or_, over, select, text, tuple_, union
+from sqlalchemy.exc import IntegrityError
 
 if TYPE_CHECKING:
     pass
@@ -40,17 +47,421 @@ def provide_limit_offset_pagination(
     return LimitOffset(page_size, page_size * (current_page - 1))
 
 
+T = TypeVar('T')
+
+CountMode = Literal['none', 'exact', 'estimate']
+
+
+@dataclass
+class KeysetCursor:
+    """Position in a keyset ordered list.
+
+    `values` holds the ordering key of the row the page starts after (or before,
+    when `backward` is set).
+    """
+    values: list[Any]
+    backward: bool = False
+
+    def encode(self) -> str:
+        raw = json.dumps({'d': 'p' if self.backward else 'n', 'k': self.values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @classmethod
+    def decode(cls, token: str) -> KeysetCursor:
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            raw = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            return cls(values=list(raw['k']), backward=raw['d'] == 'p')
+        except (ValueError, KeyError, TypeError) as ex:
+            raise ValidationException(detail='invalid cursor') from ex
+
+
+@dataclass
+class KeysetParams:
+    """Keyset pagination request, consumed by `SQLAlchemyAsyncKeysetRepository.list_keyset()`."""
+    page_size: int
+    cursor: KeysetCursor | None = None
+    count: CountMode = 'none'
+
+
+@dataclass
+class KeysetPagination(Generic[T]):
+    """Container for data returned using keyset (cursor) pagination."""
+    items: List[T]
+    page_size: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+
+def provide_keyset_pagination(
+    cursor: Optional[str] = Parameter(query='cursor', default=None, required=False),
+    page_size: int = Parameter(
+        query='pageSize',
+        ge=1,
+        le=1000,
+        default=10,
+        required=False,
+    ),
+    count: CountMode = Parameter(query='count', default='none', required=False),
+) -> KeysetParams:
+    """Add keyset (cursor) pagination.
+
+    Return type consumed by `SQLAlchemyAsyncKeysetRepository.list_keyset()`.
+
+    Parameters
+    ----------
+    cursor : str
+        opaque `next_cursor`/`prev_cursor` value from a previous page, empty for the first page.
+    page_size : int
+        LIMIT to apply to select.
+    count : str
+        `none` skips the total, `exact` runs COUNT(*), `estimate` reads the planner statistics.
+    """
+    return KeysetParams(page_size=page_size,
+                        cursor=KeysetCursor.decode(cursor) if cursor else None,
+                        count=count)
+
+
+StructT = TypeVar('StructT', bound=msgspec.Struct)
+
+
+# this class can be re-used with any model, pass `scope` to limit the repository to the
+# rows of one owner, e.g. `scope={'book_id': 1}`
+class SQLAlchemyAsyncScopedRepository(SQLAlchemyAsyncRepository[ModelT]):
+    """Extends the repository so it only sees the rows matching `scope`.
+
+    The scope is added to the base statement that `list()`, `get()`, `count()`,
+    `update()` and `delete()` start from, statements built by subclasses go through
+    `scoped()`, and `add()`/`add_many()` fill the scope columns in on new rows.
+    """
+
+    def __init__(self, *, scope: dict[str, Any] | None = None, statement: Select | None = None,
+                 **kwargs: Any) -> None:
+        self.scope = scope or {}
+        if self.scope:
+            statement = self.scoped(statement if statement is not None else select(self.model_type))
+        super().__init__(statement=statement, **kwargs)
+
+    def scope_criteria(self) -> list[ColumnElement[bool]]:
+        return [getattr(self.model_type, name) == value for name, value in self.scope.items()]
+
+    def scoped(self, statement: Select) -> Select:
+        return statement.where(*self.scope_criteria()) if self.scope else statement
+
+    def _fill_scope(self, data: ModelT) -> ModelT:
+        for name, value in self.scope.items():
+            setattr(data, name, value)
+        return data
+
+    async def add(self, data: ModelT, *args: Any, **kwargs: Any) -> ModelT:
+        return await super().add(self._fill_scope(data), *args, **kwargs)
+
+    async def add_many(self, data: list[ModelT], *args: Any, **kwargs: Any) -> list[ModelT]:
+        return await super().add_many([self._fill_scope(item) for item in data], *args, **kwargs)
+
+
+# this class can be re-used with any model, set `struct_type` to a Struct whose field
+# names are column attributes of the model, or override `row_statement()`/`to_struct()`
+class SQLAlchemyAsyncRowRepository(SQLAlchemyAsyncScopedRepository[ModelT]):
+    """Extends the repository with reads that return msgspec Structs built from plain column rows.
+
+    No ORM instances, identity map bookkeeping or pydantic validation are involved:
+    each row goes positionally into a Struct, and Litestar encodes Structs straight
+    to JSON bytes. Filters are the same as for `list()`.
+    """
+    struct_type: type[msgspec.Struct]
+
+    def row_statement(self) -> Select:
+        """Columns in the order of the fields of `struct_type`."""
+        return select(*(getattr(self.model_type, name) for name in self.struct_type.__struct_fields__))
+
+    def to_struct(self, row: Row) -> Any:
+        return self.struct_type(*row)
+
+    async def list_structs(self, *filters: Any, **kwargs: Any) -> list[Any]:
+        """Like `list()`, returning `struct_type` instances."""
+        statement = self._get_base_stmt(self.scoped(self.row_statement()))
+        statement = self._apply_filters(*filters, statement=statement)
+        statement = self._filter_select_by_kwargs(statement, kwargs)
+        result = await self._execute(statement)
+        return [self.to_struct(row) for row in result]
+
+    async def list_structs_and_count(self, *filters: Any, **kwargs: Any) -> tuple[list[Any], int]:
+        """Like `list_and_count()`, the total comes from a window function in the same query."""
+        field = self.get_id_attribute_value(self.model_type)
+        statement = self._get_base_stmt(self.scoped(self.row_statement()).add_columns(over(func.count(field))))
+        statement = self._apply_filters(*filters, statement=statement)
+        statement = self._filter_select_by_kwargs(statement, kwargs)
+        rows = (await self._execute(statement)).all()
+        total = rows[0][-1] if rows else 0
+        return [self.to_struct(row[:-1]) for row in rows], total
+
+    async def get_struct(self, item_id: Any) -> Any:
+        """Like `get()`, returning a `struct_type` instance.
+
+        Raises:
+            NotFoundError: no row has `item_id`.
+        """
+        field = self.get_id_attribute_value(self.model_type)
+        row = (await self.session.execute(self.scoped(self.row_statement()).where(field == item_id))).first()
+        if row is None:
+            raise NotFoundError('No item found when one was expected')
+        return self.to_struct(row)
+
+
+# this class can be re-used with any model, set `keyset_columns` to a unique ordering
+class SQLAlchemyAsyncKeysetRepository(SQLAlchemyAsyncRowRepository[ModelT]):
+    """Extends the repository with keyset (seek) pagination.
+
+    Pages are read with `WHERE (col1, col2, ...) > (:v1, :v2, ...) ORDER BY col1, col2, ...`
+    so an index on `keyset_columns` is used no matter how deep the page is, instead
+    of scanning and throwing away OFFSET rows.
+    """
+    keyset_columns: tuple[str, ...] = ('id',)
+
+    async def list_keyset(self, params: KeysetParams, *filters: Any, structs: bool = False,
+                          **kwargs: Any) -> KeysetPagination[ModelT]:
+        """Get one page of rows after (or before) the cursor.
+
+        Args:
+            params (KeysetParams): page size, cursor and count mode.
+            *filters: extra filters applied to the page and the exact count.
+            structs (bool): return `struct_type` instances instead of model instances, see `list_structs()`.
+            **kwargs: instance attribute value filters.
+
+        Returns:
+            KeysetPagination: the rows with the cursors for the neighbouring pages.
+        """
+        columns = [getattr(self.model_type, name) for name in self.keyset_columns]
+        cursor = params.cursor
+        backward = cursor is not None and cursor.backward
+        seek = []
+        if cursor is not None:
+            if len(cursor.values) != len(columns):
+                raise ValidationException(detail='invalid cursor')
+            key = tuple_(*columns)
+            seek.append(key < tuple(cursor.values) if backward else key > tuple(cursor.values))
+        order = [OrderBy(field_name=column, sort_order='desc' if backward else 'asc') for column in columns]
+        # one extra row tells us whether there is another page without a COUNT
+        fetch = self.list_structs if structs else self.list
+        rows = await fetch(*filters, *seek, *order, LimitOffset(params.page_size + 1, 0), **kwargs)
+        has_more = len(rows) > params.page_size
+        rows = rows[:params.page_size]
+        if backward:
+            rows.reverse()
+
+        next_cursor = prev_cursor = None
+        if rows:
+            if has_more or backward:
+                next_cursor = KeysetCursor(self._keyset_values(rows[-1])).encode()
+            if (has_more and backward) or (cursor is not None and not backward):
+                prev_cursor = KeysetCursor(self._keyset_values(rows[0]), backward=True).encode()
+
+        total, estimated = await self._keyset_total(params.count, *filters, **kwargs)
+        return KeysetPagination(items=rows, page_size=params.page_size,
+                                next_cursor=next_cursor, prev_cursor=prev_cursor,
+                                total=total, total_is_estimate=estimated)
+
+    def _keyset_values(self, row: ModelT) -> list[Any]:
+        return [getattr(row, name) for name in self.keyset_columns]
+
+    async def _keyset_total(self, mode: CountMode, *filters: Any, **kwargs: Any) -> tuple[int | None, bool]:
+        if mode == 'none':
+            return None, False
+        if (mode == 'estimate' and not filters and not kwargs and not self.scope
+                and self._dialect.name == 'postgresql'):
+            # planner statistics, maintained by (auto)vacuum/analyze; no table scan
+            result = await self.session.execute(
+                text('SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table_name AS regclass)'),
+                {'table_name': self.model_type.__table__.name})
+            estimate = result.scalar_one_or_none()
+            # -1 means the table has never been analyzed
+            if estimate is not None and estimate >= 0:
+                return int(estimate), True
+        return await self.count(*filters, **kwargs), False
+
+
+@dataclass
+class BulkItemError:
+    """Problem with one entry of a batch request, `index` is its position in the request body."""
+    index: int
+    id: Optional[int] = None
+    detail: str = ''
+
+
+@dataclass
+class BulkResult(Generic[T]):
+    """Container for the rows written by a batch request and the entries that were skipped."""
+    items: List[T]
+    errors: List[BulkItemError]
+
+
+# this class can be re-used with any model that has an integer `id` primary key
+class SQLAlchemyAsyncBulkRepository(SQLAlchemyAsyncScopedRepository[ModelT]):
+    """Extends the repository with batch create/update/delete that report problems per item.
+
+    Nothing is committed here, the caller commits once for the whole batch.
+    """
+    # columns of other tables holding ids of this one, `bulk_delete()` skips the rows they refer to
+    referenced_by: tuple[Any, ...] = ()
+
+    async def existing_ids(self, item_ids: Iterable[Any]) -> set[Any]:
+        """Return the subset of `item_ids` that are in the table (and the scope), in one query."""
+        item_ids = list(item_ids)
+        if not item_ids:
+            return set()
+        id_column = getattr(self.model_type, self.id_attribute)
+        result = await self.session.execute(self.scoped(select(id_column).where(id_column.in_(item_ids))))
+        return set(result.scalars())
+
+    async def referenced_ids(self, item_ids: Iterable[Any]) -> set[Any]:
+        """Return the subset of `item_ids` a row of a `referenced_by` table refers to, in one query."""
+        item_ids = list(item_ids)
+        if not item_ids or not self.referenced_by:
+            return set()
+        statement = union(*(select(column).where(column.in_(item_ids)) for column in self.referenced_by))
+        return set((await self.session.execute(statement)).scalars())
+
+    async def check_ids(self, item_ids: list[Any]) -> list[BulkItemError]:
+        """Report the entries of `item_ids` that are repeated or not in the table."""
+        existing = await self.existing_ids(item_ids)
+        errors: list[BulkItemError] = []
+        seen: set[Any] = set()
+        for index, item_id in enumerate(item_ids):
+            if item_id not in existing:
+                errors.append(BulkItemError(index=index, id=item_id, detail='not found'))
+            elif item_id in seen:
+                errors.append(BulkItemError(index=index, id=item_id, detail='duplicate id'))
+            seen.add(item_id)
+        return errors
+
+    def value_problem(self, item: dict[str, Any], new: bool = False) -> str | None:
+        """Why the table would refuse the values of `item`, or `None`.
+
+        Catches a required column left empty and a string longer than its column,
+        which would otherwise fail the statement of the whole batch. A `new` row
+        needs every required column, an update only the ones it sets.
+        """
+        for attribute in inspect(self.model_type).column_attrs:
+            column = attribute.columns[0]
+            if attribute.key in self.scope:
+                continue
+            value = item.get(attribute.key)
+            if value is None:
+                has_default = column.default is not None or column.server_default is not None
+                if (not column.nullable and not column.primary_key and not has_default
+                        and (new or attribute.key in item)):
+                    return f'{attribute.key} is required'
+            elif isinstance(column.type, String) and column.type.length and len(value) > column.type.length:
+                return f'{attribute.key} is longer than {column.type.length} characters'
+        return None
+
+    def check_values(self, data: list[dict[str, Any]], new: bool = False) -> list[BulkItemError]:
+        """Report the entries of `data` the table would refuse, see `value_problem()`."""
+        errors: list[BulkItemError] = []
+        for index, item in enumerate(data):
+            problem = self.value_problem(item, new)
+            if problem is not None:
+                errors.append(BulkItemError(index=index, id=item.get(self.id_attribute), detail=problem))
+        return errors
+
+    async def bulk_add(self, data: list[dict[str, Any]]) -> BulkResult[ModelT]:
+        """Insert the entries of `data` the table accepts with one batched INSERT.
+
+        Args:
+            data (list[dict]): column values keyed by attribute name.
+
+        Returns:
+            BulkResult: the new rows and the entries that were skipped.
+        """
+        errors = self.check_values(data, new=True)
+        skipped = {error.index for error in errors}
+        objs = [self.model_type(**item) for index, item in enumerate(data) if index not in skipped]
+        items = await self.add_many(objs) if objs else []
+        return BulkResult(items=items, errors=errors)
+
+    async def bulk_update(self, data: list[dict[str, Any]]) -> BulkResult[ModelT]:
+        """Update the rows named by the `id` of each entry with one executemany UPDATE.
+
+        Args:
+            data (list[dict]): column values keyed by attribute name, each with an `id`.
+
+        Returns:
+            BulkResult: the updated rows and the entries that were skipped.
+        """
+        errors = await self.check_ids([item[self.id_attribute] for item in data])
+        skipped = {error.index for error in errors}
+        errors += [error for error in self.check_values(data) if error.index not in skipped]
+        errors.sort(key=lambda error: error.index)
+        skipped = {error.index for error in errors}
+        valid = [item for index, item in enumerate(data) if index not in skipped]
+        if not valid:
+            return BulkResult(items=[], errors=errors)
+        # update_many bypasses the ORM hook that touches `updated_at`, ETags depend on it
+        now = datetime.now(timezone.utc)
+        await self.update_many([{**item, 'updated_at': now} for item in valid])
+        ids = [item[self.id_attribute] for item in valid]
+        self.session.expire_all()
+        items = await self.list(CollectionFilter(field_name=self.id_attribute, values=ids))
+        return BulkResult(items=items, errors=errors)
+
+    async def bulk_delete(self, item_ids: list[Any]) -> BulkResult[ModelT]:
+        """Delete the rows in `item_ids` with one DELETE ... IN statement.
+
+        Rows still referred to by a `referenced_by` column are skipped, their
+        foreign key would fail the statement of the whole batch.
+
+        Args:
+            item_ids (list): primary keys to delete.
+
+        Returns:
+            BulkResult: the deleted rows and the ids that were skipped.
+        """
+        errors = await self.check_ids(item_ids)
+        skipped = {error.index for error in errors}
+        referenced = await self.referenced_ids(item_id for index, item_id in enumerate(item_ids)
+                                               if index not in skipped)
+        errors += [BulkItemError(index=index, id=item_id, detail='still in use')
+                   for index, item_id in enumerate(item_ids) if index not in skipped and item_id in referenced]
+        errors.sort(key=lambda error: error.index)
+        skipped = {error.index for error in errors}
+        valid = [item_id for index, item_id in enumerate(item_ids) if index not in skipped]
+        items = await self.delete_many(valid) if valid else []
+        return BulkResult(items=items, errors=errors)
+
+
+# precompiled for `SQLAlchemyAsyncSlugRepository._slugify()`, which runs once per value of a batch
+_SLUG_INVALID = re.compile(r'[^\w\s-]')
+_SLUG_SEPARATORS = re.compile(r'[-\s]+')
+# times `add_many_with_slugs()` re-allocates slugs another writer took in the meantime
+SLUG_ATTEMPTS = 5
+# rows per multi-row INSERT of `add_many_with_slugs()`
+SLUG_INSERT_BATCH_SIZE = 500
+# a suffixed slug at the length limit keeps this many characters less of its base
+SLUG_SUFFIX_ROOM = 7
+
+
+def like_escape(value: str) -> str:
+    """`value` with the LIKE wildcards escaped by `\\`."""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
 # this class can be re-used with any model that has the `SlugKey` Mixin
 class SQLAlchemyAsyncSlugRepository(SQLAlchemyAsyncRepository[ModelT]):
-    """Extends the repository to include slug model features."""
+    """Extends the repository to include slug model features.
+
+    Slugs are allocated per batch: all the values are slugified, one query finds
+    the taken slugs that could collide with them, and collisions get the lowest free
+    numeric suffix (`name`, `name-2`, `name-3`, ...). `add_many_with_slugs()` inserts
+    with `ON CONFLICT (slug) DO NOTHING` and re-allocates the rows another writer
+    got to first, so concurrent inserts never fail on the unique index.
+    """
 
     async def get_available_slug(self, value_to_slugify: str, **kwargs: Any, ) -> str:
         """Get a unique slug for the supplied value.
 
-        If the value is found to exist, a random 4 digit character is appended to the end.
-        There may be a better way to do this, but I wanted to limit the number of
-        additional database calls.
-
         Args:
             value_to_slugify (str): A string that should be converted to a unique slug.
             **kwargs: stuff
@@ -59,13 +470,114 @@ class SQLAlchemyAsyncSlugRepository(SQLAlchemyAsyncRepository[ModelT]):
             str: a unique slug for the supplied value. This is safe for URLs and other
             unique identifiers.
         """
-        slug = self._slugify(value_to_slugify)
-        if await self._is_slug_unique(slug):
-            return slug
-        # generate a random 4 digit alphanumeric string to make the slug unique and
-        # avoid another DB lookup.
-        random_string = "".join(random.choices(string.ascii_lowercase + string.digits, k=4))
-        return f"{slug}-{random_string}"
+        return (await self.get_available_slugs([value_to_slugify]))[0]
+
+    async def get_available_slugs(self, values: list[str]) -> list[str]:
+        """Get a unique slug for each value, unique among themselves as well, with one query.
+
+        Args:
+            values (list[str]): strings to convert to slugs.
+
+        Returns:
+            list[str]: the slugs, in the order of `values`.
+        """
+        bases = [self._slugify(value)[:self._slug_length()] for value in values]
+        taken = await self._taken_slugs(set(bases))
+        slugs: list[str] = []
+        for base in bases:
+            slug, number = base, 1
+            while slug in taken:
+                number += 1
+                suffix = f'-{number}'
+                slug = base[:self._slug_length() - len(suffix)] + suffix
+            taken.add(slug)
+            slugs.append(slug)
+        return slugs
+
+    async def add_many_with_slugs(self, data: list[ModelT], slug_source: str = 'name',
+                                  attempts: int = SLUG_ATTEMPTS) -> list[ModelT]:
+        """Insert `data` with a slug made from the `slug_source` attribute of each row.
+
+        Rows are inserted with `INSERT ... ON CONFLICT (slug) DO NOTHING`, rows whose
+        slug a concurrent writer took are given a new one and inserted again.
+
+        Returns:
+            list[ModelT]: the inserted rows, in the order of `data`.
+
+        Raises:
+            ConflictError: slugs were still taken after `attempts` rounds.
+        """
+        pending = list(data)
+        inserted: dict[str, Any] = {}
+        for _ in range(attempts):
+            if not pending:
+                break
+            slugs = await self.get_available_slugs([getattr(obj, slug_source) for obj in pending])
+            for obj, slug in zip(pending, slugs):
+                obj.slug = slug
+            inserted.update(await self._insert_ignoring_slug_conflicts(pending))
+            pending = [obj for obj in pending if obj.slug not in inserted]
+        if pending:
+            raise ConflictError(f'no free slug for {len(pending)} rows after {attempts} attempts')
+        rows = await self.list(CollectionFilter(field_name=self.id_attribute, values=list(inserted.values())))
+        by_slug = {row.slug: row for row in rows}
+        return [by_slug[obj.slug] for obj in data]
+
+    async def _taken_slugs(self, bases: set[str]) -> set[str]:
+        """The stored slugs equal to one of `bases` or starting with one of them and a dash."""
+        if not bases:
+            return set()
+        slug = self.model_type.slug
+        # a suffixed slug of a base at the length limit starts with a shorter part of it
+        room = self._slug_length() - SLUG_SUFFIX_ROOM
+        patterns = {like_escape(base[:room]) + '%' if len(base) > room else like_escape(base) + '-%'
+                    for base in bases}
+        statement = select(slug).where(or_(slug.in_(bases), *(slug.like(pattern, escape='\\')
+                                                               for pattern in patterns)))
+        return set((await self.session.scalars(statement)).all())
+
+    async def _insert_ignoring_slug_conflicts(self, data: list[ModelT]) -> dict[str, Any]:
+        """INSERT the rows, skipping those whose slug is taken, returns the ids of the inserted rows by slug."""
+        if self._dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif self._dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return await self._insert_one_by_one(data)
+        mapper = inspect(self.model_type)
+        id_column = getattr(self.model_type, self.id_attribute)
+        # rows setting the same columns share a multi-row VALUES, the other columns get their defaults
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for obj in data:
+            values = {attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs
+                      if getattr(obj, attr.key) is not None}
+            groups.setdefault(tuple(sorted(values)), []).append(values)
+        inserted: dict[str, Any] = {}
+        for rows in groups.values():
+            for start in range(0, len(rows), SLUG_INSERT_BATCH_SIZE):
+                statement = (insert(self.model_type).values(rows[start:start + SLUG_INSERT_BATCH_SIZE])
+                             .on_conflict_do_nothing(index_elements=['slug'])
+                             .returning(id_column, self.model_type.slug))
+                # RETURNING only has the rows that went in, the others lost their slug to another writer
+                inserted.update((slug, row_id) for row_id, slug in await self.session.execute(statement))
+        return inserted
+
+    async def _insert_one_by_one(self, data: list[ModelT]) -> dict[str, Any]:
+        """Fallback for dialects without ON CONFLICT: each row in a savepoint, unique violations skipped."""
+        inserted: dict[str, Any] = {}
+        for obj in data:
+            try:
+                async with self.session.begin_nested():
+                    self.session.add(obj)
+                    await self.session.flush()
+            except IntegrityError:
+                self.session.expunge(obj)
+                continue
+            inserted[obj.slug] = getattr(obj, self.id_attribute)
+        return inserted
+
+    def _slug_length(self) -> int:
+        return self.model_type.slug.type.length
 
     @staticmethod
     def _slugify(value: str) -> str:
@@ -83,8 +595,5 @@ class SQLAlchemyAsyncSlugRepository(SQLAlchemyAsyncRepository[ModelT]):
             str: a slugified string of the value parameter
         """
         value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
-        value = re.sub(r'[^\w\s-]', '', value.lower())
-        return re.sub(r'[-\s]+', '-', value).strip('-_')
-
-    async def _is_slug_unique(self, slug: str, **kwargs: Any, ) -> bool:
-        return await self.get_one_or_none(slug=slug) is None
+        value = _SLUG_INVALID.sub('', value.lower())
+        return _SLUG_SEPARATORS.sub('-', value).strip('-_')
@@ -0,0 +1,18 @@
+<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops"\
+% if language:
+ xml:lang="${language}" lang="${language}"\
+% endif
+>
+<head>
+    <meta charset="UTF-8"/>
+    <title>${title}</title>
+% for stylesheet in stylesheets:
+    <link rel="stylesheet" type="text/css" href="${stylesheet}"/>
+% endfor
+</head>
+<body>
+${body | n}
+</body>
+</html>
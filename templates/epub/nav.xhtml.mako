@@ -0,0 +1,22 @@
+<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops"\
+% if language:
+ xml:lang="${language}" lang="${language}"\
+% endif
+>
+<head>
+    <meta charset="UTF-8"/>
+    <title>${title}</title>
+</head>
+<body>
+    <nav epub:type="toc" id="toc">
+        <h1>${title}</h1>
+        <ol>
+% for entry in entries:
+            <li><a href="${entry.href}">${entry.title}</a></li>
+% endfor
+        </ol>
+    </nav>
+</body>
+</html>
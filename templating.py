@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, Iterable, Optional, Sequence
+
+import msgspec
+from litestar.contrib.mako import MakoTemplateEngine
+from mako.lookup import TemplateLookup
+
+from opf_import import WorkerPool
+
+TEMPLATE_DIR = Path(os.environ.get('TEMPLATE_DIR', 'templates'))
+# compiled templates are written here as Python modules, so each process and restart imports
+# them instead of parsing and compiling the template source again
+TEMPLATE_MODULE_DIR = Path(os.environ.get('TEMPLATE_MODULE_DIR', '.template-modules'))
+# stat the template file on every lookup and recompile it when it changed, turn off where
+# templates only change with a deploy
+TEMPLATE_CHECKS = os.environ.get('TEMPLATE_CHECKS', '1').lower() in {'1', 'true', 'yes', 'on'}
+# rendered templates kept per process by `render_cache`
+RENDER_CACHE_ENTRIES = int(os.environ.get('RENDER_CACHE_ENTRIES', '512'))
+# processes of `render_pool`, rendering the templates of `render_many()`
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', '0')) or os.cpu_count() or 1
+
+CHAPTER_TEMPLATE = 'epub/chapter.xhtml.mako'
+NAV_TEMPLATE = 'epub/nav.xhtml.mako'
+
+
+def template_lookup(directory: Path = TEMPLATE_DIR, module_directory: Path = TEMPLATE_MODULE_DIR,
+                    filesystem_checks: bool = TEMPLATE_CHECKS) -> TemplateLookup:
+    # HTML escaping by default like `MakoTemplateEngine` does, `| n` writes a value as is
+    return TemplateLookup(directories=[str(directory)], module_directory=str(module_directory),
+                          filesystem_checks=filesystem_checks, default_filters=['h'], input_encoding='utf-8')
+
+
+lookup = template_lookup()
+
+
+def template_engine() -> MakoTemplateEngine:
+    """Litestar's template engine over `lookup`, so `Template` responses use the compiled modules too."""
+    return MakoTemplateEngine.from_template_lookup(lookup)
+
+
+def compile_templates(directory: Path = TEMPLATE_DIR) -> int:
+    """Compile every template under `directory` into `TEMPLATE_MODULE_DIR`, returns how many there are.
+
+    Run on startup and at build time (`litestar epub compile-templates`); templates
+    whose module is current are only imported.
+    """
+    names = [path.relative_to(directory).as_posix() for path in sorted(directory.rglob('*')) if path.is_file()]
+    for name in names:
+        lookup.get_template(name)
+    return len(names)
+
+
+class RenderCache:
+    """Rendered templates by template name and a hash of the context, in LRU order.
+
+    The key also holds the modification time of the compiled template, so an
+    edited template is not served from old renders. Contexts that do not encode
+    as JSON are rendered every time.
+    """
+
+    def __init__(self, max_entries: int = RENDER_CACHE_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, str] = OrderedDict()
+
+    @staticmethod
+    def key(name: str, context: dict[str, Any]) -> Optional[str]:
+        try:
+            encoded = json.dumps(context, sort_keys=True, separators=(',', ':'), default=_encode)
+        except TypeError:
+            return None
+        modified = getattr(lookup.get_template(name).module, '_modified_time', 0)
+        digest = hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+        return f'{name}:{modified}:{digest}'
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        value = self._entries.get(key) if key is not None else None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Optional[str], value: str) -> None:
+        if key is None:
+            return
+        self._entries[key] = value
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, msgspec.Struct):
+        return msgspec.structs.asdict(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+render_cache = RenderCache()
+
+
+def render_uncached(name: str, context: dict[str, Any]) -> str:
+    """Render a template, module level so process pool workers can run it."""
+    return lookup.get_template(name).render(**context)
+
+
+def render(template_name: str, /, **context: Any) -> str:
+    """Render a template, or return the cached render of the same template and context."""
+    key = render_cache.key(template_name, context)
+    value = render_cache.get(key)
+    if value is None:
+        value = render_uncached(template_name, context)
+        render_cache.set(key, value)
+    return value
+
+
+# started by the first `render_many()` that needs it, shut down with the application
+render_pool = WorkerPool(RENDER_WORKERS)
+
+
+async def render_many(items: Sequence[tuple[str, dict[str, Any]]],
+                      executor: Optional[Executor] = None) -> list[str]:
+    """Render `(template name, context)` pairs, the ones not in `render_cache` in parallel in `executor`.
+
+    The renders come back in the order of `items`. `executor` defaults to
+    `render_pool`, whose workers import the compiled template modules instead of
+    compiling the templates; the pool is only started when something is missing.
+    """
+    loop = asyncio.get_running_loop()
+    keys = [render_cache.key(name, context) for name, context in items]
+    results: list[Optional[str]] = [render_cache.get(key) for key in keys]
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing and executor is None:
+        executor = render_pool.executor
+    rendered = await asyncio.gather(*(loop.run_in_executor(executor, render_uncached, *items[index])
+                                      for index in missing))
+    for index, value in zip(missing, rendered):
+        results[index] = value
+        render_cache.set(keys[index], value)
+    return results  # type: ignore[return-value]
+
+
+class Chapter(msgspec.Struct):
+    """One XHTML content document, `body` is the markup inside `<body>`."""
+    href: str
+    title: str
+    body: str
+    language: Optional[str] = None
+    stylesheets: list[str] = []
+
+
+class NavEntry(msgspec.Struct):
+    href: str
+    title: str
+
+
+async def render_chapters(chapters: Iterable[Chapter], executor: Optional[Executor] = None) -> list[str]:
+    """The XHTML documents of a book's chapters, rendered in parallel for an export."""
+    return await render_many([(CHAPTER_TEMPLATE, msgspec.structs.asdict(chapter)) for chapter in chapters],
+                             executor)
+
+
+def render_nav(title: str, entries: Iterable[NavEntry], language: Optional[str] = None) -> str:
+    """The EPUB 3 navigation document listing `entries` as the table of contents."""
+    return render(NAV_TEMPLATE, title=title, entries=list(entries), language=language)
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+# settings are read when the modules are imported, so they are set before anything imports `main`
+_DATA_DIR = Path(tempfile.mkdtemp(prefix='bookcreator-tests-'))
+_REPO_DIR = Path(__file__).resolve().parent.parent
+os.environ.update(
+    DATABASE_URL=f"sqlite+aiosqlite:///{_DATA_DIR / 'test.sqlite'}",
+    DB_MIGRATE_ON_STARTUP='1',
+    EPUB_BLOB_DIR=str(_DATA_DIR / 'blobs'),
+    EPUB_CONTENT_DIR=str(_DATA_DIR / 'content'),
+    JOB_RESULT_DIR=str(_DATA_DIR / 'job-results'),
+    TEMPLATE_DIR=str(_REPO_DIR / 'templates'),
+    TEMPLATE_MODULE_DIR=str(_DATA_DIR / 'template-modules'),
+)
+
+from litestar.testing import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from main import app  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def client() -> Iterator[TestClient]:
+    """The application on a migrated SQLite database shared by the whole run, tests make their own books."""
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def book_id(client: TestClient) -> int:
+    response = client.post('/books', json={'title': f'book {uuid.uuid4().hex[:8]}'})
+    assert response.status_code == 201, response.text
+    return response.json()['id']
+
+
+@pytest.fixture
+def tag_id(client: TestClient) -> int:
+    name = uuid.uuid4().hex[:8]
+    response = client.post('/meta-data-tag', json={'name': f'tag {name}', 'tag': f'dc:{name}'})
+    assert response.status_code == 201, response.text
+    return response.json()['id']
+
+
+@pytest.fixture
+def attribute_id(client: TestClient) -> int:
+    response = client.post('/attribute', json={'name': f'attribute-{uuid.uuid4().hex[:8]}'})
+    assert response.status_code == 201, response.text
+    return response.json()['id']
+
+
+def add_identifier(client: TestClient, book_id: int, identifier_id: str) -> None:
+    """Give the book the `<dc:identifier>` line an export needs."""
+    tag_id = client.post('/meta-data-tag', json={'name': 'identifier', 'tag': 'dc:identifier'}).json()['id']
+    attribute_id = client.post('/attribute', json={'name': 'id'}).json()['id']
+    response = client.post(f'/books/{book_id}/meta-data-line',
+                           json={'name': 'identifier', 'tag': {'tag_id': tag_id, 'value': 'urn:isbn:9780000000000'},
+                                 'attributes': [{'id': attribute_id, 'value': identifier_id}]})
+    assert response.status_code == 201, response.text
+
+
+@contextmanager
+def count_queries() -> Iterator[list[str]]:
+    """Collect the SQL every engine sends while the block runs."""
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, 'before_cursor_execute', before_cursor_execute)
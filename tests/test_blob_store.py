@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from litestar.testing import TestClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from blob_store import blob_store, collect_garbage
+from database import create_engine
+from model.blob import Blob
+
+CONTENT = bytes(range(256)) * 40
+
+
+def add_file(client: TestClient, book_id: int, content: bytes) -> tuple[int, str]:
+    """A manifest item with `content` as its file, returns its id and the file's SHA-256."""
+    item_id = uuid.uuid4().hex[:8]
+    response = client.post(f'/books/{book_id}/manifest',
+                           json={'item_id': item_id, 'href': f'{item_id}.bin',
+                                 'media_type': 'application/octet-stream'})
+    assert response.status_code == 201, response.text
+    item = response.json()['id']
+    response = client.put(f'/books/{book_id}/manifest/{item}/content', content=content)
+    assert response.status_code == 200, response.text
+    return item, response.json()['blob_sha256']
+
+
+@pytest.fixture
+def content_url(client: TestClient, book_id: int) -> str:
+    item, _ = add_file(client, book_id, CONTENT)
+    return f'/books/{book_id}/manifest/{item}/content'
+
+
+def test_range_is_answered_with_206(client: TestClient, content_url: str) -> None:
+    response = client.get(content_url, headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.headers['content-range'] == f'bytes 10-19/{len(CONTENT)}'
+    assert response.content == CONTENT[10:20]
+
+
+@pytest.mark.parametrize('header, start', [('bytes=-5', len(CONTENT) - 5), ('bytes=-99999', 0)])
+def test_suffix_range_is_the_end_of_the_file(client: TestClient, content_url: str, header: str, start: int) -> None:
+    response = client.get(content_url, headers={'Range': header})
+    assert response.status_code == 206
+    assert response.headers['content-range'] == f'bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}'
+    assert response.content == CONTENT[start:]
+
+
+def test_range_past_the_end_is_not_satisfiable(client: TestClient, content_url: str) -> None:
+    response = client.get(content_url, headers={'Range': f'bytes={len(CONTENT)}-'})
+    assert response.status_code == 416
+    assert response.headers['content-range'] == f'bytes */{len(CONTENT)}'
+
+
+def test_if_range_with_another_etag_gets_the_whole_file(client: TestClient, content_url: str) -> None:
+    etag = client.get(content_url).headers['etag']
+
+    response = client.get(content_url, headers={'Range': 'bytes=10-19', 'If-Range': '"something else"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert 'content-range' not in response.headers
+    response = client.get(content_url, headers={'Range': 'bytes=10-19', 'If-Range': etag})
+    assert response.status_code == 206
+
+
+def test_head_sends_the_headers_only(client: TestClient, content_url: str) -> None:
+    response = client.head(content_url)
+    assert response.status_code == 200
+    assert response.content == b''
+    assert response.headers['content-length'] == str(len(CONTENT))
+    assert response.headers['content-type'] == 'application/octet-stream'
+    assert response.headers['etag'] == client.get(content_url).headers['etag']
+
+
+def test_same_content_of_two_books_is_stored_once(client: TestClient) -> None:
+    content = uuid.uuid4().bytes * 100
+    books = [client.post('/books', json={'title': title}).json()['id'] for title in ('first', 'second')]
+    (_, first), (_, second) = (add_file(client, book_id, content) for book_id in books)
+    assert first == second
+    path = blob_store.path(first)
+    assert path.read_bytes() == content
+    assert list(path.parent.glob(f'{path.name}*')) == [path]
+
+
+def test_garbage_collection_removes_orphans_after_the_grace_period(client: TestClient, book_id: int) -> None:
+    content = uuid.uuid4().bytes * 10
+    kept_item, kept = add_file(client, book_id, content)
+    orphan_item, orphan = add_file(client, book_id, uuid.uuid4().bytes * 10)
+    assert client.delete(f'/books/{book_id}/manifest/{orphan_item}').status_code == 204
+    long_ago = time.time() - 86400
+
+    async def collect(grace: int, age: bool = False) -> int:
+        engine = create_engine(os.environ['DATABASE_URL'])
+        try:
+            async with AsyncSession(engine) as session:
+                if age:
+                    await session.execute(update(Blob).where(Blob.sha256.in_([kept, orphan]))
+                                          .values(updated_at=datetime.fromtimestamp(long_ago, timezone.utc)))
+                    await session.commit()
+                return await collect_garbage(session, grace=grace)
+        finally:
+            await engine.dispose()
+
+    # unused for less than the grace period, an upload may be about to refer to it again
+    asyncio.run(collect(grace=3600))
+    assert blob_store.path(orphan).is_file()
+
+    for sha256 in (kept, orphan):
+        os.utime(blob_store.path(sha256), (long_ago, long_ago))
+    assert asyncio.run(collect(grace=3600, age=True)) >= 1
+    assert not blob_store.path(orphan).exists()
+    assert blob_store.path(kept).is_file()
+    assert client.get(f'/books/{book_id}/manifest/{kept_item}/content').content == content
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+
+from litestar.testing import TestClient
+
+MISSING_BOOK = 999_999
+
+SCOPED_TABLES = ('meta_data_line', 'meta_data_tag_value', 'meta_data_attribute_value', 'manifest_item',
+                 'spine_item_ref')
+
+
+def test_line_of_a_missing_book_is_rejected(client: TestClient, tag_id: int, attribute_id: int) -> None:
+    line = {'name': 'title', 'tag': {'tag_id': tag_id, 'value': 'Title'},
+            'attributes': [{'id': attribute_id, 'value': 'x'}]}
+    response = client.post(f'/books/{MISSING_BOOK}/meta-data-line', json=line)
+    assert response.status_code == 404, response.text
+    response = client.post(f'/books/{MISSING_BOOK}/meta-data-line/bulk', json=[line, line])
+    assert response.status_code == 404, response.text
+    assert client.get(f'/books/{MISSING_BOOK}/meta-data-line').json()['items'] == []
+    assert client.get(f'/books/{MISSING_BOOK}/meta-data-line/search', params={'q': 'Title'}).json()['items'] == []
+
+
+def test_lines_are_only_visible_in_their_own_book(client: TestClient, book_id: int, tag_id: int) -> None:
+    response = client.post(f'/books/{book_id}/meta-data-line',
+                           json={'name': 'title', 'tag': {'tag_id': tag_id, 'value': 'Title'}})
+    assert response.status_code == 201, response.text
+    line_id = response.json()['id']
+    other_book = client.post('/books', json={'title': 'other'}).json()['id']
+    assert client.get(f'/books/{other_book}/meta-data-line/details/{line_id}').status_code == 404
+    assert client.delete(f'/books/{other_book}/meta-data-line/{line_id}').status_code == 404
+    assert client.get(f'/books/{book_id}/meta-data-line/details/{line_id}').status_code == 200
+
+
+def test_deleting_a_book_deletes_everything_scoped_to_it(client: TestClient, book_id: int, tag_id: int,
+                                                         attribute_id: int) -> None:
+    response = client.post(f'/books/{book_id}/meta-data-line',
+                           json={'name': 'title', 'tag': {'tag_id': tag_id, 'value': 'Title'},
+                                 'attributes': [{'id': attribute_id, 'value': 'x'}]})
+    assert response.status_code == 201, response.text
+    response = client.post(f'/books/{book_id}/manifest',
+                           json={'item_id': 'chapter', 'href': 'chapter.xhtml', 'media_type': 'application/xhtml+xml'})
+    assert response.status_code == 201, response.text
+    assert client.post(f'/books/{book_id}/spine', json={'idref': 'chapter'}).status_code == 201
+
+    assert client.delete(f'/books/{book_id}').status_code == 204
+    database = os.environ['DATABASE_URL'].split(':///', 1)[1]
+    with sqlite3.connect(database) as connection:
+        for table in SCOPED_TABLES:
+            count, = connection.execute(f'SELECT count(*) FROM {table} WHERE book_id = ?', (book_id,)).fetchone()
+            assert count == 0, table
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import uuid
+
+from litestar.testing import TestClient
+
+
+def unique(prefix: str) -> str:
+    return f'{prefix}{uuid.uuid4().hex[:8]}'
+
+
+def test_bulk_create_tags_reports_refused_entries_by_index(client: TestClient) -> None:
+    data = [{'name': unique('tag '), 'tag': unique('dc:')},
+            {'name': 'x' * 200, 'tag': unique('dc:')},
+            {'name': unique('tag '), 'tag': unique('dc:')}]
+    response = client.post('/meta-data-tag/bulk', json=data)
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert [item['name'] for item in body['items']] == [data[0]['name'], data[2]['name']]
+    assert [(error['index'], error['detail']) for error in body['errors']] == [
+        (1, 'name is longer than 30 characters')]
+
+
+def test_bulk_create_attributes_reports_refused_entries_by_index(client: TestClient) -> None:
+    data = [{'name': 'x' * 200}, {'name': unique('attribute-')}]
+    response = client.post('/attribute/bulk', json=data)
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert [item['name'] for item in body['items']] == [data[1]['name']]
+    assert [error['index'] for error in body['errors']] == [0]
+
+
+def test_bulk_update_tags_reports_refused_entries_by_index(client: TestClient, tag_id: int) -> None:
+    response = client.put('/meta-data-tag/bulk', json=[{'id': tag_id, 'name': 'x' * 200, 'tag': 'dc:x'},
+                                                       {'id': -1, 'name': 'missing', 'tag': 'dc:x'}])
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body['items'] == []
+    assert [(error['index'], error['detail']) for error in body['errors']] == [
+        (0, 'name is longer than 30 characters'), (1, 'not found')]
+
+
+def test_bulk_create_lines_reports_refused_entries_by_index(client: TestClient, book_id: int, tag_id: int) -> None:
+    data = [{'name': 'x' * 200, 'tag': {'tag_id': tag_id, 'value': 'a'}},
+            {'name': 'unknown tag', 'tag': {'tag_id': -1, 'value': 'b'}},
+            {'name': 'saved', 'tag': {'tag_id': tag_id, 'value': 'c'}}]
+    response = client.post(f'/books/{book_id}/meta-data-line/bulk', json=data)
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert [item['name'] for item in body['items']] == ['saved']
+    assert [(error['index'], error['detail']) for error in body['errors']] == [
+        (0, 'name is longer than 30 characters'), (1, 'tag not found')]
+
+
+def test_bulk_delete_tags_skips_the_ones_in_use(client: TestClient, book_id: int, tag_id: int) -> None:
+    response = client.post(f'/books/{book_id}/meta-data-line', json={'name': 'used', 'tag': {'tag_id': tag_id, 'value': 'v'}})
+    assert response.status_code == 201, response.text
+    unused = client.post('/meta-data-tag', json={'name': unique('tag '), 'tag': unique('dc:')}).json()['id']
+    response = client.delete('/meta-data-tag/bulk', params={'id': [tag_id, -1, unused]})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert [item['id'] for item in body['items']] == [unused]
+    assert [(error['index'], error['id'], error['detail']) for error in body['errors']] == [
+        (0, tag_id, 'still in use'), (1, -1, 'not found')]
+    assert client.get(f'/meta-data-tag/details/{tag_id}').status_code == 200
+
+
+def test_bulk_delete_attributes_skips_the_ones_in_use(client: TestClient, book_id: int, tag_id: int,
+                                                     attribute_id: int) -> None:
+    response = client.post(f'/books/{book_id}/meta-data-line',
+                           json={'name': 'used', 'tag': {'tag_id': tag_id, 'value': 'v'},
+                                 'attributes': [{'id': attribute_id, 'value': 'a'}]})
+    assert response.status_code == 201, response.text
+    unused = client.post('/attribute', json={'name': unique('attribute-')}).json()['id']
+    response = client.delete('/attribute/bulk', params={'id': [unused, attribute_id]})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert [item['id'] for item in body['items']] == [unused]
+    assert [(error['index'], error['detail']) for error in body['errors']] == [(1, 'still in use')]
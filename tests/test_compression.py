@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import os
+import uuid
+
+from litestar import get
+from litestar.response import Response
+from litestar.testing import TestClient, create_test_client
+
+from compression import compression_middleware_from_env
+
+# incompressible and above `COMPRESSION_MINIMUM_SIZE`
+PNG_BODY = b'\x89PNG\r\n\x1a\n' + os.urandom(8192)
+
+
+@get('/image', sync_to_thread=False)
+def image() -> Response[bytes]:
+    return Response(PNG_BODY, media_type='image/png')
+
+
+@get('/epub', sync_to_thread=False)
+def epub() -> Response[bytes]:
+    return Response(PNG_BODY, media_type='application/epub+zip')
+
+
+@get('/text', sync_to_thread=False)
+def text() -> Response[str]:
+    return Response('compressible ' * 1000, media_type='text/plain')
+
+
+def test_binary_responses_are_not_compressed() -> None:
+    with create_test_client([image, epub, text], middleware=[compression_middleware_from_env()]) as client:
+        for path in ('/image', '/epub'):
+            response = client.get(path, headers={'Accept-Encoding': 'gzip'})
+            assert response.status_code == 200
+            assert 'content-encoding' not in response.headers
+            assert response.content == PNG_BODY
+        response = client.get('/text', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['content-encoding'] == 'gzip'
+
+
+def test_application_compresses_json_but_not_blobs(client: TestClient, book_id: int) -> None:
+    response = client.post('/meta-data-tag/bulk', json=[{'name': f'tag {i}', 'tag': f'dc:{uuid.uuid4().hex[:8]}'}
+                                                        for i in range(40)])
+    assert response.status_code == 201, response.text
+    response = client.get('/meta-data-tag', params={'pageSize': 40}, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip'
+
+    item = client.post(f'/books/{book_id}/manifest',
+                       json={'item_id': 'image', 'href': 'image.png', 'media_type': 'image/png'}).json()['id']
+    assert client.put(f'/books/{book_id}/manifest/{item}/content', content=PNG_BODY).status_code == 200
+    response = client.get(f'/books/{book_id}/manifest/{item}/content', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert 'content-encoding' not in response.headers
+    assert response.content == PNG_BODY
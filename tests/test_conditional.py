@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from litestar.testing import TestClient
+
+
+def add_line(client: TestClient, book_id: int, tag_id: int, value: str) -> int:
+    response = client.post(f'/books/{book_id}/meta-data-line',
+                           json={'name': value, 'tag': {'tag_id': tag_id, 'value': value}})
+    assert response.status_code == 201, response.text
+    return response.json()['id']
+
+
+def test_list_after_a_delete_is_not_modified_since_nothing(client: TestClient, book_id: int, tag_id: int) -> None:
+    first = add_line(client, book_id, tag_id, 'first')
+    add_line(client, book_id, tag_id, 'second')
+    response = client.get(f'/books/{book_id}/meta-data-line')
+    assert len(response.json()['items']) == 2
+    # a delete leaves no newer `updated_at`, a collection is validated by its ETag alone
+    assert 'last-modified' not in response.headers
+    etag = response.headers['etag']
+
+    assert client.delete(f'/books/{book_id}/meta-data-line/{first}').status_code == 204
+    since = format_datetime(datetime.now(timezone.utc), usegmt=True)
+    response = client.get(f'/books/{book_id}/meta-data-line', headers={'If-Modified-Since': since})
+    assert response.status_code == 200
+    assert len(response.json()['items']) == 1
+    response = client.get(f'/books/{book_id}/meta-data-line', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+
+
+def test_single_row_is_validated_by_its_date(client: TestClient, tag_id: int) -> None:
+    response = client.get(f'/meta-data-tag/details/{tag_id}')
+    last_modified = response.headers['last-modified']
+    response = client.get(f'/meta-data-tag/details/{tag_id}', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+    assert response.content == b''
+
+
+def test_write_from_another_worker_is_not_served_under_the_new_etag(client: TestClient, tag_id: int) -> None:
+    response = client.get(f'/meta-data-tag/details/{tag_id}')
+    etag = response.headers['etag']
+    name = response.json()['name']
+
+    # another worker writes the row, this worker's cache is never invalidated
+    database = os.environ['DATABASE_URL'].split(':///', 1)[1]
+    with sqlite3.connect(database) as connection:
+        (updated_at,) = connection.execute('SELECT updated_at FROM meta_data_tag WHERE tag_id = ?',
+                                           (tag_id,)).fetchone()
+        connection.execute('UPDATE meta_data_tag SET name = ?, updated_at = ? WHERE tag_id = ?',
+                           (f'{name} renamed', updated_at.replace(updated_at[:4], '2999', 1), tag_id))
+
+    response = client.get(f'/meta-data-tag/details/{tag_id}')
+    assert response.headers['etag'] != etag
+    assert response.json()['name'] == f'{name} renamed'
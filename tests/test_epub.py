@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import io
+import zipfile
+
+from litestar.testing import TestClient
+
+from conftest import add_identifier
+
+
+def test_package_names_the_books_identifier(client: TestClient, book_id: int) -> None:
+    add_identifier(client, book_id, 'pub-id')
+    response = client.get(f'/books/{book_id}/epub')
+    assert response.status_code == 200, response.text
+    opf = zipfile.ZipFile(io.BytesIO(response.content)).read('OEBPS/content.opf').decode()
+    assert 'unique-identifier="pub-id"' in opf
+    assert '<dc:identifier id="pub-id">urn:isbn:9780000000000</dc:identifier>' in opf
+
+
+def test_book_without_an_identifier_is_not_exported(client: TestClient, book_id: int) -> None:
+    response = client.get(f'/books/{book_id}/epub')
+    assert response.status_code == 404
+    assert 'dc:identifier' in response.json()['detail']
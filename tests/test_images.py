@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import io
+from pathlib import Path
+
+import pytest
+from litestar.testing import TestClient
+from PIL import Image
+from prometheus_client import REGISTRY
+
+from images import ImageDerivatives, ImageSpec
+from metrics import METRICS_PREFIX
+from opf_import import WorkerPool
+
+
+def png(width: int = 64, height: int = 48) -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'teal').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def derivatives(outcome: str) -> float:
+    return REGISTRY.get_sample_value(f'{METRICS_PREFIX}_image_derivatives_total', {'outcome': outcome}) or 0
+
+
+def add_image(client: TestClient, book_id: int, content: bytes) -> int:
+    response = client.post(f'/books/{book_id}/manifest',
+                           json={'item_id': 'picture', 'href': 'images/picture.png', 'media_type': 'image/png'})
+    assert response.status_code == 201, response.text
+    item = response.json()['id']
+    response = client.put(f'/books/{book_id}/manifest/{item}/content', content=content)
+    assert response.status_code == 200, response.text
+    return item
+
+
+def test_derivative_is_generated_on_the_first_request_and_cached_for_the_next(client: TestClient,
+                                                                               book_id: int) -> None:
+    item = add_image(client, book_id, png())
+    generated, cached = derivatives('generated'), derivatives('cached')
+
+    response = client.get(f'/books/{book_id}/images/{item}', params={'width': 16})
+    assert response.status_code == 200, response.text
+    assert response.headers['content-type'] == 'image/png'
+    assert Image.open(io.BytesIO(response.content)).size == (16, 12)
+    assert (derivatives('generated'), derivatives('cached')) == (generated + 1, cached)
+
+    again = client.get(f'/books/{book_id}/images/{item}', params={'width': 16})
+    assert again.content == response.content
+    assert (derivatives('generated'), derivatives('cached')) == (generated + 1, cached + 1)
+
+
+@pytest.mark.parametrize('content', [b'not an image at all', png()[:60]], ids=['garbage', 'truncated'])
+def test_undecodable_image_is_unprocessable(client: TestClient, book_id: int, content: bytes) -> None:
+    item = add_image(client, book_id, content)
+
+    response = client.get(f'/books/{book_id}/images/{item}', params={'width': 16})
+    assert response.status_code == 422
+    assert response.json()['detail'].startswith('images/picture.png: the image cannot be decoded')
+
+
+def test_concurrent_requests_share_one_generation(tmp_path: Path) -> None:
+    source = tmp_path / 'source.png'
+    source.write_bytes(png())
+    pool = WorkerPool(1)
+    image_derivatives = ImageDerivatives(root=tmp_path / 'derivatives', pool=pool)
+    spec = ImageSpec(width=8, format='png')
+    generated, joined = derivatives('generated'), derivatives('joined')
+
+    async def request_all() -> list[Path]:
+        return await asyncio.gather(*(image_derivatives.get(source, 'ab' * 32, spec) for _ in range(5)))
+
+    try:
+        paths = asyncio.run(request_all())
+    finally:
+        pool.on_shutdown()
+    assert set(paths) == {image_derivatives.path('ab' * 32, spec)}
+    assert paths[0].is_file()
+    assert (derivatives('generated'), derivatives('joined')) == (generated + 1, joined + 4)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import io
+import time
+import zipfile
+
+from litestar.testing import TestClient
+
+from conftest import add_identifier
+
+
+def wait_for(client: TestClient, job_id: int, timeout: float = 10) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f'/jobs/{job_id}').json()
+        if job['finished_at'] is not None or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_export_job_result_is_downloaded_uncompressed(client: TestClient, book_id: int) -> None:
+    add_identifier(client, book_id, 'pub-id')
+    item = client.post(f'/books/{book_id}/manifest', json={'item_id': 'chapter', 'href': 'chapter.xhtml',
+                                                           'media_type': 'application/xhtml+xml'}).json()['id']
+    chapter = b'<html><body>' + b'<p>text</p>' * 2000 + b'</body></html>'
+    assert client.put(f'/books/{book_id}/manifest/{item}/content', content=chapter).status_code == 200
+
+    response = client.post(f'/books/{book_id}/epub/job')
+    assert response.status_code == 202, response.text
+    job = wait_for(client, response.json()['id'])
+    assert job['status'] == 'succeeded', job
+
+    response = client.get(f"/jobs/{job['id']}/result", headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert 'content-encoding' not in response.headers
+    assert zipfile.ZipFile(io.BytesIO(response.content)).read('OEBPS/chapter.xhtml') == chapter
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from litestar.testing import TestClient
+
+from conftest import count_queries
+
+# conditional GET validator, the page of lines with their tags joined, the attribute values of the page
+GRAPH_PAGE_QUERIES = 3
+
+
+def add_lines(client: TestClient, book_id: int, tag_id: int, attribute_id: int, count: int) -> None:
+    lines = [{'name': f'line {i:03}', 'tag': {'tag_id': tag_id, 'value': f'value {i}'},
+              'attributes': [{'id': attribute_id, 'value': f'attribute {i}'}]} for i in range(count)]
+    response = client.post(f'/books/{book_id}/meta-data-line/bulk', json=lines)
+    assert response.status_code == 201, response.text
+    assert response.json()['errors'] == []
+
+
+def graph_page_queries(client: TestClient, book_id: int, limit: int) -> int:
+    with count_queries() as statements:
+        response = client.get(f'/books/{book_id}/meta-data-line/graph', params={'pageSize': limit})
+    assert response.status_code == 200, response.text
+    items = response.json()['items']
+    assert len(items) == limit
+    assert all(item['tag']['meta_data_tag'] and item['attributes'][0]['attribute'] for item in items)
+    return len(statements)
+
+
+def test_graph_page_costs_the_same_queries_whatever_its_size(client: TestClient, book_id: int, tag_id: int,
+                                                             attribute_id: int) -> None:
+    add_lines(client, book_id, tag_id, attribute_id, 40)
+    small, large = graph_page_queries(client, book_id, 5), graph_page_queries(client, book_id, 40)
+    assert small == large
+    assert large <= GRAPH_PAGE_QUERIES
+
+
+def test_graph_details_loads_the_line_in_a_constant_number_of_queries(client: TestClient, book_id: int,
+                                                                      tag_id: int, attribute_id: int) -> None:
+    add_lines(client, book_id, tag_id, attribute_id, 1)
+    line_id = client.get(f'/books/{book_id}/meta-data-line').json()['items'][0]['id']
+    with count_queries() as statements:
+        response = client.get(f'/books/{book_id}/meta-data-line/graph/details/{line_id}')
+    assert response.status_code == 200, response.text
+    assert response.json()['attributes'][0]['attribute_value'] == 'attribute 0'
+    assert len(statements) <= GRAPH_PAGE_QUERIES
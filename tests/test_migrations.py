@@ -0,0 +1,118 @@
+"""A database `create_all()` made before there were migrations is upgraded to the head revision with its rows."""
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from alembic import command
+from sqlalchemy import Connection, inspect, text
+
+from database import create_engine
+from migration import SchemaOutOfDate, alembic_config, check_revision, current_revisions, head_revisions
+
+# the tables as the baseline code's `Base.metadata.create_all()` made them on SQLite
+BASELINE_SCHEMA = [
+    '''CREATE TABLE meta_data_attribute (
+        meta_data_attribute_id INTEGER NOT NULL, sort_order INTEGER NOT NULL,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL,
+        name VARCHAR(30) NOT NULL, place_holder VARCHAR(100), tool_tip VARCHAR(100), description VARCHAR,
+        PRIMARY KEY (meta_data_attribute_id))''',
+    '''CREATE TABLE meta_data_line (
+        line_id INTEGER NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL,
+        name VARCHAR(30) NOT NULL,
+        PRIMARY KEY (line_id))''',
+    '''CREATE TABLE meta_data_tag (
+        tag_id INTEGER NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL,
+        sort_order INTEGER NOT NULL, name VARCHAR(30) NOT NULL, tag VARCHAR(30) NOT NULL,
+        place_holder VARCHAR(100), tool_tip VARCHAR(100), description VARCHAR,
+        PRIMARY KEY (tag_id))''',
+    '''CREATE TABLE meta_data_attribute_value (
+        meta_data_attribute_value_id INTEGER NOT NULL, line_id INTEGER NOT NULL, attribute_id INTEGER NOT NULL,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, attribute_value VARCHAR,
+        PRIMARY KEY (meta_data_attribute_value_id),
+        FOREIGN KEY(line_id) REFERENCES meta_data_line (line_id),
+        FOREIGN KEY(attribute_id) REFERENCES meta_data_attribute (meta_data_attribute_id))''',
+    '''CREATE TABLE meta_data_tag_value (
+        meta_data_value_id INTEGER NOT NULL, line_id INTEGER NOT NULL, tag_id INTEGER NOT NULL,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, is_empty_tag BOOLEAN, value VARCHAR,
+        PRIMARY KEY (meta_data_value_id),
+        FOREIGN KEY(line_id) REFERENCES meta_data_line (line_id),
+        FOREIGN KEY(tag_id) REFERENCES meta_data_tag (tag_id))''',
+]
+BASELINE_ROWS = [
+    "INSERT INTO meta_data_tag VALUES (1, '2024-01-01 00:00:00', '2024-01-01 00:00:00', 0, 'creator', "
+    "'dc:creator', NULL, NULL, NULL)",
+    "INSERT INTO meta_data_attribute VALUES (1, 0, '2024-01-01 00:00:00', '2024-01-01 00:00:00', 'id', "
+    "NULL, NULL, NULL)",
+    "INSERT INTO meta_data_line VALUES (1, '2024-01-01 00:00:00', '2024-01-01 00:00:00', 'creator')",
+    "INSERT INTO meta_data_tag_value VALUES (1, 1, 1, '2024-01-01 00:00:00', '2024-01-01 00:00:00', 0, "
+    "'Mary Shelley')",
+    "INSERT INTO meta_data_attribute_value VALUES (1, 1, 1, '2024-01-01 00:00:00', '2024-01-01 00:00:00', "
+    "'author')",
+]
+
+
+def create_baseline(connection: Connection) -> None:
+    for statement in BASELINE_SCHEMA + BASELINE_ROWS:
+        connection.exec_driver_sql(statement)
+
+
+def url(tmp_path: Path) -> str:
+    return f"sqlite+aiosqlite:///{tmp_path / 'baseline.sqlite'}"
+
+
+async def upgrade_baseline(database_url: str, migrate: bool) -> dict[str, object]:
+    engine = create_engine(database_url)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(create_baseline)
+        await check_revision(engine, migrate=migrate)
+        async with engine.connect() as conn:
+            return {
+                'revisions': await conn.run_sync(current_revisions),
+                'books': (await conn.execute(text('SELECT book_id, title FROM book'))).all(),
+                'lines': (await conn.execute(text('SELECT book_id, tag_sort_order, rendered_xml '
+                                                  'FROM meta_data_line'))).all(),
+                'value_books': (await conn.execute(text('SELECT book_id FROM meta_data_tag_value UNION ALL '
+                                                        'SELECT book_id FROM meta_data_attribute_value'))).all(),
+                'found': (await conn.execute(text("SELECT rowid FROM meta_data_tag_value_fts "
+                                                  "WHERE meta_data_tag_value_fts MATCH '\"Shelley\"'"))).all(),
+                'violations': (await conn.execute(text('PRAGMA foreign_key_check'))).all(),
+            }
+    finally:
+        await engine.dispose()
+
+
+def test_baseline_database_is_upgraded_with_its_rows(tmp_path: Path) -> None:
+    result = asyncio.run(upgrade_baseline(url(tmp_path), migrate=True))
+    assert result['revisions'] == head_revisions()
+    [(book_id, title)] = result['books']
+    assert title == 'Untitled'
+    assert result['lines'] == [(book_id, 0, '<dc:creator id="author">Mary Shelley</dc:creator>')]
+    assert result['value_books'] == [(book_id,), (book_id,)]
+    assert result['found'] == [(1,)]
+    assert result['violations'] == []
+
+
+def test_baseline_database_without_migrate_asks_for_a_stamp(tmp_path: Path) -> None:
+    with pytest.raises(SchemaOutOfDate, match='stamp 0001'):
+        asyncio.run(upgrade_baseline(url(tmp_path), migrate=False))
+
+
+async def downgrade_to_baseline(database_url: str) -> list[str]:
+    engine = create_engine(database_url)
+    try:
+        await check_revision(engine, migrate=True)
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync: command.downgrade(alembic_config(sync), '0001'))
+        async with engine.connect() as conn:
+            return await conn.run_sync(lambda sync: sorted(inspect(sync).get_table_names()))
+    finally:
+        await engine.dispose()
+
+
+def test_downgrade_returns_to_the_baseline_tables(tmp_path: Path) -> None:
+    assert asyncio.run(downgrade_to_baseline(url(tmp_path))) == [
+        'alembic_versions', 'meta_data_attribute', 'meta_data_attribute_value', 'meta_data_line',
+        'meta_data_tag', 'meta_data_tag_value']
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from typing import Any
+
+import pytest
+from litestar.testing import TestClient
+
+
+@dataclass
+class Searchable:
+    """Writes rows through the API and searches them, the same way for tags, attributes and lines."""
+    client: TestClient
+    kind: str
+    book_id: int
+    tag_id: int
+
+    @property
+    def path(self) -> str:
+        if self.kind == 'tag':
+            return '/meta-data-tag'
+        if self.kind == 'attribute':
+            return '/attribute'
+        return f'/books/{self.book_id}/meta-data-line'
+
+    def body(self, text: str) -> dict[str, Any]:
+        if self.kind == 'tag':
+            # the tag column is searched as well, it must not match by accident
+            return {'name': text, 'tag': f'x:{uuid.uuid4().hex[:12]}'}
+        if self.kind == 'attribute':
+            return {'name': text}
+        return {'name': uuid.uuid4().hex[:12], 'tag': {'tag_id': self.tag_id, 'value': text}}
+
+    def add(self, text: str) -> int:
+        response = self.client.post(self.path, json=self.body(text))
+        assert response.status_code == 201, response.text
+        return response.json()['id']
+
+    def update(self, item_id: int, text: str) -> None:
+        response = self.client.put(f'{self.path}/{item_id}', json=self.body(text))
+        assert response.status_code == 200, response.text
+
+    def delete(self, item_id: int) -> None:
+        assert self.client.delete(f'{self.path}/{item_id}').status_code == 204
+
+    def search(self, query: str, **params: Any) -> dict[str, Any]:
+        response = self.client.get(f'{self.path}/search', params={'q': query, **params})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    def ids(self, query: str) -> list[int]:
+        return [item['id'] for item in self.search(query, pageSize=1000)['items']]
+
+
+@pytest.fixture(params=['tag', 'attribute', 'line'])
+def searchable(request: pytest.FixtureRequest, client: TestClient, book_id: int, tag_id: int) -> Searchable:
+    return Searchable(client, request.param, book_id, tag_id)
+
+
+def token() -> str:
+    """Text no other test writes, so a search finds only this test's rows."""
+    return uuid.uuid4().hex[:10]
+
+
+def test_closer_matches_rank_first(searchable: Searchable) -> None:
+    text = token()
+    loose = searchable.add(f'{text} and more words')
+    exact = searchable.add(text)
+    assert searchable.ids(text) == [exact, loose]
+
+
+def test_pages_continue_from_the_cursor(searchable: Searchable) -> None:
+    text = token()
+    added = {searchable.add(f'{text} {n}') for n in range(5)}
+
+    first = searchable.search(text, pageSize=2, count='exact')
+    assert first['total'] == 5
+    seen = [item['id'] for item in first['items']]
+    cursor = first['next_cursor']
+    while cursor:
+        page = searchable.search(text, pageSize=2, cursor=cursor)
+        assert len(page['items']) <= 2
+        seen += [item['id'] for item in page['items']]
+        cursor = page['next_cursor']
+    assert len(seen) == 5
+    assert set(seen) == added
+
+
+def test_query_shorter_than_a_trigram_falls_back_to_like(searchable: Searchable) -> None:
+    text = token()
+    item_id = searchable.add(f'{text}-{text[:2]}')
+    # two characters the trigram index cannot match, and a `%` that must not act as a wildcard
+    assert item_id in searchable.ids(text[:2])
+    assert item_id not in searchable.ids('%' + text[2])
+
+
+@pytest.mark.parametrize('syntax', ['"', 'OR', '*', '(', 'NEAR(', ':'])
+def test_fts_syntax_in_the_query_is_searched_for_literally(searchable: Searchable, syntax: str) -> None:
+    text = token()
+    item_id = searchable.add(f'{text} {syntax} end')
+    other = searchable.add(f'{text} end')
+    found = searchable.ids(f'{text} {syntax}')
+    assert item_id in found
+    assert other not in found
+
+
+def test_index_follows_updates_and_deletes(searchable: Searchable) -> None:
+    before, after = token(), token()
+    item_id = searchable.add(before)
+    assert searchable.ids(before) == [item_id]
+
+    searchable.update(item_id, after)
+    assert searchable.ids(before) == []
+    assert searchable.ids(after) == [item_id]
+
+    searchable.delete(item_id)
+    assert searchable.ids(after) == []
+
+
+def test_line_is_found_by_its_attribute_values(client: TestClient, book_id: int, tag_id: int,
+                                                attribute_id: int) -> None:
+    text = token()
+    response = client.post(f'/books/{book_id}/meta-data-line',
+                           json={'name': 'creator', 'tag': {'tag_id': tag_id, 'value': 'Mary Shelley'},
+                                 'attributes': [{'id': attribute_id, 'value': text}]})
+    assert response.status_code == 201, response.text
+    line_id = response.json()['id']
+    searchable = Searchable(client, 'line', book_id, tag_id)
+    assert searchable.ids(text) == [line_id]
+
+    response = client.patch(f'/books/{book_id}/meta-data-line/{line_id}',
+                            json={'name': 'creator', 'tag': {'tag_id': tag_id, 'value': 'Mary Shelley'},
+                                  'attributes': []})
+    assert response.status_code == 200, response.text
+    assert searchable.ids(text) == []
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from litestar.testing import TestClient
+
+
+def add_item(client: TestClient, book_id: int, item_id: str) -> int:
+    response = client.post(f'/books/{book_id}/manifest',
+                           json={'item_id': item_id, 'href': f'{item_id}.xhtml', 'media_type': 'application/xhtml+xml'})
+    assert response.status_code == 201, response.text
+    return response.json()['id']
+
+
+def add_itemref(client: TestClient, book_id: int, idref: str) -> int:
+    response = client.post(f'/books/{book_id}/spine', json={'idref': idref})
+    assert response.status_code == 201, response.text
+    return response.json()['id']
+
+
+def test_itemref_to_an_unknown_manifest_item_is_rejected(client: TestClient, book_id: int) -> None:
+    response = client.post(f'/books/{book_id}/spine', json={'idref': 'nope'})
+    assert response.status_code == 409, response.text
+    assert client.get(f'/books/{book_id}/spine').json()['items'] == []
+
+
+def test_itemref_to_a_manifest_item_of_another_book_is_rejected(client: TestClient, book_id: int) -> None:
+    other_book = client.post('/books', json={'title': 'other'}).json()['id']
+    add_item(client, other_book, 'chapter')
+    response = client.post(f'/books/{book_id}/spine', json={'idref': 'chapter'})
+    assert response.status_code == 409, response.text
+
+
+def test_manifest_item_in_the_spine_cannot_be_deleted(client: TestClient, book_id: int) -> None:
+    item = add_item(client, book_id, 'chapter')
+    add_itemref(client, book_id, 'chapter')
+    response = client.delete(f'/books/{book_id}/manifest/{item}')
+    assert response.status_code == 409, response.text
+    assert client.get(f'/books/{book_id}/manifest/details/{item}').status_code == 200
+
+
+def test_manifest_item_in_the_spine_cannot_be_renamed(client: TestClient, book_id: int) -> None:
+    item = add_item(client, book_id, 'chapter')
+    add_itemref(client, book_id, 'chapter')
+    response = client.put(f'/books/{book_id}/manifest/{item}',
+                          json={'item_id': 'renamed', 'href': 'chapter.xhtml', 'media_type': 'application/xhtml+xml'})
+    assert response.status_code == 409, response.text
+    assert client.get(f'/books/{book_id}/manifest/details/{item}').json()['item_id'] == 'chapter'
+
+
+def test_manifest_item_can_be_deleted_once_out_of_the_spine(client: TestClient, book_id: int) -> None:
+    item = add_item(client, book_id, 'chapter')
+    itemref = add_itemref(client, book_id, 'chapter')
+    assert client.delete(f'/books/{book_id}/spine/item/{itemref}').status_code == 204
+    assert client.delete(f'/books/{book_id}/manifest/{item}').status_code == 204
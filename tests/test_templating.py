@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+
+from litestar.testing import TestClient
+
+from templating import (TEMPLATE_DIR, TEMPLATE_MODULE_DIR, Chapter, NavEntry, compile_templates, render_cache,
+                        render_chapters, render_nav, render_pool)
+
+
+def test_compile_templates_writes_a_module_per_template() -> None:
+    templates = [path for path in TEMPLATE_DIR.rglob('*') if path.is_file()]
+    assert compile_templates() == len(templates)
+    for path in templates:
+        assert (TEMPLATE_MODULE_DIR / f'{path.relative_to(TEMPLATE_DIR)}.py').is_file()
+
+
+def test_index_is_rendered_once_per_name(client: TestClient) -> None:
+    render_cache.clear()
+    misses = render_cache.misses
+    first = client.get('/', params={'name': 'cached'})
+    second = client.get('/', params={'name': 'cached'})
+    assert first.status_code == second.status_code == 200
+    assert first.text == second.text
+    assert render_cache.misses == misses + 1
+
+
+CHAPTERS = [Chapter(href=f'chapter-{number}.xhtml', title=f'Chapter {number}', body=f'<p>Text & more {number}</p>')
+            for number in range(4)]
+
+
+def test_chapters_are_rendered_in_the_pool_started_on_first_use() -> None:
+    render_cache.clear()
+    render_pool.on_shutdown()
+    try:
+        documents = asyncio.run(render_chapters(CHAPTERS))
+        assert render_pool._executor is not None
+    finally:
+        render_pool.on_shutdown()
+    assert render_pool._executor is None
+    for number, document in enumerate(documents):
+        assert f'<title>Chapter {number}</title>' in document
+        assert f'<p>Text & more {number}</p>' in document
+
+    # all of them are cached now, nothing starts the pool again
+    assert asyncio.run(render_chapters(CHAPTERS)) == documents
+    assert render_pool._executor is None
+
+
+def test_nav_lists_the_entries_escaped() -> None:
+    nav = render_nav('Contents', [NavEntry(href='chapter-1.xhtml', title='One & Two')], language='en')
+    assert 'xml:lang="en"' in nav
+    assert '<li><a href="chapter-1.xhtml">One &amp; Two</a></li>' in nav
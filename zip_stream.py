@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import struct
+import time
+import zlib
+from typing import AsyncGenerator, AsyncIterable
+
+import anyio.to_thread
+from anyio import CapacityLimiter
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+# general purpose flags
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+
+_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+_DATA_DESCRIPTOR = struct.Struct('<IIII')
+_CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+_END_OF_CENTRAL_DIRECTORY = struct.Struct('<IHHHHIIH')
+
+_MAX_32 = 0xFFFFFFFF
+
+# compression threads shared by every export, so a few large exports can't use up
+# the default anyio thread pool that sync handlers run in
+compression_limiter = CapacityLimiter(4)
+
+
+def _dos_time_date(timestamp: float) -> tuple[int, int]:
+    t = time.localtime(timestamp)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((max(t.tm_year, 1980) - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+def _deflate_chunk(compressor: zlib._Compress, chunk: bytes, crc: int) -> tuple[bytes, int]:
+    return compressor.compress(chunk), zlib.crc32(chunk, crc)
+
+
+class ZipStreamWriter:
+    """Write a zip archive front to back without seeking, as a sequence of byte chunks.
+
+    Entries whose content is streamed use a data descriptor after the data, so sizes
+    and CRC never have to be known up front. Only the central directory records are
+    kept in memory. Zip64 is not written, entries and the archive must stay under 4 GiB.
+    """
+
+    def __init__(self, compress_level: int = 6, limiter: CapacityLimiter | None = None) -> None:
+        self.compress_level = compress_level
+        self.limiter = limiter or compression_limiter
+        self._offset = 0
+        self._entries: list[bytes] = []
+        self._time, self._date = _dos_time_date(time.time())
+
+    def _local_header(self, name: bytes, flags: int, method: int, crc: int, compressed: int, size: int) -> bytes:
+        return _LOCAL_HEADER.pack(0x04034B50, 20, flags, method, self._time, self._date,
+                                  crc, compressed, size, len(name), 0) + name
+
+    def _record(self, name: bytes, flags: int, method: int, crc: int, compressed: int, size: int,
+                offset: int) -> None:
+        if compressed > _MAX_32 or size > _MAX_32 or offset > _MAX_32:
+            raise ValueError(f'{name.decode()} does not fit in a zip without zip64')
+        self._entries.append(_CENTRAL_HEADER.pack(0x02014B50, 20, 20, flags, method, self._time, self._date,
+                                                  crc, compressed, size, len(name), 0, 0, 0, 0, 0, offset) + name)
+
+    def write_stored(self, name: str, data: bytes) -> bytes:
+        """Return a complete uncompressed entry, e.g. the EPUB `mimetype` file."""
+        encoded = name.encode('utf-8')
+        crc = zlib.crc32(data)
+        offset = self._offset
+        flags = _FLAG_UTF8
+        chunk = self._local_header(encoded, flags, ZIP_STORED, crc, len(data), len(data)) + data
+        self._record(encoded, flags, ZIP_STORED, crc, len(data), len(data), offset)
+        self._offset += len(chunk)
+        return chunk
+
+    def write_stored_header(self, name: str, crc: int, size: int) -> bytes:
+        """Return the header of an uncompressed entry whose CRC and size are known up front.
+
+        The caller writes the `size` bytes of content right after it, e.g. with
+        `os.sendfile()`, nothing of the content passes through the writer.
+        """
+        encoded = name.encode('utf-8')
+        offset = self._offset
+        flags = _FLAG_UTF8
+        header = self._local_header(encoded, flags, ZIP_STORED, crc, size, size)
+        self._record(encoded, flags, ZIP_STORED, crc, size, size, offset)
+        self._offset += len(header) + size
+        return header
+
+    async def write_entry(self, name: str, chunks: AsyncIterable[bytes],
+                          compress: bool = True) -> AsyncGenerator[bytes, None]:
+        """Yield an entry chunk by chunk as `chunks` are produced.
+
+        Deflate and CRC run in worker threads (zlib releases the GIL), so large
+        entries don't hold up the event loop.
+        """
+        encoded = name.encode('utf-8')
+        flags = _FLAG_UTF8 | _FLAG_DATA_DESCRIPTOR
+        method = ZIP_DEFLATED if compress else ZIP_STORED
+        offset = self._offset
+        header = self._local_header(encoded, flags, method, 0, 0, 0)
+        self._offset += len(header)
+        yield header
+
+        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, -15) if compress else None
+        crc = size = compressed = 0
+        async for chunk in chunks:
+            size += len(chunk)
+            if compressor is not None:
+                data, crc = await anyio.to_thread.run_sync(_deflate_chunk, compressor, chunk, crc,
+                                                           limiter=self.limiter)
+            else:
+                data, crc = chunk, zlib.crc32(chunk, crc)
+            if data:
+                compressed += len(data)
+                self._offset += len(data)
+                yield data
+        if compressor is not None:
+            data = compressor.flush()
+            compressed += len(data)
+            self._offset += len(data)
+            yield data
+
+        descriptor = _DATA_DESCRIPTOR.pack(0x08074B50, crc, compressed, size)
+        self._offset += len(descriptor)
+        self._record(encoded, flags, method, crc, compressed, size, offset)
+        yield descriptor
+
+    def finish(self) -> bytes:
+        """Return the central directory and end record, nothing can be written after this."""
+        directory = b''.join(self._entries)
+        end = _END_OF_CENTRAL_DIRECTORY.pack(0x06054B50, 0, 0, len(self._entries), len(self._entries),
+                                             len(directory), self._offset, 0)
+        self._offset += len(directory) + len(end)
+        return directory + end